@@ -0,0 +1,53 @@
+"""Throughput of per-document analysis vs BatchTextAnalyzer at several batch sizes.
+
+Usage: python -m benchmarks.batch_analysis_bench [--doc-kb 4] [--documents 4096]
+"""
+
+import time
+import argparse
+from shinsa.utils.text_analyzer import get_text_analyzer
+from shinsa.utils.batch_analyzer import BatchTextAnalyzer
+from benchmarks.text_analyzer_bench import make_document
+
+BATCH_SIZES = (1, 64, 1024)
+
+
+def per_document(documents):
+    analyzer = get_text_analyzer()
+    return [analyzer.analyze(document) for document in documents]
+
+
+def batched(documents, batch_size):
+    results = []
+    for i in range(0, len(documents), batch_size):
+        results.extend(BatchTextAnalyzer().analyze_many(documents[i : i + batch_size]))
+    return results
+
+
+def throughput(fn, documents):
+    started = time.perf_counter()
+    fn(documents)
+    return len(documents) / (time.perf_counter() - started)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--doc-kb", type=float, default=4.0)
+    parser.add_argument("--documents", type=int, default=4096)
+    args = parser.parse_args()
+
+    # Slice one large corpus into documents so they share a realistic vocabulary
+    corpus = make_document(int(args.doc_kb * 1024 * args.documents)).split(" ")
+    words_per_document = max(len(corpus) // args.documents, 1)
+    documents = [" ".join(corpus[i * words_per_document : (i + 1) * words_per_document]) for i in range(args.documents)]
+    assert batched(documents[:64], 64) == per_document(documents[:64])
+
+    print(f"{args.documents} documents of {args.doc_kb} KB")
+    print(f"{'mode':<20}{'docs/sec':>12}")
+    print(f"{'per-document':<20}{throughput(per_document, documents):>12.0f}")
+    for batch_size in BATCH_SIZES:
+        print(f"{f'batch={batch_size}':<20}{throughput(lambda docs: batched(docs, batch_size), documents):>12.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,290 @@
+"""In-process pipeline harness: memory:// broker, fakeredis result backend, embedded workers.
+
+Runs the real task graph (find_customer_links -> process_customer_workflow ->
+crawl_link -> analyze_content -> generate_customer_report -> batch_generate_report,
+or the batched variant) with the simulated latencies scaled down, and records
+per-stage queue wait/run time and broker message counts through Celery signals.
+Redis usage is counted on the fakeredis client: commands, round trips, and the
+keys and serialized bytes left behind.
+"""
+
+import os
+import time
+import tempfile
+import threading
+from collections import Counter, defaultdict
+from contextlib import ExitStack
+import fakeredis
+from redis.client import Pipeline
+from celery import chain, chord, group
+from celery.contrib.testing.worker import start_worker
+from celery.signals import before_task_publish, task_prerun, task_postrun
+from shinsa.celery_app.app import celery_app
+from shinsa.celery_app import backend, config
+
+# Worker layout per queue: (pool, concurrency), mirroring scripts/start_workers.sh.
+# A single-thread "threads" pool stalls ~0.3 s between messages on memory://, so the
+# cpu_intensive worker gets at least two threads even on one-core machines.
+DEFAULT_WORKERS = {
+    "coordination": ("threads", 4),
+    "io_intensive": ("threads", 20),
+    "cpu_intensive": ("threads", max(os.cpu_count() or 1, 2)),
+}
+REPORT_TASKS = {"generate_customer_report", "generate_customer_reports_batch"}
+# process_customer_workflow hands its report chord off and returns, so batch_generate_report can
+# finish before the customer reports do; a run is complete once both have happened
+FINAL_TASKS = {"batch_generate_report", "generate_customer_reports_batch"}
+APP_SETTINGS = ("broker_url", "result_backend", "broker_transport_options", "worker_hijack_root_logger")
+
+_fake_server = fakeredis.FakeServer()
+_redis_usage = Counter()
+_usage_lock = threading.Lock()
+
+
+def count_redis(commands, round_trips=1):
+    with _usage_lock:
+        _redis_usage["commands"] += commands
+        _redis_usage["round_trips"] += round_trips
+
+
+class CountingPipeline(Pipeline):
+    def execute(self, raise_on_error=True):
+        count_redis(len(self.command_stack))
+        return super().execute(raise_on_error)
+
+
+class CountingFakeRedis(fakeredis.FakeStrictRedis):
+    def execute_command(self, *args, **options):
+        count_redis(1)
+        return super().execute_command(*args, **options)
+
+    def pipeline(self, transaction=True, shard_hint=None):
+        return CountingPipeline(self.connection_pool, self.response_callbacks, transaction, shard_hint)
+
+
+class FakeRedisBackend(backend.BatchingRedisBackend):
+    """Redis result backend whose clients all talk to one in-process fakeredis server."""
+
+    def _create_client(self, **params):
+        return CountingFakeRedis(server=_fake_server)
+
+
+def redis_usage():
+    """Commands and round trips so far, and the keys and bytes currently stored (DUMP size)."""
+    backend.flush_result_writes()
+    client = fakeredis.FakeStrictRedis(server=_fake_server)
+    usage = {"commands": _redis_usage["commands"], "round_trips": _redis_usage["round_trips"], "keys": 0, "bytes": 0, "result_keys": 0, "result_bytes": 0}
+    for key in client.scan_iter(count=1000):
+        size = len(client.dump(key) or b"")
+        usage["keys"] += 1
+        usage["bytes"] += size
+        if key.startswith(b"celery-task-meta-"):
+            usage["result_keys"] += 1
+            usage["result_bytes"] += size
+    return usage
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+class StageRecorder:
+    """Collects publish counts, queue wait and run time per task from Celery signals."""
+
+    def __init__(self, expected_reports):
+        self.expected_reports = expected_reports
+        self.reports = 0
+        self.finished = False
+        self.done = threading.Event()
+        self.messages = Counter()
+        self.queue_wait = defaultdict(list)
+        self.run_time = defaultdict(list)
+        self.latency = defaultdict(list)
+        self._published = {}
+        self._started = {}
+        self._waits = {}
+        self._lock = threading.Lock()
+
+    def on_publish(self, sender=None, headers=None, **kwargs):
+        with self._lock:
+            self.messages[sender] += 1
+            self._published[headers["id"]] = time.perf_counter()
+
+    def on_prerun(self, task_id=None, task=None, **kwargs):
+        now = time.perf_counter()
+        with self._lock:
+            published = self._published.pop(task_id, None)
+            if published is not None:
+                self.queue_wait[task.name].append(now - published)
+                self._waits[task_id] = now - published
+            self._started[task_id] = now
+
+    def on_postrun(self, task_id=None, task=None, retval=None, state=None, **kwargs):
+        now = time.perf_counter()
+        with self._lock:
+            started = self._started.pop(task_id, None)
+            wait = self._waits.pop(task_id, None)
+            if started is not None:
+                self.run_time[task.name].append(now - started)
+                # End-to-end: this task's own wait plus its own run time
+                if wait is not None:
+                    self.latency[task.name].append(wait + now - started)
+            if task.name in REPORT_TASKS and state == "SUCCESS":
+                self.reports += len(retval) if isinstance(retval, list) else 1
+            if task.name in FINAL_TASKS and state == "SUCCESS":
+                self.finished = True
+            if self.finished and self.reports >= self.expected_reports:
+                self.done.set()
+
+    def connect(self):
+        before_task_publish.connect(self.on_publish, weak=False)
+        task_prerun.connect(self.on_prerun, weak=False)
+        task_postrun.connect(self.on_postrun, weak=False)
+
+    def disconnect(self):
+        before_task_publish.disconnect(self.on_publish)
+        task_prerun.disconnect(self.on_prerun)
+        task_postrun.disconnect(self.on_postrun)
+
+    def stage_stats(self):
+        stats = {}
+        for name in sorted(set(self.queue_wait) | set(self.run_time)):
+            latencies = self.latency[name]
+            stats[name] = {
+                "count": len(self.run_time[name]),
+                "messages": self.messages[name],
+                "p50": percentile(latencies, 50),
+                "p95": percentile(latencies, 95),
+                "p99": percentile(latencies, 99),
+                "run_p50": percentile(self.run_time[name], 50),
+                "wait_p50": percentile(self.queue_wait[name], 50),
+            }
+        return stats
+
+
+def make_customers(n):
+    return [{"name": f"Customer{i} Benchmark", "email": f"customer{i}@example.com", "address": "Tokyo"} for i in range(n)]
+
+
+def _reset_helpers():
+    # Per-process helpers built on the backend client must be rebuilt against the active backend
+    from shinsa.celery_app.tasks import analysis_tasks, crawl_tasks, report_tasks
+
+    crawl_tasks._crawl_cache = None
+    crawl_tasks._claim_check = None
+    crawl_tasks._deduplicators.clear()
+    crawl_tasks._rate_limiter = None
+    crawl_tasks._circuit_breaker = None
+    report_tasks._report_aggregator = None
+    report_tasks._batch_summary = None
+    report_tasks._report_store = None
+    analysis_tasks._page_fingerprints = None
+    backend.flush_result_writes()
+    backend._write_buffer = None
+    # Backends are cached per thread; drop the calling thread's so the next access rebuilds it
+    celery_app._local.__dict__.pop("backend", None)
+    # Broker connections and producers pooled under the previous broker_url
+    celery_app._pool = None
+    celery_app.amqp._producer_pool = None
+
+
+def configure_app(latency_scale):
+    saved = {key: celery_app.conf[key] for key in APP_SETTINGS}, dict(config.SIMULATED_LATENCIES), config.METRICS_CONFIG["enabled"], config.REPORT_STORE_CONFIG["path"]
+    # Embedded workers fire worker_init too; keep them off the Prometheus multiprocess setup
+    config.METRICS_CONFIG["enabled"] = False
+    # Benchmark reports stay out of the data directory's report store
+    config.REPORT_STORE_CONFIG["path"] = os.path.join(tempfile.gettempdir(), f"shinsa-bench-reports-{os.getpid()}.sqlite3")
+    celery_app.conf.update(
+        broker_url="memory://",
+        result_backend=f"{__name__}:FakeRedisBackend",
+        broker_transport_options={"polling_interval": 0.005},
+        worker_hijack_root_logger=False,
+    )
+    _reset_helpers()
+    _fake_server.connected = True
+    fakeredis.FakeStrictRedis(server=_fake_server).flushall()
+    _redis_usage.clear()
+
+    base = {"find_customer_links": 120, "crawl_link": 130, "fetch_page_content": 2, "analyze_content": 140, "extract_keywords": 0.5}
+    config.SIMULATED_LATENCIES.update({stage: seconds * latency_scale for stage, seconds in base.items()})
+    return saved
+
+
+def restore_app(saved):
+    settings, latencies, metrics_enabled, report_store_path = saved
+    celery_app.conf.update(settings)
+    config.REPORT_STORE_CONFIG["path"] = report_store_path
+    config.SIMULATED_LATENCIES.update(latencies)
+    config.METRICS_CONFIG["enabled"] = metrics_enabled
+    _reset_helpers()
+
+
+def build_workflow(customers, mode):
+    from shinsa.celery_app.tasks.customer_tasks import discovery_batches, find_customer_links, find_customer_links_batch, process_customer_workflow, process_customers_batch
+    from shinsa.celery_app.tasks.report_tasks import batch_generate_report
+
+    if mode == "batched":
+        return chord(group(find_customer_links_batch.s(batch) for batch in discovery_batches(customers)), process_customers_batch.s())
+    return chord(group(chain(find_customer_links.s(customer).set(ignore_result=True), process_customer_workflow.s()) for customer in customers), batch_generate_report.s())
+
+
+def use_result_policy(lean):
+    """lean=False stores every result unbatched, as before RESULT_BACKEND_CONFIG; returns what to restore."""
+    celery_app.loader.import_default_modules()
+    saved = {name: vars(celery_app.tasks[name]).get("ignore_result") for name in config.RESULT_BACKEND_CONFIG["ignore_results"]}, config.RESULT_BACKEND_CONFIG["batch_writes"]
+    if not lean:
+        for name in saved[0]:
+            celery_app.tasks[name].ignore_result = False
+        config.RESULT_BACKEND_CONFIG["batch_writes"] = False
+    return saved
+
+
+def restore_result_policy(saved):
+    ignored, batch_writes = saved
+    for name, value in ignored.items():
+        if value is None:
+            vars(celery_app.tasks[name]).pop("ignore_result", None)
+        else:
+            celery_app.tasks[name].ignore_result = value
+    config.RESULT_BACKEND_CONFIG["batch_writes"] = batch_writes
+
+
+def run_pipeline(customers=20, mode="per-customer", latency_scale=0.001, workers=None, timeout=120, lean_results=True):
+    from shinsa.celery_app.tasks.crawl_tasks import dedup_stats
+
+    saved = configure_app(latency_scale)
+    saved_policy = use_result_policy(lean_results)
+    workers = workers or DEFAULT_WORKERS
+    recorder = StageRecorder(expected_reports=customers)
+    recorder.connect()
+    try:
+        with ExitStack() as stack:
+            for queue, (pool, concurrency) in workers.items():
+                stack.enter_context(start_worker(celery_app, pool=pool, concurrency=concurrency, queues=[queue], perform_ping_check=False, shutdown_timeout=30))
+
+            started = time.perf_counter()
+            build_workflow(make_customers(customers), mode).apply_async()
+            if not recorder.done.wait(timeout):
+                raise TimeoutError(f"Only {recorder.reports}/{customers} customer reports finished within {timeout}s")
+            elapsed = time.perf_counter() - started
+        usage = redis_usage()
+        dedup = dedup_stats()
+    finally:
+        recorder.disconnect()
+        restore_result_policy(saved_policy)
+        restore_app(saved)
+
+    return {
+        "mode": mode,
+        "customers": customers,
+        "elapsed": elapsed,
+        "customers_per_sec": customers / elapsed,
+        "reports": recorder.reports,
+        "broker_messages": sum(recorder.messages.values()),
+        "stages": recorder.stage_stats(),
+        "dedup": dedup,
+        "redis": usage,
+    }
@@ -0,0 +1,88 @@
+"""Cold-start import cost of the producer and worker entry points (python -X importtime).
+
+Usage: python -m benchmarks.import_bench [--runs 5] [--top 10]
+
+Each entry point is imported in a fresh interpreter; the table shows the median
+total import time and wall time over the runs, then the packages that cost the
+most (self time summed per top-level package) for the median run.
+"""
+
+import sys
+import time
+import argparse
+import statistics
+import subprocess
+from collections import Counter
+
+ENTRY_POINTS = {
+    # A web client or script that only sends tasks by name
+    "producer: app": "import shinsa.celery_app.app",
+    # A producer that imports task objects to call .delay()/.s()
+    "producer: customer_tasks": "from shinsa.celery_app.tasks.customer_tasks import find_customer_links",
+    # What a worker imports before it starts consuming
+    "worker: boot": (
+        "from shinsa.celery_app.app import celery_app, preload_worker_modules; "
+        "celery_app.loader.import_default_modules(); preload_worker_modules()"
+    ),
+}
+
+
+def parse_importtime(stderr):
+    # Lines look like "import time:  self_us | cumulative_us | <indent>package"
+    modules = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        modules.append((name.rstrip(), int(self_us), int(cumulative_us)))
+    return modules
+
+
+def measure(statement):
+    started = time.perf_counter()
+    completed = subprocess.run([sys.executable, "-X", "importtime", "-c", statement], capture_output=True, text=True, check=True)
+    wall = time.perf_counter() - started
+    modules = parse_importtime(completed.stderr)
+    # Top-level imports have a single space of indent; their cumulative times add up to the total
+    total_us = sum(cumulative for name, _, cumulative in modules if not name.startswith("  "))
+    return {"total_ms": total_us / 1000, "wall_ms": wall * 1000, "modules": modules, "stdout": completed.stdout}
+
+
+def top_packages(modules, top):
+    by_package = Counter()
+    for name, self_us, _ in modules:
+        by_package[name.strip().split(".")[0]] += self_us
+    return by_package.most_common(top)
+
+
+def run(runs=5, top=10):
+    results = {}
+    for label, statement in ENTRY_POINTS.items():
+        samples = sorted((measure(statement) for _ in range(runs)), key=lambda sample: sample["total_ms"])
+        median = samples[len(samples) // 2]
+        results[label] = {
+            "total_ms": median["total_ms"],
+            "wall_ms": statistics.median(sample["wall_ms"] for sample in samples),
+            "modules": len(median["modules"]),
+            "stdout_bytes": len(median["stdout"]),
+            "top_packages": top_packages(median["modules"], top),
+        }
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=10)
+    args = parser.parse_args()
+
+    results = run(args.runs, args.top)
+    print(f"{'entry point':<28}{'import ms':>11}{'wall ms':>10}{'modules':>9}{'stdout B':>10}")
+    for label, result in results.items():
+        print(f"{label:<28}{result['total_ms']:>11.1f}{result['wall_ms']:>10.1f}{result['modules']:>9}{result['stdout_bytes']:>10}")
+    for label, result in results.items():
+        print(f"\n{label}: " + ", ".join(f"{package} {self_us / 1000:.1f}ms" for package, self_us in result["top_packages"]))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,52 @@
+"""End-to-end throughput of the customer pipeline, without Redis or real workers.
+
+Usage: python -m benchmarks.pipeline_bench [--customers 50] [--mode per-customer|batched|both]
+                                          [--latency-scale 0.001] [--results lean|store-all|both]
+
+Runs the full task graph on a memory:// broker with a fakeredis result backend
+and embedded thread-pool workers per queue. --latency-scale multiplies the
+simulated stage latencies (1.0 is the production-like 120-140 s per stage).
+--results store-all stores every task result without batching, as before
+RESULT_BACKEND_CONFIG, to compare Redis commands and memory per customer.
+"""
+
+import argparse
+from benchmarks.harness import run_pipeline
+
+
+def print_result(result, results_policy="lean"):
+    print(f"\n== {result['mode']} ({results_policy} results): {result['customers']} customers in {result['elapsed']:.2f}s "
+          f"({result['customers_per_sec']:.2f} customers/s, {result['broker_messages']} broker messages)")
+    per_customer = {key: value / result["customers"] for key, value in result["redis"].items()}
+    print(f"redis per customer: {per_customer['commands']:.1f} commands in {per_customer['round_trips']:.1f} round trips, "
+          f"{per_customer['keys']:.1f} keys / {per_customer['bytes'] / 1024:.1f} KiB stored "
+          f"(results: {per_customer['result_keys']:.1f} keys / {per_customer['result_bytes'] / 1024:.1f} KiB)")
+    print(f"{'task':<34}{'runs':>6}{'msgs':>6}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'wait p50':>10}{'run p50':>10}")
+    for name, stats in result["stages"].items():
+        print(f"{name:<34}{stats['count']:>6}{stats['messages']:>6}"
+              f"{stats['p50'] * 1000:>10.1f}{stats['p95'] * 1000:>10.1f}{stats['p99'] * 1000:>10.1f}"
+              f"{stats['wait_p50'] * 1000:>10.1f}{stats['run_p50'] * 1000:>10.1f}")
+    for namespace, stats in result["dedup"].items():
+        if isinstance(stats, dict):
+            print(f"dedup {namespace}: {stats['executed']} executed, {stats['coalesced']} coalesced, {stats['reused']} reused ({stats['saved_ratio']:.0%} saved)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--customers", type=int, default=50)
+    parser.add_argument("--mode", choices=["per-customer", "batched", "both"], default="both")
+    parser.add_argument("--latency-scale", type=float, default=0.001)
+    parser.add_argument("--timeout", type=float, default=600)
+    parser.add_argument("--results", choices=["lean", "store-all", "both"], default="lean")
+    args = parser.parse_args()
+
+    modes = ["per-customer", "batched"] if args.mode == "both" else [args.mode]
+    policies = ["store-all", "lean"] if args.results == "both" else [args.results]
+    for mode in modes:
+        for policy in policies:
+            result = run_pipeline(customers=args.customers, mode=mode, latency_scale=args.latency_scale, timeout=args.timeout, lean_results=policy == "lean")
+            print_result(result, policy)
+
+
+if __name__ == "__main__":
+    main()
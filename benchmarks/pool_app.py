@@ -0,0 +1,33 @@
+"""The Shinsa app on a filesystem broker with results disabled, for out-of-process worker benchmarks.
+
+The producer writes messages to POOL_BENCH_DIR/outbox and the worker consumes POOL_BENCH_DIR/inbox.
+The benchmark renames files from one to the other, which is atomic, so the worker never reads a
+message that is still being written (kombu's filesystem transport does not guard against that).
+"""
+
+import os
+import tempfile
+from shinsa.celery_app.app import celery_app
+
+ROOT = os.environ.setdefault("POOL_BENCH_DIR", os.path.join(tempfile.gettempdir(), "shinsa-pool-bench"))
+INBOX = os.path.join(ROOT, "inbox")
+OUTBOX = os.path.join(ROOT, "outbox")
+# Exchange tables; kombu would otherwise write them to ./control in the working directory
+CONTROL = os.path.join(ROOT, "control")
+for folder in (INBOX, OUTBOX, CONTROL):
+    os.makedirs(folder, exist_ok=True)
+
+celery_app.conf.update(
+    broker_url="filesystem://",
+    broker_transport_options={
+        "data_folder_in": INBOX,
+        "data_folder_out": OUTBOX,
+        "control_folder": CONTROL,
+        "store_processed": False,
+        "polling_interval": 0.01,
+    },
+    result_backend=None,
+    task_ignore_result=True,
+)
+
+app = celery_app
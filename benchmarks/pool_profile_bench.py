@@ -0,0 +1,144 @@
+"""Memory per slot and crawl throughput of io_intensive worker pool profiles.
+
+Usage: python -m benchmarks.pool_profile_bench [--profiles prefork:20,threads:200,gevent:200,gevent:1000]
+                                              [--tasks 1000] [--crawl-seconds 0.5]
+
+Each profile starts a real `celery worker -Q io_intensive` on a filesystem broker
+(benchmarks/pool_app.py) and measures the PSS of the worker's process tree when idle
+and at its peak while draining --tasks crawl_link tasks, whose simulated fetch takes
+--crawl-seconds. Throughput is the drain rate from the first task received to the
+last one succeeded, read from the worker log. The crawl cache and dedup are disabled.
+"""
+
+import os
+import re
+import sys
+import time
+import shutil
+import argparse
+import tempfile
+import subprocess
+from datetime import datetime
+
+DEFAULT_PROFILES = "prefork:20,threads:200,gevent:200,gevent:1000"
+CRAWL_LINK_BASE_SECONDS = 130  # config.SIMULATED_LATENCIES["crawl_link"] at scale 1
+LOG_TIMESTAMP = re.compile(r"^\[(\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2},\d{3})")
+
+
+def process_tree(pid):
+    pids, pending = [], [pid]
+    while pending:
+        current = pending.pop()
+        pids.append(current)
+        try:
+            for task in os.listdir(f"/proc/{current}/task"):
+                with open(f"/proc/{current}/task/{task}/children") as f:
+                    pending.extend(int(child) for child in f.read().split())
+        except FileNotFoundError:
+            continue
+    return pids
+
+
+def pss_kb(pid):
+    # Proportional set size: shared pages are split between the processes mapping them
+    total = 0
+    for member in process_tree(pid):
+        try:
+            with open(f"/proc/{member}/smaps_rollup") as f:
+                total += next(int(line.split()[1]) for line in f if line.startswith("Pss:"))
+        except (FileNotFoundError, ProcessLookupError):
+            continue
+    return total
+
+
+def log_time(line):
+    return datetime.strptime(LOG_TIMESTAMP.match(line).group(1), "%Y-%m-%d %H:%M:%S,%f").timestamp()
+
+
+def start_worker(pool, concurrency, env, log_path):
+    command = [sys.executable, "-m", "celery", "-A", "benchmarks.pool_app", "worker", "-P", pool, "-c", str(concurrency),
+               "-Q", "io_intensive", "--without-gossip", "--without-mingle", "--without-heartbeat", "-l", "info", "--prefetch-multiplier", "2"]
+    # Logs go to a file: an undrained pipe would block the worker once it fills up
+    with open(log_path, "w") as log_file:
+        worker = subprocess.Popen(command, env=env, stdout=log_file, stderr=subprocess.STDOUT)
+    deadline = time.monotonic() + 60
+    while time.monotonic() < deadline and worker.poll() is None:
+        with open(log_path) as f:
+            if "ready." in f.read():
+                return worker
+        time.sleep(0.1)
+    worker.kill()
+    raise RuntimeError(f"Worker ({pool}:{concurrency}) did not become ready, see {log_path}")
+
+
+def run_profile(pool, concurrency, tasks, crawl_seconds, bench_dir, timeout=600):
+    from benchmarks.pool_app import INBOX, OUTBOX
+    from shinsa.celery_app.tasks.crawl_tasks import crawl_link
+
+    env = {
+        **os.environ,
+        "SIMULATED_LATENCY_SCALE": str(crawl_seconds / CRAWL_LINK_BASE_SECONDS),
+        "SHINSA_METRICS_ENABLED": "false",
+    }
+    log_path = os.path.join(bench_dir, f"worker-{pool}-{concurrency}.log")
+    worker = start_worker(pool, concurrency, env, log_path)
+    try:
+        time.sleep(1)
+        idle_kb = peak_kb = pss_kb(worker.pid)
+
+        customer = {"name": "Benchmark Customer", "email": "bench@example.com"}
+        for i in range(tasks):
+            crawl_link.apply_async(args=[{"customer": customer, "link": f"https://example.com/profile/{i}"}])
+        for name in os.listdir(OUTBOX):
+            os.rename(os.path.join(OUTBOX, name), os.path.join(INBOX, name))
+
+        deadline = time.monotonic() + timeout
+        while True:
+            with open(log_path) as f:
+                lines = f.read().splitlines()
+            succeeded = [line for line in lines if "succeeded in" in line]
+            if len(succeeded) >= tasks:
+                break
+            if time.monotonic() > deadline or worker.poll() is not None:
+                raise RuntimeError(f"{pool}:{concurrency} finished {len(succeeded)}/{tasks} tasks, see {log_path}")
+            peak_kb = max(peak_kb, pss_kb(worker.pid))
+            time.sleep(0.2)
+        first_received = min(log_time(line) for line in lines if "] received" in line)
+        elapsed = max(log_time(line) for line in succeeded) - first_received
+    finally:
+        worker.terminate()
+        worker.wait(30)
+
+    return {
+        "profile": f"{pool}:{concurrency}",
+        "idle_mb": idle_kb / 1024,
+        "peak_mb": peak_kb / 1024,
+        "kb_per_slot": peak_kb / concurrency,
+        "tasks_per_sec": tasks / elapsed,
+        "ideal_tasks_per_sec": concurrency / crawl_seconds,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--profiles", default=DEFAULT_PROFILES)
+    parser.add_argument("--tasks", type=int, default=1000)
+    parser.add_argument("--crawl-seconds", type=float, default=0.5)
+    args = parser.parse_args()
+
+    # Set before the app is imported: the producer and every worker read them from the environment
+    bench_dir = tempfile.mkdtemp(prefix="shinsa-pool-bench-")
+    os.environ.update({"POOL_BENCH_DIR": bench_dir, "CRAWL_CACHE_ENABLED": "false", "DEDUP_ENABLED": "false"})
+    print(f"{'profile':<16}{'idle MB':>9}{'peak MB':>9}{'KB/slot':>9}{'tasks/s':>9}{'ideal':>8}")
+    try:
+        for profile in args.profiles.split(","):
+            pool, concurrency = profile.split(":")
+            result = run_profile(pool, int(concurrency), args.tasks, args.crawl_seconds, bench_dir)
+            print(f"{result['profile']:<16}{result['idle_mb']:>9.1f}{result['peak_mb']:>9.1f}{result['kb_per_slot']:>9.0f}"
+                  f"{result['tasks_per_sec']:>9.1f}{result['ideal_tasks_per_sec']:>8.0f}", flush=True)
+    finally:
+        shutil.rmtree(bench_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
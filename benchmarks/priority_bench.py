@@ -0,0 +1,125 @@
+"""Latency of interactive customer requests while a large batch backfill is queued, with and without priority lanes.
+
+Usage: python -m benchmarks.priority_bench [--broker redis://localhost:6379/15] [--batch-customers 10000]
+                                          [--interactive 20] [--interval 0.5] [--latency-scale 0.001]
+
+Needs a Redis broker (priorities are a Redis transport feature; memory:// has none); use a
+scratch database, its queues are purged. Results go to the harness's in-process fakeredis
+backend and workers are embedded thread pools as in benchmarks/harness.py.
+
+For each mode, a batch workflow for --batch-customers customers is published at "batch"
+priority, then --interactive single-customer workflows are submitted one every --interval
+seconds at "interactive" priority. Latency is from submit to that customer's report.
+"lanes" uses the configured priority steps; "fifo" collapses them into one list per queue,
+which is how the broker behaved before priorities were configured.
+"""
+
+import time
+import argparse
+import threading
+from contextlib import ExitStack
+from kombu import Connection
+from celery.contrib.testing.worker import start_worker
+from celery.signals import task_postrun
+from shinsa.celery_app.app import celery_app
+from shinsa.celery_app.config import CELERY_CONFIG, TASK_PRIORITIES
+from benchmarks.harness import DEFAULT_WORKERS, configure_app, make_customers, percentile, restore_app
+
+QUEUES = ("coordination", "io_intensive", "cpu_intensive")
+
+
+class ReportWaiter:
+    """Marks each interactive customer's report as it is generated."""
+
+    def __init__(self):
+        self.finished = {}
+        self.changed = threading.Condition()
+
+    def on_postrun(self, task=None, retval=None, state=None, **kwargs):
+        if task.name == "generate_customer_report" and state == "SUCCESS":
+            with self.changed:
+                self.finished[retval["customer"]["name"]] = time.perf_counter()
+                self.changed.notify_all()
+
+    def wait_for(self, names, timeout):
+        deadline = time.perf_counter() + timeout
+        with self.changed:
+            while not names <= self.finished.keys() and time.perf_counter() < deadline:
+                self.changed.wait(deadline - time.perf_counter())
+
+
+def purge_queues(broker):
+    # Every lane, whichever mode ran last
+    lanes = {"priority_steps": CELERY_CONFIG["broker_transport_options"]["priority_steps"], "sep": ":"}
+    with Connection(broker, transport_options=lanes) as connection:
+        channel = connection.default_channel
+        for queue in QUEUES:
+            channel.queue_purge(queue)
+
+
+def run_mode(mode, broker, batch_customers, interactive, interval, latency_scale, timeout):
+    from shinsa.celery_app.tasks.customer_tasks import customer_workflow, customers_batch_workflow
+
+    saved = configure_app(latency_scale)
+    saved_prefetch = celery_app.conf.worker_prefetch_multiplier
+    steps = CELERY_CONFIG["broker_transport_options"]["priority_steps"] if mode == "lanes" else [0]
+    celery_app.conf.update(broker_url=broker, broker_transport_options={"priority_steps": steps, "sep": ":"}, worker_prefetch_multiplier=1)
+    waiter = ReportWaiter()
+    task_postrun.connect(waiter.on_postrun, weak=False)
+    try:
+        purge_queues(broker)
+        with ExitStack() as stack:
+            for queue, (pool, concurrency) in DEFAULT_WORKERS.items():
+                stack.enter_context(start_worker(celery_app, pool=pool, concurrency=concurrency, queues=[queue], perform_ping_check=False, shutdown_timeout=300))
+
+            started = time.perf_counter()
+            customers_batch_workflow(make_customers(batch_customers)).apply_async()
+            backlog_published = time.perf_counter() - started
+
+            submitted = {}
+            for i in range(interactive):
+                name = f"Interactive{i} Customer"
+                submitted[name] = time.perf_counter()
+                customer_workflow({"name": name, "email": f"interactive{i}@example.com"}, priority=TASK_PRIORITIES["interactive"]).apply_async()
+                time.sleep(interval)
+            waiter.wait_for(set(submitted), timeout)
+            purge_queues(broker)
+        # Stopping workers puts their unacknowledged messages back
+        purge_queues(broker)
+    finally:
+        task_postrun.disconnect(waiter.on_postrun)
+        celery_app.conf.worker_prefetch_multiplier = saved_prefetch
+        restore_app(saved)
+
+    latencies = [waiter.finished[name] - at for name, at in submitted.items() if name in waiter.finished]
+    return {
+        "mode": mode,
+        "backlog_published": backlog_published,
+        "completed": len(latencies),
+        "submitted": len(submitted),
+        "p50": percentile(latencies, 50),
+        "p95": percentile(latencies, 95),
+        "max": max(latencies, default=0.0),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--broker", default="redis://localhost:6379/15")
+    parser.add_argument("--batch-customers", type=int, default=10000)
+    parser.add_argument("--interactive", type=int, default=20)
+    parser.add_argument("--interval", type=float, default=0.5)
+    parser.add_argument("--latency-scale", type=float, default=0.001)
+    parser.add_argument("--timeout", type=float, default=120, help="how long to wait for interactive reports after the last submit")
+    parser.add_argument("--modes", default="fifo,lanes")
+    args = parser.parse_args()
+
+    print(f"{'mode':<8}{'backlog s':>11}{'done':>10}{'p50 s':>9}{'p95 s':>9}{'max s':>9}")
+    for mode in args.modes.split(","):
+        result = run_mode(mode, args.broker, args.batch_customers, args.interactive, args.interval, args.latency_scale, args.timeout)
+        print(f"{result['mode']:<8}{result['backlog_published']:>11.1f}{result['completed']:>5}/{result['submitted']:<4}"
+              f"{result['p50']:>9.2f}{result['p95']:>9.2f}{result['max']:>9.2f}", flush=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""Encode/decode time and stored size of typical crawl payloads: JSON vs msgpack-z.
+
+Usage: python -m benchmarks.serializer_bench [--redis-url redis://localhost:6379/15]
+
+With --redis-url, each encoded payload is also written to Redis and its
+MEMORY USAGE reported (the keys are removed afterwards).
+"""
+
+import argparse
+import timeit
+from kombu.serialization import dumps, loads
+from shinsa.celery_app import serializers
+from shinsa.celery_app.tasks.crawl_tasks import MOCK_CONTENT, build_crawl_result
+from benchmarks.text_analyzer_bench import make_document
+
+PAYLOAD_SIZES = {"mock page": None, "20 KB page": 20 * 1024, "200 KB page": 200 * 1024}
+
+
+def crawl_payload(size):
+    content = MOCK_CONTENT if size is None else make_document(size)
+    customer = {"name": "Aung Myo Tun", "email": "aungmyotun@gmail.com", "address": "Tokyo"}
+    return build_crawl_result(customer, "https://linkedin.com/in/aung-myo-tun", content, "4f1c2f4e-0000-4000-8000-000000000000")
+
+
+def codecs():
+    yield "json", lambda obj: dumps(obj, serializer="json")[2], lambda data: loads(data, "application/json", "utf-8")
+    yield "msgpack (no compression)", lambda obj: serializers.encode(obj, threshold=float("inf")), serializers.decode
+    for name, module in (("zstd", "zstandard"), ("lz4", "lz4"), ("zlib", None)):
+        if module and getattr(serializers, module) is None:
+            continue
+        yield f"msgpack-z ({name})", _pinned_encoder(name), serializers.decode
+
+
+def _pinned_encoder(codec):
+    def encode(obj):
+        # Force one codec regardless of which optional libraries are installed
+        saved = serializers.zstandard, serializers.lz4
+        serializers.zstandard = saved[0] if codec == "zstd" else None
+        serializers.lz4 = saved[1] if codec in ("zstd", "lz4") else None
+        try:
+            return serializers.encode(obj)
+        finally:
+            serializers.zstandard, serializers.lz4 = saved
+
+    return encode
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--redis-url")
+    parser.add_argument("--number", type=int, default=200)
+    args = parser.parse_args()
+
+    client = None
+    if args.redis_url:
+        import redis
+
+        client = redis.Redis.from_url(args.redis_url)
+
+    print(f"{'payload':<14}{'codec':<28}{'bytes':>10}{'encode us':>12}{'decode us':>12}{'redis bytes':>13}")
+    for label, size in PAYLOAD_SIZES.items():
+        payload = crawl_payload(size)
+        for name, encode, decode in codecs():
+            data = encode(payload)
+            assert decode(data) == payload
+            encode_us = min(timeit.repeat(lambda: encode(payload), number=args.number, repeat=3)) / args.number * 1e6
+            decode_us = min(timeit.repeat(lambda: decode(data), number=args.number, repeat=3)) / args.number * 1e6
+            redis_bytes = ""
+            if client is not None:
+                client.set("serializer-bench", data)
+                redis_bytes = client.memory_usage("serializer-bench")
+                client.delete("serializer-bench")
+            print(f"{label:<14}{name:<28}{len(data):>10}{encode_us:>12.1f}{decode_us:>12.1f}{redis_bytes:>13}")
+
+
+if __name__ == "__main__":
+    main()
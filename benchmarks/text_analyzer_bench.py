@@ -0,0 +1,67 @@
+"""Microbenchmark: legacy extract_keywords_and_analyze vs the compiled TextAnalyzer.
+
+Usage: python -m benchmarks.text_analyzer_bench [--size-mb 1] [--repeat 5]
+"""
+
+import re
+import random
+import argparse
+import timeit
+from collections import Counter
+from shinsa.utils.text_analyzer import get_text_analyzer
+
+
+def legacy_extract_keywords_and_analyze(content):
+    # Pre-TextAnalyzer implementation (with the word-boundary regex fixed) kept as the baseline
+    words = re.findall(r"\b[a-zA-Z]{3,}\b", content.lower())
+    stop_words = {"the", "and", "or", "but", "in", "on", "at", "to", "for", "of", "with", "by", "from", "about", "this", "that", "these", "those", "they", "them", "their"}
+    filtered_words = [word for word in words if word not in stop_words]
+    word_freq = Counter(filtered_words)
+    top_keywords = [{"word": word, "count": count} for word, count in word_freq.most_common(20)]
+    positive_words = ["good", "great", "excellent", "amazing", "wonderful", "professional", "skilled", "experienced"]
+    negative_words = ["bad", "poor", "terrible", "awful", "unprofessional"]
+    positive_count = sum(1 for word in filtered_words if word in positive_words)
+    negative_count = sum(1 for word in filtered_words if word in negative_words)
+    sentiment_score = (positive_count - negative_count) / max(len(filtered_words), 1)
+    return {
+        "keywords": top_keywords,
+        "word_count": len(words),
+        "unique_words": len(set(filtered_words)),
+        "sentiment_score": sentiment_score,
+        "sentiment": "positive" if sentiment_score > 0.1 else "negative" if sentiment_score < -0.1 else "neutral",
+    }
+
+
+def make_document(size_bytes, seed=0):
+    rng = random.Random(seed)
+    vocabulary = ["python", "data", "analysis", "the", "and", "professional", "skilled", "bad", "poor", "developer", "Tokyo", "about", "machine", "learning", "great", "a", "of", "AI"]
+    vocabulary += ["".join(rng.choice("abcdefghijklmnopqrstuvwxyz") for _ in range(rng.randint(3, 10))) for _ in range(2000)]
+    parts, size = [], 0
+    while size < size_bytes:
+        word = rng.choice(vocabulary)
+        parts.append(word)
+        size += len(word) + 1
+    return " ".join(parts)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--size-mb", type=float, default=1.0)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    document = make_document(int(args.size_mb * 1024 * 1024))
+    analyzer = get_text_analyzer()
+    assert analyzer.analyze(document) == legacy_extract_keywords_and_analyze(document)
+
+    legacy = min(timeit.repeat(lambda: legacy_extract_keywords_and_analyze(document), number=1, repeat=args.repeat))
+    compiled = min(timeit.repeat(lambda: analyzer.analyze(document), number=1, repeat=args.repeat))
+
+    print(f"document size : {len(document) / 1024 / 1024:.2f} MB")
+    print(f"legacy        : {legacy * 1000:8.1f} ms")
+    print(f"TextAnalyzer  : {compiled * 1000:8.1f} ms")
+    print(f"speedup       : {legacy / compiled:8.2f}x")
+
+
+if __name__ == "__main__":
+    main()
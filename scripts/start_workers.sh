@@ -14,6 +14,11 @@ echo "================================================="
 # Default to starting all workers
 WORKER_TYPE=${1:-"all"}
 
+# io_intensive runs on a greenlet pool with hundreds of slots (IO_WORKER_POOL=threads or
+# prefork to switch); cpu_intensive and coordination stay on prefork
+IO_WORKER_POOL=${IO_WORKER_POOL:-"gevent"}
+IO_WORKER_CONCURRENCY=${IO_WORKER_CONCURRENCY:-200}
+
 # Helper: detect CPU cores
 get_concurrency() {
     if command -v nproc >/dev/null 2>&1; then
@@ -29,14 +34,17 @@ start_worker() {
     local queue=$2
     local concurrency=$3
     local prefetch=$4
+    local metrics_port=$5
+    local pool=${6:-"prefork"}
 
     # cleanup stale pid
     rm -f ./logs/${worker_name}.pid
 
     echo -e "${YELLOW}Starting ${worker_name} worker...${NC}"
 
-    celery -A shinsa.celery_app.app worker \
+    SHINSA_METRICS_PORT=$metrics_port celery -A shinsa.celery_app.app worker \
         --queues=$queue \
+        --pool=$pool \
         --concurrency=$concurrency \
         --prefetch-multiplier=$prefetch \
         --loglevel=info \
@@ -57,35 +65,42 @@ mkdir -p logs
 
 case $WORKER_TYPE in
     "coordination"|"coord")
-        start_worker "coordination" "coordination" 4 10
+        start_worker "coordination" "coordination" 4 10 9808
         ;;
     
     "io"|"io_intensive")
-        start_worker "io_intensive" "io_intensive" 20 4
+        start_worker "io_intensive" "io_intensive" $IO_WORKER_CONCURRENCY 2 9809 $IO_WORKER_POOL
         ;;
     
     "cpu"|"cpu_intensive")
-        start_worker "cpu_intensive" "cpu_intensive" $(get_concurrency) 1
+        start_worker "cpu_intensive" "cpu_intensive" $(get_concurrency) 1 9810
         ;;
     
+    "autoscale"|"autoscaler")
+        echo -e "${YELLOW}Starting queue-depth autoscaler...${NC}"
+        nohup python -m shinsa.celery_app.autoscaler > ./logs/autoscaler.log 2>&1 &
+        echo $! > ./logs/autoscaler.pid
+        echo -e "${GREEN}✓ autoscaler started (pid $(cat ./logs/autoscaler.pid))${NC}"
+        ;;
+
     # "general"|"default")
     #     start_worker "general" "coordination,default" 2 4
     #     ;;
     
     "all")
         echo -e "${YELLOW}Starting all worker types...${NC}"
-        start_worker "coordination" "coordination" 4 10
+        start_worker "coordination" "coordination" 4 10 9808
         sleep 2
-        start_worker "io_intensive" "io_intensive" 20 4
+        start_worker "io_intensive" "io_intensive" $IO_WORKER_CONCURRENCY 2 9809 $IO_WORKER_POOL
         sleep 2
-        start_worker "cpu_intensive" "cpu_intensive" $(get_concurrency) 1
+        start_worker "cpu_intensive" "cpu_intensive" $(get_concurrency) 1 9810
         sleep 2
         # start_worker "general" "coordination,default" 2 4
         ;;
     
     *)
         echo -e "${RED}Unknown worker type: $WORKER_TYPE${NC}"
-        echo "Available types: coordination, io, cpu, general, all"
+        echo "Available types: coordination, io, cpu, autoscale, general, all"
         exit 1
         ;;
 esac
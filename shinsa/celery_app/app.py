@@ -1,5 +1,11 @@
+import importlib
 from celery import Celery
-from .config import CELERY_CONFIG, BEAT_SCHEDULE
+from celery.concurrency import get_implementation
+from celery.concurrency.prefork import TaskPool as PreforkPool
+from celery.signals import worker_init, worker_process_shutdown, worker_shutdown
+from shinsa.utils.logger import LOG_CONFIG, start_log_pipeline, stop_log_pipeline
+from .config import CELERY_CONFIG, BEAT_SCHEDULE, WORKER_PRELOAD_MODULES
+from . import metrics  # noqa: F401 - connects the per-task metrics signal handlers
 
 celery_app = Celery("Shinsa Application")
 celery_app.config_from_object(CELERY_CONFIG)
@@ -14,3 +20,25 @@ celery_app.autodiscover_tasks(
         "shinsa.celery_app.tasks.beat_tasks",
     ]
 )
+
+
+@worker_init.connect
+def preload_worker_modules(**kwargs):
+    for module in WORKER_PRELOAD_MODULES:
+        importlib.import_module(module)
+
+
+@worker_init.connect
+def start_worker_log_pipeline(sender=None, **kwargs):
+    # Created before the pool forks, so prefork children inherit the queue and only enqueue.
+    # gevent and threads pools log from one process; a multiprocessing queue's blocking get()
+    # in the writer would also stall the gevent hub, so they get an in-process queue.
+    if LOG_CONFIG["mode"] == "queue":
+        multiprocess = issubclass(get_implementation(sender.pool_cls), PreforkPool)
+        start_log_pipeline(writer_id=sender.hostname, multiprocess=multiprocess)
+
+
+@worker_process_shutdown.connect
+@worker_shutdown.connect
+def stop_worker_log_pipeline(**kwargs):
+    stop_log_pipeline()
@@ -0,0 +1,252 @@
+"""Queue-depth autoscaler for the io_intensive and cpu_intensive worker pools.
+
+Usage: python -m shinsa.celery_app.autoscaler [--once] [--hostname $(hostname)]
+
+Each tick reads the Redis list length of every managed queue and the mean task
+runtime from that queue's worker metrics endpoint. It then grows or shrinks
+the worker node's pool (pool_grow/pool_shrink: prefork and gevent) toward the
+concurrency that would drain the backlog in target_drain_seconds.
+"""
+
+import math
+import time
+import socket
+import logging
+import argparse
+import urllib.request
+from shinsa.celery_app.config import AUTOSCALE_CONFIG, CELERY_BROKER_URL, CELERY_CONFIG
+
+logger = logging.getLogger(__name__)
+
+
+class RedisQueueDepthSource:
+    """Pending message count per queue from the Redis broker lists, summed over its priority lanes."""
+
+    def __init__(self, client, priority_steps=(), sep=":"):
+        self.client = client
+        # Lane 0 is the queue's own list; kombu keeps every other step in "<queue><sep><step>"
+        self.lanes = [step for step in priority_steps if step]
+        self.sep = sep
+
+    def depths(self, queues):
+        pipe = self.client.pipeline()
+        for queue in queues:
+            pipe.llen(queue)
+            for step in self.lanes:
+                pipe.llen(f"{queue}{self.sep}{step}")
+        lengths = iter(pipe.execute())
+        return {queue: sum(next(lengths) for _ in range(1 + len(self.lanes))) for queue in queues}
+
+
+def build_depth_source(broker_url=CELERY_BROKER_URL):
+    import redis
+
+    options = CELERY_CONFIG["broker_transport_options"]
+    return RedisQueueDepthSource(redis.Redis.from_url(broker_url), options.get("priority_steps", ()), options.get("sep", ":"))
+
+
+class PrometheusRuntimeSource:
+    """Mean task runtime per queue since the previous scrape of each worker's metrics endpoint."""
+
+    def __init__(self, urls, timeout=2):
+        self.urls = urls
+        self.timeout = timeout
+        self._previous = {}
+        self._runtimes = {}
+
+    def scrape(self, url):
+        with urllib.request.urlopen(url, timeout=self.timeout) as response:
+            return response.read().decode("utf-8")
+
+    def totals(self, text, queue):
+        from prometheus_client.parser import text_string_to_metric_families
+
+        total_sum = total_count = 0.0
+        for family in text_string_to_metric_families(text):
+            for sample in family.samples:
+                if sample.labels.get("queue") != queue:
+                    continue
+                if sample.name == "shinsa_task_runtime_seconds_sum":
+                    total_sum += sample.value
+                elif sample.name == "shinsa_task_runtime_seconds_count":
+                    total_count += sample.value
+        return total_sum, total_count
+
+    def runtimes(self, queues):
+        for queue in queues:
+            url = self.urls.get(queue)
+            if not url:
+                continue
+            try:
+                current = self.totals(self.scrape(url), queue)
+            except OSError as exc:
+                logger.warning(f"[Autoscaler] Could not scrape {url}: {exc}")
+                continue
+            previous = self._previous.get(queue, (0.0, 0.0))
+            self._previous[queue] = current
+            finished = current[1] - previous[1]
+            # Counters reset when the worker restarts; fall back to the lifetime mean
+            if finished < 0:
+                previous, finished = (0.0, 0.0), current[1]
+            if finished > 0:
+                self._runtimes[queue] = (current[0] - previous[0]) / finished
+        return dict(self._runtimes)
+
+
+class CeleryPoolControl:
+    """Reads and resizes the pool of the worker node that serves each queue.
+
+    Worker stats keep reporting a pool's boot size as max-concurrency after
+    pool_grow/pool_shrink. The live size is the prefork process list, or for
+    gevent the size last applied to the same worker process (a restarted
+    worker, with a new pid, is back at its boot size).
+    """
+
+    def __init__(self, app, destinations, timeout=1.0):
+        self.app = app
+        self.destinations = destinations
+        self.timeout = timeout
+        self._applied = {}
+
+    def concurrency(self, queue):
+        destination = self.destinations[queue]
+        stats = (self.app.control.inspect(destination=[destination], timeout=self.timeout).stats() or {}).get(destination)
+        if not stats:
+            return None
+        pool = stats.get("pool", {})
+        if "processes" in pool:
+            return len(pool["processes"])
+        pid, size = self._applied.get(queue, (None, None))
+        if pid is None or pid != stats.get("pid"):
+            pid, size = self._applied[queue] = (stats.get("pid"), pool.get("max-concurrency"))
+        return size
+
+    def grow(self, queue, n):
+        self.app.control.pool_grow(n, destination=[self.destinations[queue]])
+        self._apply(queue, n)
+
+    def shrink(self, queue, n):
+        self.app.control.pool_shrink(n, destination=[self.destinations[queue]])
+        self._apply(queue, -n)
+
+    def _apply(self, queue, n):
+        if queue in self._applied:
+            pid, size = self._applied[queue]
+            self._applied[queue] = (pid, size + n)
+
+
+class AutoscaleController:
+    """Sizes each queue's pool to drain its backlog in a target time, with bounds and hysteresis."""
+
+    def __init__(self, depth_source, runtime_source, pool_control, policies, cooldown=30, hysteresis=0.25, scale_down_ticks=3, clock=time.monotonic):
+        self.depth_source = depth_source
+        self.runtime_source = runtime_source
+        self.pool_control = pool_control
+        self.policies = policies
+        self.cooldown = cooldown
+        self.hysteresis = hysteresis
+        self.scale_down_ticks = scale_down_ticks
+        self.clock = clock
+        self._last_change = {}
+        self._below_ticks = {}
+
+    def target(self, queue, depth, runtime):
+        policy = self.policies[queue]
+        needed = math.ceil(depth * runtime / policy["target_drain_seconds"]) if depth else 0
+        return max(policy["min"], min(policy["max"], needed))
+
+    def decide(self, queue, current, depth, runtime):
+        policy = self.policies[queue]
+        target = self.target(queue, depth, runtime)
+        now = self.clock()
+        cooling = now - self._last_change.get(queue, float("-inf")) < self.cooldown
+
+        if current < policy["min"] or (target > current and not cooling):
+            self._below_ticks[queue] = 0
+            return min(max(target, policy["min"]), current + policy["max_step"])
+
+        if current > policy["max"]:
+            return policy["max"]
+
+        # Only shrink once the target has stayed clearly below the current size for a while
+        if target <= current * (1 - self.hysteresis):
+            self._below_ticks[queue] = self._below_ticks.get(queue, 0) + 1
+        else:
+            self._below_ticks[queue] = 0
+        if self._below_ticks[queue] >= self.scale_down_ticks and not cooling:
+            self._below_ticks[queue] = 0
+            return max(target, current - policy["max_step"])
+        return current
+
+    def tick(self):
+        queues = list(self.policies)
+        depths = self.depth_source.depths(queues)
+        runtimes = self.runtime_source.runtimes(queues)
+        decisions = []
+        for queue in queues:
+            current = self.pool_control.concurrency(queue)
+            if current is None:
+                logger.warning(f"[Autoscaler] No worker answered for {queue}; skipping")
+                continue
+            depth = depths.get(queue, 0)
+            runtime = runtimes.get(queue, self.policies[queue]["default_runtime"])
+            desired = self.decide(queue, current, depth, runtime)
+            decision = {"queue": queue, "depth": depth, "runtime": runtime, "current": current, "desired": desired}
+            decisions.append(decision)
+            if desired == current:
+                logger.debug(f"[Autoscaler] {queue}: depth={depth} runtime={runtime:.2f}s concurrency={current}")
+                continue
+
+            logger.info(f"[Autoscaler] {queue}: depth={depth} runtime={runtime:.2f}s concurrency {current} -> {desired}")
+            if desired > current:
+                self.pool_control.grow(queue, desired - current)
+            else:
+                self.pool_control.shrink(queue, current - desired)
+            self._last_change[queue] = self.clock()
+        return decisions
+
+    def run(self, interval):
+        while True:
+            try:
+                self.tick()
+            except Exception as exc:
+                logger.error(f"[Autoscaler] Tick failed: {str(exc)}")
+            time.sleep(interval)
+
+
+def build_controller(hostname=None, config=AUTOSCALE_CONFIG):
+    from shinsa.celery_app.app import celery_app
+
+    hostname = hostname or socket.gethostname()
+    policies = config["queues"]
+    # Worker nodes are named <queue>@<host> by scripts/start_workers.sh
+    destinations = {queue: f"{queue}@{hostname}" for queue in policies}
+    return AutoscaleController(
+        build_depth_source(),
+        PrometheusRuntimeSource({queue: policy["metrics_url"] for queue, policy in policies.items()}),
+        CeleryPoolControl(celery_app, destinations),
+        policies,
+        cooldown=config["cooldown"],
+        hysteresis=config["hysteresis"],
+        scale_down_ticks=config["scale_down_ticks"],
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--hostname", help="Host part of the worker node names (default: this host)")
+    parser.add_argument("--interval", type=float, default=AUTOSCALE_CONFIG["interval"])
+    parser.add_argument("--once", action="store_true", help="Run a single tick and print the decisions")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="[%(asctime)s] | %(levelname)s | %(message)s")
+    controller = build_controller(args.hostname)
+    if args.once:
+        for decision in controller.tick():
+            print(decision)
+        return
+    controller.run(args.interval)
+
+
+if __name__ == "__main__":
+    main()
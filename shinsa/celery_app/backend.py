@@ -0,0 +1,169 @@
+import os
+import time
+import logging
+import threading
+import contextvars
+from kombu.serialization import dumps, loads
+from celery.backends.redis import RedisBackend
+from celery.exceptions import BackendStoreError
+from celery.signals import worker_process_shutdown, worker_shutdown
+from shinsa.celery_app.app import celery_app
+from shinsa.celery_app.config import CELERY_RESULT_BACKEND, CELERY_TASK_ANNOTATIONS, RESULT_BACKEND_CONFIG
+from shinsa.celery_app.serializers import CONTENT_TYPE, is_compressed_payload
+
+logger = logging.getLogger(__name__)
+
+_write_buffer = None
+# Serializer for the result being stored by the current thread/greenlet; None means result_serializer
+_result_serializer = contextvars.ContextVar("result_serializer", default=None)
+
+
+def get_backend_client():
+    # Reuse the Redis result backend's connection pool instead of opening another one
+    return celery_app.backend.client
+
+
+class ResultWriteBuffer:
+    """Task results waiting to be written to Redis, shared by every thread/greenlet of a process.
+
+    Writes are sent as one pipeline once max_batch results are waiting or the oldest
+    has waited max_delay seconds. A result written again before the flush (STARTED,
+    then SUCCESS) only goes out once, with its latest state. `ensure` wraps each
+    write (the backend's connection retry); a write that still fails is kept for
+    the next flush.
+    """
+
+    def __init__(self, client, expires=None, max_batch=100, max_delay=0.05, ensure=None):
+        self.client = client
+        self.expires = expires
+        self.ensure = ensure or (lambda fun, args: fun(*args))
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self.pending = {}
+        self.oldest = None
+        self.pid = os.getpid()
+        self.lock = threading.Lock()
+        self.wakeup = threading.Event()
+        self.flusher = threading.Thread(target=self._run, name="result-write-flusher", daemon=True)
+        self.flusher.start()
+
+    def add(self, key, value):
+        with self.lock:
+            if not self.pending:
+                self.oldest = time.monotonic()
+            self.pending[key] = value
+            full = len(self.pending) >= self.max_batch
+        if full:
+            self.flush()
+        else:
+            self.wakeup.set()
+
+    def flush(self):
+        with self.lock:
+            pending, self.pending = self.pending, {}
+        if not pending:
+            return 0
+        try:
+            self.ensure(self._write, (pending,))
+        except Exception as exc:
+            logger.error(f"[Results] Failed to write {len(pending)} results, retrying: {exc!r}")
+            with self.lock:
+                # Keep anything written again since; it is newer
+                self.pending = {**pending, **self.pending}
+                # Try again in a second rather than every max_delay
+                self.oldest = time.monotonic() + 1
+            return 0
+        return len(pending)
+
+    def _write(self, pending):
+        with self.client.pipeline(transaction=False) as pipe:
+            for key, value in pending.items():
+                pipe.set(key, value, ex=self.expires or None)
+                pipe.publish(key, value)
+            pipe.execute()
+
+    def _run(self):
+        while True:
+            self.wakeup.wait()
+            self.wakeup.clear()
+            while self.oldest is not None and self.pending:
+                remaining = self.oldest + self.max_delay - time.monotonic()
+                if remaining > 0:
+                    time.sleep(remaining)
+                    continue
+                self.flush()
+
+
+def get_write_buffer(backend):
+    # One per process: prefork children build their own after the fork
+    global _write_buffer
+    if _write_buffer is None or _write_buffer.pid != os.getpid():
+        _write_buffer = ResultWriteBuffer(
+            backend.client, backend.expires, max_batch=RESULT_BACKEND_CONFIG["max_batch"], max_delay=RESULT_BACKEND_CONFIG["max_delay"], ensure=backend.ensure
+        )
+    return _write_buffer
+
+
+def flush_result_writes():
+    if _write_buffer is not None and _write_buffer.pid == os.getpid():
+        return _write_buffer.flush()
+    return 0
+
+
+@worker_process_shutdown.connect
+@worker_shutdown.connect
+def flush_results_on_shutdown(**kwargs):
+    flush_result_writes()
+
+
+class BatchingRedisBackend(RedisBackend):
+    """Redis result backend that writes task results through the process's ResultWriteBuffer.
+
+    Only task states (celery-task-meta-* keys) are batched; group metadata and chord
+    counters are written at once because other workers read them straight away.
+
+    Durability: a task's result reaches Redis up to max_delay seconds after the task
+    returns (longer while Redis is unreachable). The buffer is flushed on worker and
+    child shutdown, but results still buffered when a process is killed outright
+    (SIGKILL, OOM killer, hard time limit) are lost, although their messages were acked.
+    Set RESULT_BATCH_WRITES=false where that window is not acceptable.
+
+    Results (and chord parts) are encoded with their task's annotated serializer, so only
+    the payload-heavy tasks store msgpack-z; everything else uses result_serializer.
+    """
+
+    def __init__(self, url=None, **kwargs):
+        super().__init__(url=url or CELERY_RESULT_BACKEND, **kwargs)
+
+    def _serializer_for(self, request):
+        return CELERY_TASK_ANNOTATIONS.get(getattr(request, "task", None), {}).get("serializer")
+
+    def store_result(self, task_id, result, state, traceback=None, request=None, **kwargs):
+        token = _result_serializer.set(self._serializer_for(request))
+        try:
+            return super().store_result(task_id, result, state, traceback=traceback, request=request, **kwargs)
+        finally:
+            _result_serializer.reset(token)
+
+    def on_chord_part_return(self, request, state, result, **kwargs):
+        token = _result_serializer.set(self._serializer_for(request))
+        try:
+            return super().on_chord_part_return(request, state, result, **kwargs)
+        finally:
+            _result_serializer.reset(token)
+
+    def _encode(self, data):
+        return dumps(data, serializer=_result_serializer.get() or self.serializer)
+
+    def decode(self, payload):
+        if is_compressed_payload(payload):
+            return loads(payload, content_type=CONTENT_TYPE, content_encoding="binary", accept=self.accept)
+        return super().decode(payload)
+
+    def _set_with_state(self, key, value, state):
+        if not RESULT_BACKEND_CONFIG["batch_writes"] or not key.startswith(self.task_keyprefix):
+            return super()._set_with_state(key, value, state)
+        # The limit RedisBackend.set enforces, checked before the result is buffered (msgpack-z results are bytes)
+        if isinstance(value, (str, bytes)) and len(value) > self._MAX_STR_VALUE_SIZE:
+            raise BackendStoreError("value too large for Redis backend")
+        get_write_buffer(self).add(key, value)
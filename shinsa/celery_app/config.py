@@ -1,13 +1,281 @@
 import os
-from dotenv import load_dotenv
+import tempfile
 from kombu import Exchange, Queue
 from celery.schedules import crontab
+from shinsa.celery_app.serializers import MSGPACK_COMPRESSED, register_serializers, build_serializer_annotations
 
-load_dotenv()
+
+def load_env_file():
+    # Same lookup as load_dotenv() (this directory, then its parents), but python-dotenv is only
+    # imported when a .env file actually exists; deployments that set the environment skip it.
+    directory = os.path.dirname(os.path.abspath(__file__))
+    while True:
+        path = os.path.join(directory, ".env")
+        if os.path.isfile(path):
+            from dotenv import load_dotenv
+
+            load_dotenv(path)
+            return path
+        parent = os.path.dirname(directory)
+        if parent == directory:
+            return None
+        directory = parent
+
+
+load_env_file()
 REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
 CELERY_BROKER_URL = REDIS_URL
 CELERY_RESULT_BACKEND = REDIS_URL
 
+# Simulated work (seconds) standing in for real crawling/analysis in demo mode.
+# SIMULATED_LATENCY_SCALE scales every stage, e.g. 0.001 for benchmarks or 0 to disable.
+SIMULATED_LATENCY_SCALE = float(os.getenv("SIMULATED_LATENCY_SCALE", "1"))
+SIMULATED_LATENCIES = {
+    stage: seconds * SIMULATED_LATENCY_SCALE
+    for stage, seconds in {
+        "find_customer_links": 120,
+        "crawl_link": 130,
+        "fetch_page_content": 2,
+        "analyze_content": 140,
+        "extract_keywords": 0.5,
+    }.items()
+}
+
+# Crawl engine (set CRAWL_LIVE_FETCH=true to fetch real pages instead of mock content)
+CRAWL_LIVE_FETCH = os.getenv("CRAWL_LIVE_FETCH", "false").lower() == "true"
+FETCH_ENGINE_CONFIG = {
+    "limit": int(os.getenv("FETCH_MAX_CONNECTIONS", "500")),
+    "limit_per_host": int(os.getenv("FETCH_MAX_PER_HOST", "8")),
+    "dns_ttl": 300,
+    "timeout": 10,
+}
+
+# Per-domain politeness for live crawls: a token bucket per domain in Redis shared by every
+# worker. crawl_link waits for its slot when it is at most max_wait away and is otherwise
+# deferred with a countdown to the slot (429/503 responses hold the domain for Retry-After);
+# batch crawls stagger their requests per domain. Off by default for mock crawls.
+CRAWL_RATE_LIMIT_CONFIG = {
+    "enabled": os.getenv("CRAWL_RATE_LIMIT_ENABLED", str(CRAWL_LIVE_FETCH)).lower() == "true",
+    "rate": float(os.getenv("CRAWL_DOMAIN_RATE", "2")),
+    "burst": int(os.getenv("CRAWL_DOMAIN_BURST", "4")),
+    "domains": {
+        "linkedin.com": {"rate": 0.5, "burst": 2},
+        "twitter.com": {"rate": 1, "burst": 2},
+    },
+    "max_wait": 5,
+}
+
+# Retries (shinsa/celery_app/retries.py): fatal errors (bugs, bad input, 4xx) fail at once;
+# transient ones retry after uniform(0, min(cap, base * 2**n)) seconds, at most max_retries
+# times. "tasks" overrides the default per task name.
+RETRY_POLICY_CONFIG = {
+    "default": {"base": 10, "cap": 300, "max_retries": 3},
+    "tasks": {
+        "crawl_link": {"base": 15, "cap": 600, "max_retries": 5},
+        "crawl_links_batch": {"base": 15, "cap": 600, "max_retries": 3},
+        "fetch_page_content": {"base": 5, "cap": 300, "max_retries": 3},
+        "analyze_content": {"base": 5, "cap": 120, "max_retries": 2},
+        "analyze_content_batch": {"base": 5, "cap": 120, "max_retries": 2},
+        "extract_keywords": {"base": 5, "cap": 120, "max_retries": 2},
+        "process_customer_workflow": {"base": 30, "cap": 600, "max_retries": 3},
+        "process_customers_batch": {"base": 30, "cap": 600, "max_retries": 3},
+    },
+}
+
+# Circuit breaker per crawled host, shared through Redis: failure_threshold network errors or
+# 5xx responses within `window` seconds make requests to the host fail fast for open_seconds,
+# then a single probe request decides whether it is back. Off by default for mock crawls.
+CIRCUIT_BREAKER_CONFIG = {
+    "enabled": os.getenv("CIRCUIT_BREAKER_ENABLED", str(CRAWL_LIVE_FETCH)).lower() == "true",
+    "failure_threshold": int(os.getenv("CIRCUIT_FAILURE_THRESHOLD", "5")),
+    "window": 60,
+    "open_seconds": int(os.getenv("CIRCUIT_OPEN_SECONDS", "60")),
+    "probe_timeout": 30,
+}
+
+# Crawl content cache (Redis result backend + in-process LRU)
+CRAWL_CACHE_CONFIG = {
+    "enabled": os.getenv("CRAWL_CACHE_ENABLED", "true").lower() == "true",
+    "ttl": int(os.getenv("CRAWL_CACHE_TTL", str(6 * 3600))),
+    "stale_ttl": int(os.getenv("CRAWL_CACHE_STALE_TTL", str(7 * 24 * 3600))),
+    "max_entries": int(os.getenv("CRAWL_CACHE_MAX_ENTRIES", "100000")),
+    "local_max_entries": 1024,
+    "local_max_bytes": 64 * 1024 * 1024,
+}
+
+# Request deduplication: identical crawls (same normalized URL) and analyses (same content)
+# run once; concurrent duplicates wait for the in-flight one and finished results are reused
+# for `window` seconds. lock_ttl matches task_time_limit; waiters give up before the soft limit.
+DEDUP_CONFIG = {
+    "enabled": os.getenv("DEDUP_ENABLED", "true").lower() == "true",
+    "window": int(os.getenv("DEDUP_WINDOW", "300")),
+    "lock_ttl": 600,
+    "wait_timeout": 300,
+    "poll_interval": 0.05,
+}
+
+# Claim check: page content above the threshold is written once to a blob store and only
+# a reference travels through the chain. "redis": keys with a TTL in the result backend,
+# readable by every worker. "file": memory-mapped files under CLAIM_CHECK_PATH (required),
+# which every worker host must share; cleanup_task removes file blobs older than ttl.
+CLAIM_CHECK_CONFIG = {
+    "enabled": os.getenv("CLAIM_CHECK_ENABLED", "true").lower() == "true",
+    "store": os.getenv("CLAIM_CHECK_STORE", "redis"),
+    "threshold": int(os.getenv("CLAIM_CHECK_THRESHOLD", str(16 * 1024))),
+    "path": os.getenv("CLAIM_CHECK_PATH"),
+    "ttl": 24 * 3600,
+}
+
+# Incremental report aggregation: analyses are folded into Redis as they finish
+REPORT_AGGREGATION_CONFIG = {
+    "enabled": os.getenv("REPORT_AGGREGATION_ENABLED", "true").lower() == "true",
+    "ttl": 24 * 3600,
+    "top_k": 15,
+}
+
+# Report store: every customer and batch report is also written to a local SQLite database
+# (WAL), indexed by customer, time, sentiment and keywords, for lookups without the result backend.
+# Each host keeps its own file, holding the reports its workers generated; by default it lives
+# in the data directory (SHINSA_DATA_DIR, <project>/data), next to logs/.
+DATA_DIR = os.getenv("SHINSA_DATA_DIR", os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), "data"))
+REPORT_STORE_CONFIG = {
+    "enabled": os.getenv("REPORT_STORE_ENABLED", "true").lower() == "true",
+    "path": os.getenv("REPORT_STORE_PATH", os.path.join(DATA_DIR, "reports.sqlite3")),
+    "busy_timeout": 30,
+}
+
+# Change detection: each URL's last analysis is kept with its content fingerprint (SHA-256 and a
+# 64-bit simhash over word shingles). A recrawl matching exactly, or within max_distance bits,
+# reuses that analysis instead of taking a cpu_intensive slot again.
+CHANGE_DETECTION_CONFIG = {
+    "enabled": os.getenv("CHANGE_DETECTION_ENABLED", "true").lower() == "true",
+    "ttl": int(os.getenv("CHANGE_DETECTION_TTL", str(7 * 24 * 3600))),
+    "max_distance": int(os.getenv("CHANGE_DETECTION_MAX_DISTANCE", "3")),
+    "shingle_size": 3,
+}
+
+# Link discovery: names are normalized and transliterated once, then looked up in a prebuilt,
+# memory-mapped index of known profile handles (python -m shinsa.utils.handle_index). Sites
+# without a known handle get a candidate built from the name, and only those candidates are
+# checked, concurrently (live crawls only). The batched workflow discovers links for up to
+# customers_per_batch customers per task. The index lives in the data directory by default.
+LINK_DISCOVERY_CONFIG = {
+    "index_path": os.getenv("HANDLE_INDEX_PATH", os.path.join(DATA_DIR, "handles.idx")),
+    "customers_per_batch": int(os.getenv("LINK_DISCOVERY_BATCH_SIZE", "100")),
+    "check_candidates": CRAWL_LIVE_FETCH,
+    # site: (profile URL template, separator between name parts in a handle)
+    "sites": {
+        "example.com": ("https://example.com/{}", "_"),
+        "socialmedia.com": ("https://socialmedia.com/{}", ""),
+        "linkedin.com": ("https://linkedin.com/in/{}", "-"),
+        "twitter.com": ("https://twitter.com/{}", "_"),
+    },
+}
+
+# Batched workflow: links from many customers are crawled and analyzed together,
+# one crawl_links_batch -> analyze_content_batch chain per batch
+WORKFLOW_BATCH_CONFIG = {
+    "links_per_batch": int(os.getenv("WORKFLOW_LINKS_PER_BATCH", "50")),
+}
+
+# Streaming ingestion (python -m shinsa.celery_app.ingest): customers are read lazily and
+# submitted `window` at a time, each window its own workflow whose totals are folded into a
+# batch summary in Redis. Windows are recorded once dispatched, before their crawls run, so
+# queue depth is the only throttle: submission pauses while the pipeline queues hold more than
+# max_queue_depth messages, and gives up after max_wait seconds.
+INGEST_CONFIG = {
+    "window": int(os.getenv("INGEST_WINDOW", "500")),
+    "max_queue_depth": int(os.getenv("INGEST_MAX_QUEUE_DEPTH", "20000")),
+    "poll_interval": 2.0,
+    "max_wait": float(os.getenv("INGEST_MAX_WAIT", "3600")),
+    "queues": ["coordination", "io_intensive", "cpu_intensive"],
+    "summary_ttl": 24 * 3600,
+}
+
+# Result backend usage. Results that only feed the next task of a chain or a chord (Redis chords
+# collect header results in their own join keys) are not stored; reports, standalone tasks and
+# failures still are. find_customer_links is also called standalone, so workflows drop its result
+# per call (ignore_result=True where they chain it). Stored results and chord join keys expire
+# after `expires` seconds, so it must outlast the longest gap between a chord's header tasks.
+# Each worker process writes task results in pipelined batches of up to max_batch, at most max_delay
+# seconds after the task finished; a process killed outright loses the results it still buffers.
+RESULT_BACKEND_CONFIG = {
+    "expires": int(os.getenv("RESULT_EXPIRES", str(6 * 3600))),
+    "ignore_results": [
+        "find_customer_links_batch",
+        "process_customer_workflow",
+        "process_customers_batch",
+        "crawl_link",
+        "crawl_links_batch",
+        "analyze_content",
+        "analyze_content_batch",
+        "record_ingest_window",
+    ],
+    "batch_writes": os.getenv("RESULT_BATCH_WRITES", "true").lower() == "true",
+    "max_batch": 100,
+    "max_delay": 0.05,
+}
+
+# Redis cleanup (cleanup_task, hourly). Every key this app writes under these patterns has a
+# TTL, so one without a TTL that has been idle for min_idle seconds leaked (written with expiry
+# disabled, or left behind by a crash). Each run continues a SCAN sweep from its checkpoint and
+# UNLINKs leaks in batches until the sweep completes or time_budget/max_ops run out. Counters and
+# indexes that are meant to persist (crawl-cache:lru, */stats:*) are not listed.
+REDIS_CLEANUP_CONFIG = {
+    "patterns": [
+        "celery-task-meta-*",
+        "celery-taskset-meta-*",  # group results and chord counters
+        "claim-check:*",
+        "crawl-cache:url:*",
+        "crawl-cache:content:*",
+        "report-agg:*",
+        "batch-summary:*",
+        "page-fingerprint:url:*",
+        "dedup:*:result:*",
+        "dedup:*:lock:*",
+    ],
+    "scan_count": 1000,
+    "batch_size": 500,
+    "min_idle": 600,
+    "time_budget": int(os.getenv("REDIS_CLEANUP_TIME_BUDGET", "30")),
+    "max_ops": 100000,
+    "pause": 0.01,
+}
+
+# Heavy modules only tasks need (NumPy, aiohttp). Task modules import them on first use so
+# producers never pay for them; workers import them at boot, before the pool forks.
+WORKER_PRELOAD_MODULES = ["shinsa.utils.batch_analyzer", "shinsa.utils.page_fingerprint", "shinsa.utils.http_fetcher"]
+
+# Per-worker Prometheus endpoint (queue wait, runtime, payload size, retries per task and queue).
+# Each worker node on a host needs its own SHINSA_METRICS_PORT; prefork children share it
+# through a multiprocess directory under multiproc_root.
+METRICS_CONFIG = {
+    "enabled": os.getenv("SHINSA_METRICS_ENABLED", "true").lower() == "true",
+    "port": int(os.getenv("SHINSA_METRICS_PORT", "9808")),
+    "addr": os.getenv("SHINSA_METRICS_ADDR", "127.0.0.1"),
+    "multiproc_root": os.path.join(tempfile.gettempdir(), "shinsa-metrics"),
+}
+
+# Serialization: payload-heavy queues use msgpack with size-threshold compression, for their
+# messages and, through the result backend, for their stored results and chord parts. Other
+# results stay json. Set PAYLOAD_SERIALIZER=json to fall back, or add "serializer" to a single route.
+register_serializers()
+PAYLOAD_SERIALIZER = os.getenv("PAYLOAD_SERIALIZER", MSGPACK_COMPRESSED)
+CELERY_QUEUE_SERIALIZERS = {
+    "io_intensive": PAYLOAD_SERIALIZER,
+    "cpu_intensive": PAYLOAD_SERIALIZER,
+}
+
+# Priority lanes. The Redis transport splits each queue into one list per priority step and
+# always pops the lowest step first (0 = most urgent). Messages without a priority would land
+# in lane 0, so task_default_priority puts them in "default". Children inherit their parent's
+# priority; workflows also set it explicitly on every signature they build.
+TASK_PRIORITIES = {
+    "interactive": 0,
+    "default": 3,
+    "batch": 6,
+}
+
 # Exchanges
 default_exchange = Exchange("default", type="direct")
 io_exchange = Exchange("io_intensive", type="direct")
@@ -17,18 +285,30 @@ orchestration_exchange = Exchange("orchestration", type="direct")
 CELERY_TASK_ROUTES = {
     # Coordination tasks (fast, lightweight)
     "find_customer_links": {"queue": "coordination"},
+    "find_customer_links_batch": {"queue": "coordination"},
     "process_customer_workflow": {"queue": "coordination"},
     "generate_customer_report": {"queue": "coordination"},
     "batch_generate_report": {"queue": "coordination"},
+    "process_customers_batch": {"queue": "coordination"},
+    "generate_customer_reports_batch": {"queue": "coordination"},
+    "record_ingest_window": {"queue": "coordination"},
+    "record_failed_ingest_window": {"queue": "coordination"},
+    "finish_ingest_batch": {"queue": "coordination"},
     # I/O intensive tasks
     "crawl_link": {"queue": "io_intensive"},
     "fetch_page_content": {"queue": "io_intensive"},
+    "crawl_links_batch": {"queue": "io_intensive"},
+    "crawl_cache_stats": {"queue": "io_intensive"},
+    "dedup_stats": {"queue": "io_intensive"},
+    "change_detection_stats": {"queue": "io_intensive"},
+    "cleanup_task": {"queue": "io_intensive"},
     # CPU intensive tasks
     "analyze_content": {"queue": "cpu_intensive"},
     "extract_keywords": {"queue": "cpu_intensive"},
+    "analyze_content_batch": {"queue": "cpu_intensive"},
 }
 
-# Queue definitions
+# Queue definitions (x-max-priority only applies on RabbitMQ, where higher numbers win)
 CELERY_TASK_QUEUES = (
     Queue(
         "coordination",
@@ -54,12 +334,19 @@ CELERY_TASK_QUEUES = (
     #     routing_key="default",
     # ),
 )
+# Per-task serializer and result storage policy
+CELERY_TASK_ANNOTATIONS = build_serializer_annotations(CELERY_TASK_ROUTES, CELERY_QUEUE_SERIALIZERS)
+for task_name in RESULT_BACKEND_CONFIG["ignore_results"]:
+    CELERY_TASK_ANNOTATIONS.setdefault(task_name, {}).update(ignore_result=True, store_errors_even_if_ignored=True)
 CELERY_CONFIG = {
     "broker_url": CELERY_BROKER_URL,
-    "result_backend": CELERY_RESULT_BACKEND,
+    "result_backend": "shinsa.celery_app.backend:BatchingRedisBackend",  # at CELERY_RESULT_BACKEND
+    "result_expires": RESULT_BACKEND_CONFIG["expires"],
     "task_serializer": "json",
-    "accept_content": ["json"],
+    "accept_content": ["json", MSGPACK_COMPRESSED],
     "result_serializer": "json",
+    "result_accept_content": ["json", MSGPACK_COMPRESSED],
+    "task_annotations": CELERY_TASK_ANNOTATIONS,
     "timezone": "UTC",
     "enable_utc": True,
     "task_track_started": True,
@@ -69,31 +356,71 @@ CELERY_CONFIG = {
     "task_acks_late": True,
     "worker_disable_rate_limits": True,
     "task_routes": CELERY_TASK_ROUTES,
+    "task_default_priority": TASK_PRIORITIES["default"],
+    "task_inherit_parent_priority": True,
+    "broker_transport_options": {"priority_steps": sorted(TASK_PRIORITIES.values()), "sep": ":"},
     # "task_default_queue": "default",
     "task_queues": CELERY_TASK_QUEUES,
     "worker_send_task_events": True,
     "task_send_sent_event": True,
 }
 
-# Worker configurations
+# Worker configurations. Prefetched messages skip the priority lanes, so workers reserve at
+# most one message per slot.
 WORKER_CONFIGS = {
     "coordination": {
+        "pool": "prefork",
         "concurrency": 4,
-        "prefetch_multiplier": 10,
+        "prefetch_multiplier": 1,
         "queues": ["coordination"],
     },
     "io_intensive": {
-        "concurrency": 20,
-        "prefetch_multiplier": 4,
+        # Greenlets: hundreds of concurrent crawls in one process. "threads" also works (no
+        # pool_grow/pool_shrink, so no autoscaling); crawl code is safe under both. A gevent
+        # pool's stats keep its boot size after a resize; the autoscaler tracks what it applied.
+        "pool": os.getenv("IO_WORKER_POOL", "gevent"),
+        "concurrency": int(os.getenv("IO_WORKER_CONCURRENCY", "200")),
+        "prefetch_multiplier": 1,
         "queues": ["io_intensive"],
     },
     "cpu_intensive": {
+        "pool": "prefork",
         "concurrency": 0,  # Auto-detect CPU cores
         "prefetch_multiplier": 1,
         "queues": ["cpu_intensive"],
     },
 }
 
+# Queue-depth autoscaler (python -m shinsa.celery_app.autoscaler). Pools are resized with
+# pool_grow/pool_shrink on the worker node serving each queue, within min/max. A queue is
+# sized to drain its backlog in target_drain_seconds, using the mean task runtime scraped
+# from the worker's metrics endpoint (default_runtime until one is available). Scale-downs
+# wait for the target to stay below (1 - hysteresis) x current for scale_down_ticks ticks.
+AUTOSCALE_CONFIG = {
+    "interval": float(os.getenv("AUTOSCALE_INTERVAL", "10")),
+    "cooldown": 30,
+    "hysteresis": 0.25,
+    "scale_down_ticks": 3,
+    "queues": {
+        "io_intensive": {
+            "min": 50,
+            "max": int(os.getenv("AUTOSCALE_IO_MAX", "1000")),
+            "target_drain_seconds": 60,
+            "default_runtime": 1.0,
+            "max_step": 100,
+            "metrics_url": "http://127.0.0.1:9809/metrics",
+        },
+        "cpu_intensive": {
+            "min": 1,
+            "max": int(os.getenv("AUTOSCALE_CPU_MAX", str(os.cpu_count() or 1))),
+            "target_drain_seconds": 60,
+            "default_runtime": 1.0,
+            "max_step": 4,
+            "metrics_url": "http://127.0.0.1:9810/metrics",
+        },
+    },
+}
+
 BEAT_SCHEDULE = {
     "hello-every-15-sec": {
         "task": "say_hello_task",
@@ -101,9 +428,9 @@ BEAT_SCHEDULE = {
         "args": ("Beat User",),
         "options": {"queue": "coordination"},  # custom queue
     },
-    "cleanup-every-midnight": {
+    "cleanup-redis-every-hour": {
         "task": "cleanup_task",
-        "schedule": crontab(hour=0, minute=0),
-        "options": {"queue": "io-intensive"},  # another queue
+        "schedule": crontab(minute=0),
+        "options": {"queue": "io_intensive"},  # another queue
     },
 }
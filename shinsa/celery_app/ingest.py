@@ -0,0 +1,158 @@
+"""Streaming customer ingestion: submit workflows for a JSONL or CSV customer file in bounded windows.
+
+Usage: python -m shinsa.celery_app.ingest customers.jsonl [--format jsonl|csv] [--window 500]
+                                          [--mode batched|per-customer] [--priority batch]
+                                          [--max-queue-depth 20000] [--max-wait 3600] [--batch-id ID]
+
+Customers are read one row at a time and submitted `window` at a time, each window
+its own workflow ending in record_ingest_window, which folds the window's totals
+into the batch summary in Redis. A window is recorded once its workflows have been
+dispatched, before their crawls and analyses run, so the only backpressure is queue
+depth: before each window the submitter waits while the pipeline queues hold more
+than --max-queue-depth messages, and gives up after --max-wait seconds. A window
+whose workflow fails is folded in as failed by its errback. Once the last window is
+in, finish_ingest_batch builds the batch report; its task id is ingest-report-<batch id>.
+"""
+
+import csv
+import json
+import time
+import uuid
+import logging
+import argparse
+import itertools
+from shinsa.celery_app.config import INGEST_CONFIG, TASK_PRIORITIES
+
+logger = logging.getLogger(__name__)
+
+
+def iter_customers(path, format=None):
+    """Yield customer dicts from a JSONL file (one object per line) or a CSV file with a header row."""
+    format = format or ("csv" if path.lower().endswith(".csv") else "jsonl")
+    with open(path, newline="", encoding="utf-8") as file:
+        if format == "csv":
+            for row in csv.DictReader(file):
+                yield {field: value for field, value in row.items() if field and value}
+            return
+        for line_number, line in enumerate(file, 1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError as exc:
+                logger.warning(f"[Ingest] Skipping line {line_number} of {path}: {exc}")
+
+
+def windows(customers, size):
+    iterator = iter(customers)
+    while chunk := list(itertools.islice(iterator, size)):
+        yield chunk
+
+
+def build_window_workflow(customers, batch_id, window, mode="batched", priority=TASK_PRIORITIES["batch"]):
+    from celery import chord, group
+    from shinsa.celery_app.tasks.customer_tasks import customer_workflow, customers_batch_workflow
+    from shinsa.celery_app.tasks.report_tasks import record_ingest_window, record_failed_ingest_window
+
+    record = record_ingest_window.s(batch_id, window, len(customers)).set(priority=priority)
+    if mode == "per-customer":
+        workflow = chord(group([customer_workflow(customer, priority) for customer in customers]), record)
+    else:
+        workflow = customers_batch_workflow(customers, priority) | record
+    # A failed task keeps `record` from running; the errback folds the window in as failed
+    return workflow.on_error(record_failed_ingest_window.s(batch_id, window, len(customers)))
+
+
+def start_batch_report(batch_id):
+    from shinsa.celery_app.tasks.report_tasks import finish_ingest_batch, ingest_report_id
+
+    return finish_ingest_batch.apply_async(args=[batch_id], task_id=ingest_report_id(batch_id))
+
+
+class CustomerIngestor:
+    """Submits a stream of customers window by window, holding back while the pipeline is full."""
+
+    def __init__(self, submit_window, finish_batch, depth_source, summary, queues, window=500, max_queue_depth=20000, poll_interval=2.0, max_wait=3600, sleep=time.sleep):
+        self.submit_window = submit_window
+        self.finish_batch = finish_batch
+        self.depth_source = depth_source
+        self.summary = summary
+        self.queues = queues
+        self.window = window
+        self.max_queue_depth = max_queue_depth
+        self.poll_interval = poll_interval
+        self.max_wait = max_wait
+        self.sleep = sleep
+
+    def wait_for_room(self, batch_id):
+        """Block until the pipeline queues are below max_queue_depth; return the seconds waited.
+
+        Raises TimeoutError once that has taken more than `max_wait` seconds.
+        """
+        waited = 0.0
+        while True:
+            depth = sum(self.depth_source.depths(self.queues).values())
+            if depth <= self.max_queue_depth:
+                return waited
+            if waited >= self.max_wait:
+                raise TimeoutError(f"Batch {batch_id} made no room in {waited:.0f}s: {depth} queued messages")
+            if not waited:
+                logger.info(f"[Ingest] Pausing batch {batch_id}: {depth} queued messages")
+            self.sleep(self.poll_interval)
+            waited += self.poll_interval
+
+    def run(self, customers, batch_id):
+        submitted = customers_count = 0
+        paused = 0.0
+        try:
+            for chunk in windows(customers, self.window):
+                paused += self.wait_for_room(batch_id)
+                self.submit_window(chunk, batch_id, submitted)
+                submitted += 1
+                customers_count += len(chunk)
+                if submitted % 100 == 0:
+                    logger.info(f"[Ingest] Batch {batch_id}: submitted {customers_count} customers in {submitted} windows")
+        finally:
+            # Every window may already be done, in which case the batch report is started here. A
+            # submitter that gave up still closes the batch, so the report covers what was submitted
+            if self.summary.close(batch_id, submitted):
+                self.finish_batch(batch_id)
+        logger.info(f"[Ingest] Batch {batch_id}: submitted {customers_count} customers in {submitted} windows, paused {paused:.0f}s")
+        return {"batch_id": batch_id, "customers": customers_count, "windows": submitted, "paused_seconds": paused}
+
+
+def build_ingestor(mode="batched", priority=TASK_PRIORITIES["batch"], config=INGEST_CONFIG, **overrides):
+    from shinsa.celery_app.autoscaler import build_depth_source
+    from shinsa.celery_app.tasks.report_tasks import get_batch_summary
+
+    def submit_window(customers, batch_id, window):
+        build_window_workflow(customers, batch_id, window, mode, priority).apply_async(priority=priority)
+
+    options = {key: config[key] for key in ("window", "max_queue_depth", "poll_interval", "max_wait")}
+    options.update({key: value for key, value in overrides.items() if value is not None})
+    return CustomerIngestor(submit_window, start_batch_report, build_depth_source(), get_batch_summary(), config["queues"], **options)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("path")
+    parser.add_argument("--format", choices=["jsonl", "csv"], help="default: from the file extension")
+    parser.add_argument("--window", type=int)
+    parser.add_argument("--mode", choices=["batched", "per-customer"], default="batched")
+    parser.add_argument("--priority", choices=list(TASK_PRIORITIES), default="batch")
+    parser.add_argument("--max-queue-depth", type=int)
+    parser.add_argument("--max-wait", type=float, help="seconds to wait for room before giving up")
+    parser.add_argument("--batch-id", default=None)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="[%(asctime)s] | %(levelname)s | %(message)s")
+    batch_id = args.batch_id or uuid.uuid4().hex
+    ingestor = build_ingestor(args.mode, TASK_PRIORITIES[args.priority], window=args.window, max_queue_depth=args.max_queue_depth, max_wait=args.max_wait)
+    result = ingestor.run(iter_customers(args.path, args.format), batch_id)
+    print(result)
+    print(f"Batch report task id: ingest-report-{batch_id}")
+
+
+if __name__ == "__main__":
+    main()
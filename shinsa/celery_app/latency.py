@@ -0,0 +1,9 @@
+import time
+from shinsa.celery_app.config import SIMULATED_LATENCIES
+
+
+def simulate_latency(stage):
+    # Stand-in for real work in demo mode; read from config so benchmarks can shrink it
+    seconds = SIMULATED_LATENCIES.get(stage, 0)
+    if seconds > 0:
+        time.sleep(seconds)
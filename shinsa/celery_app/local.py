@@ -0,0 +1,137 @@
+"""Run the customer workflow inside one process, without a broker or result backend.
+
+Usage: python -m shinsa.celery_app.local customers.jsonl [--format jsonl|csv] [--output reports.jsonl]
+                                         [--workers N] [--concurrency 16]
+
+Each customer goes through the same stages as customer_workflow: find_customer_links,
+a crawl of every link, one analysis per page and the customer report. The report is
+built exactly as generate_customer_report builds it and written as one JSON line.
+Stages run on an asyncio loop: link discovery and crawls off the loop in threads (live
+crawls go through the shared aiohttp engine), analyses in a process pool. Reports are
+still written to the report store.
+"""
+
+import os
+import sys
+import json
+import uuid
+import asyncio
+import logging
+import argparse
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from shinsa.celery_app import config
+from shinsa.celery_app.tasks import crawl_tasks, report_tasks
+from shinsa.celery_app.tasks.analysis_tasks import build_analysis_result, compute_analysis
+from shinsa.celery_app.tasks.customer_tasks import find_customer_links
+from shinsa.utils.retry_policy import FetchError
+
+logger = logging.getLogger(__name__)
+
+
+def init_analysis_process(latencies):
+    # Pool processes start from a fresh interpreter; carry over the parent's (possibly scaled) latencies
+    config.SIMULATED_LATENCIES.update(latencies)
+
+
+class LocalExecutor:
+    """Runs customer workflows on an asyncio loop, with analyses in a process pool.
+
+    The pool is started on first use and kept until `close`, so repeated
+    requests pay its start-up once. Up to `concurrency` customers are in
+    flight at a time.
+    """
+
+    def __init__(self, max_workers=None, concurrency=16):
+        self.max_workers = max_workers or os.cpu_count()
+        self.concurrency = concurrency
+        self._pool = None
+
+    def analysis_pool(self):
+        if self._pool is None:
+            # forkserver: the loop's threads are running by now, and forking them is unsafe
+            self._pool = ProcessPoolExecutor(
+                self.max_workers,
+                mp_context=multiprocessing.get_context("forkserver"),
+                initializer=init_analysis_process,
+                initargs=(dict(config.SIMULATED_LATENCIES),),
+            )
+        return self._pool
+
+    def run(self, customer):
+        """Return the customer's report; a link that cannot be crawled raises FetchError, as crawl_link would fail."""
+        return asyncio.run(self.run_customer(customer))
+
+    def run_many(self, customers):
+        return asyncio.run(self.run_customers(customers))
+
+    async def run_customers(self, customers):
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def run_one(customer):
+            async with semaphore:
+                try:
+                    return await self.run_customer(customer)
+                except Exception as exc:
+                    logger.error(f"[Local] Workflow failed for {customer.get('name', 'unknown')}: {str(exc)}")
+                    return {"customer": customer, "error": str(exc)}
+
+        outcomes = await asyncio.gather(*(run_one(customer) for customer in customers))
+        return {"reports": [outcome for outcome in outcomes if "error" not in outcome], "failed": [outcome for outcome in outcomes if "error" in outcome]}
+
+    async def run_customer(self, customer):
+        links = (await asyncio.to_thread(find_customer_links, customer))["links"]
+
+        # The links of a customer are fetched together, as one concurrent round
+        crawled = []
+        for link, response in zip(links, await asyncio.to_thread(crawl_tasks.fetch_urls, links)):
+            if response["error"]:
+                raise FetchError.from_response(response)
+            crawled.append({"customer": customer, "link": link, "content": response["content"], "content_length": len(response["content"]), "crawl_task_id": None, "status": "success"})
+
+        loop = asyncio.get_running_loop()
+        pool = self.analysis_pool()
+        analyses = await asyncio.gather(*(loop.run_in_executor(pool, compute_analysis, page["content"]) for page in crawled))
+        results = [build_analysis_result(page, analysis, None) for page, analysis in zip(crawled, analyses)]
+
+        report = report_tasks.build_customer_report(results, f"local-{uuid.uuid4()}")
+        report["change_detection"] = report_tasks.summarize_changes(results)
+        report_tasks.store_reports([report])
+        logger.info(f"[Local] Generated report for {customer.get('name', 'Unknown')}: {len(results)} links, sentiment: {report['summary']['overall_sentiment']}")
+        return report
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def main():
+    from shinsa.celery_app.ingest import iter_customers
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("path")
+    parser.add_argument("--format", choices=["jsonl", "csv"], help="default: from the file extension")
+    parser.add_argument("--output", default="reports.jsonl", help="JSON lines file for the reports")
+    parser.add_argument("--workers", type=int, default=None, help="analysis processes (default: CPU count)")
+    parser.add_argument("--concurrency", type=int, default=16, help="customers in flight at once")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="[%(asctime)s] | %(levelname)s | %(message)s")
+    with LocalExecutor(args.workers, args.concurrency) as executor:
+        outcome = executor.run_many(list(iter_customers(args.path, args.format)))
+    with open(args.output, "w", encoding="utf-8") as file:
+        for report in outcome["reports"]:
+            file.write(json.dumps(report, ensure_ascii=False) + "\n")
+    logger.info(f"[Local] Wrote {len(outcome['reports'])} reports to {args.output}, {len(outcome['failed'])} failed")
+    return 1 if outcome["failed"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,186 @@
+import os
+import time
+import shutil
+import logging
+from celery import signals
+from shinsa.celery_app.config import CELERY_TASK_ROUTES, METRICS_CONFIG
+
+logger = logging.getLogger(__name__)
+
+# Stamped on every published message so the worker can measure time spent in the broker
+SENT_AT_HEADER = "shinsa_sent_at"
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600)
+PAYLOAD_BUCKETS = (256, 1024, 4 * 1024, 16 * 1024, 64 * 1024, 256 * 1024, 1024 * 1024, 4 * 1024 * 1024)
+RETRY_BUCKETS = (0, 1, 2, 3, 5, 10)
+
+_task_metrics = None
+_metrics_server = None
+
+
+def stamp_sent_at(headers=None, **kwargs):
+    if headers is not None:
+        headers[SENT_AT_HEADER] = time.time()
+
+
+def _task_name(task):
+    return task if isinstance(task, str) else getattr(task, "name", None)
+
+
+class TaskMetrics:
+    """Per-task/per-queue histograms fed by Celery signals, for tasks in the route table."""
+
+    def __init__(self, registry=None, routes=None):
+        from prometheus_client import REGISTRY, Counter, Histogram
+
+        registry = registry or REGISTRY
+        self.routes = routes if routes is not None else CELERY_TASK_ROUTES
+        labels = ["task", "queue"]
+        self.published = Counter("shinsa_task_published_total", "Messages published per task", labels, registry=registry)
+        self.queue_wait = Histogram("shinsa_task_queue_wait_seconds", "Time from publish to task start", labels, buckets=LATENCY_BUCKETS, registry=registry)
+        self.runtime = Histogram("shinsa_task_runtime_seconds", "Task execution time", labels + ["state"], buckets=LATENCY_BUCKETS, registry=registry)
+        self.payload = Histogram("shinsa_task_payload_bytes", "Serialized message body size as received", labels, buckets=PAYLOAD_BUCKETS, registry=registry)
+        self.attempts = Histogram("shinsa_task_retries", "Retries a task had used when it finished", labels, buckets=RETRY_BUCKETS, registry=registry)
+        self.retries = Counter("shinsa_task_retry_total", "Retries scheduled", labels, registry=registry)
+        self.failures = Counter("shinsa_task_failure_total", "Failed tasks", labels + ["exception"], registry=registry)
+        self._started = {}
+
+    def _queue(self, name):
+        route = self.routes.get(name)
+        return route["queue"] if route else None
+
+    def on_publish(self, sender=None, **kwargs):
+        queue = self._queue(_task_name(sender))
+        if queue:
+            self.published.labels(_task_name(sender), queue).inc()
+
+    def on_received(self, request=None, **kwargs):
+        queue = self._queue(request.name)
+        if queue and request.body is not None:
+            self.payload.labels(request.name, queue).observe(len(request.body))
+
+    def on_prerun(self, task_id=None, task=None, **kwargs):
+        queue = self._queue(task.name)
+        if not queue:
+            return
+        self._started[task_id] = time.perf_counter()
+        sent_at = (task.request.headers or {}).get(SENT_AT_HEADER) or getattr(task.request, SENT_AT_HEADER, None)
+        if sent_at:
+            self.queue_wait.labels(task.name, queue).observe(max(time.time() - sent_at, 0))
+
+    def on_postrun(self, task_id=None, task=None, state=None, **kwargs):
+        started = self._started.pop(task_id, None)
+        if started is None:
+            return
+        queue = self._queue(task.name)
+        self.runtime.labels(task.name, queue, state or "UNKNOWN").observe(time.perf_counter() - started)
+        self.attempts.labels(task.name, queue).observe(task.request.retries or 0)
+
+    def on_retry(self, sender=None, **kwargs):
+        queue = self._queue(_task_name(sender))
+        if queue:
+            self.retries.labels(_task_name(sender), queue).inc()
+
+    def on_failure(self, sender=None, exception=None, **kwargs):
+        queue = self._queue(_task_name(sender))
+        if queue:
+            self.failures.labels(_task_name(sender), queue, type(exception).__name__).inc()
+
+    def connect(self):
+        signals.before_task_publish.connect(self.on_publish, weak=False)
+        signals.task_received.connect(self.on_received, weak=False)
+        signals.task_prerun.connect(self.on_prerun, weak=False)
+        signals.task_postrun.connect(self.on_postrun, weak=False)
+        signals.task_retry.connect(self.on_retry, weak=False)
+        signals.task_failure.connect(self.on_failure, weak=False)
+
+    def disconnect(self):
+        signals.before_task_publish.disconnect(self.on_publish)
+        signals.task_received.disconnect(self.on_received)
+        signals.task_prerun.disconnect(self.on_prerun)
+        signals.task_postrun.disconnect(self.on_postrun)
+        signals.task_retry.disconnect(self.on_retry)
+        signals.task_failure.disconnect(self.on_failure)
+
+
+def metrics_registry():
+    from prometheus_client import REGISTRY, CollectorRegistry
+    from prometheus_client.multiprocess import MultiProcessCollector
+
+    if not os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        return REGISTRY
+    # Sums the mmap files of every process that wrote to the directory (prefork children included)
+    registry = CollectorRegistry()
+    MultiProcessCollector(registry)
+    return registry
+
+
+def start_metrics_server(port, addr="127.0.0.1"):
+    from prometheus_client import start_http_server
+
+    server, _ = start_http_server(port, addr=addr, registry=metrics_registry())
+    logger.info(f"[Metrics] Serving on http://{addr}:{server.server_port}/metrics")
+    return server
+
+
+def _owns_multiproc_dir(multiproc_dir):
+    # Only directories under multiproc_root were created here; an operator's directory is never wiped
+    return multiproc_dir.startswith(METRICS_CONFIG["multiproc_root"])
+
+
+def prepare_multiproc_dir():
+    """Create the multiprocess directory (per worker node, keyed by the main process pid) and return it."""
+    multiproc_dir = os.environ.setdefault("PROMETHEUS_MULTIPROC_DIR", os.path.join(METRICS_CONFIG["multiproc_root"], str(os.getpid())))
+    if _owns_multiproc_dir(multiproc_dir):
+        shutil.rmtree(multiproc_dir, ignore_errors=True)
+    os.makedirs(multiproc_dir, exist_ok=True)
+    return multiproc_dir
+
+
+def install_metrics():
+    global _task_metrics
+    if _task_metrics is None:
+        # prometheus_client picks its value storage on import, so the multiprocess directory has to exist first
+        prepare_multiproc_dir()
+        _task_metrics = TaskMetrics()
+        _task_metrics.connect()
+    return _task_metrics
+
+
+@signals.worker_init.connect
+def on_worker_init(**kwargs):
+    if METRICS_CONFIG["enabled"]:
+        install_metrics()
+
+
+@signals.worker_ready.connect
+def on_worker_ready(**kwargs):
+    global _metrics_server
+    if _task_metrics is None or _metrics_server is not None:
+        return
+    try:
+        _metrics_server = start_metrics_server(METRICS_CONFIG["port"], METRICS_CONFIG["addr"])
+    except OSError as exc:
+        logger.warning(f"[Metrics] Could not bind port {METRICS_CONFIG['port']}: {exc}")
+
+
+@signals.worker_process_shutdown.connect
+def on_worker_process_shutdown(pid=None, **kwargs):
+    if _task_metrics is not None and os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        from prometheus_client import multiprocess
+
+        multiprocess.mark_process_dead(pid or os.getpid())
+
+
+@signals.worker_shutdown.connect
+def on_worker_shutdown(**kwargs):
+    global _metrics_server
+    if _metrics_server is not None:
+        _metrics_server.shutdown()
+        _metrics_server = None
+    multiproc_dir = os.environ.get("PROMETHEUS_MULTIPROC_DIR", "")
+    if _task_metrics is not None and _owns_multiproc_dir(multiproc_dir):
+        shutil.rmtree(multiproc_dir, ignore_errors=True)
+
+
+signals.before_task_publish.connect(stamp_sent_at, weak=False)
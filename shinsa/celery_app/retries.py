@@ -0,0 +1,30 @@
+import logging
+from shinsa.celery_app.config import RETRY_POLICY_CONFIG
+from shinsa.utils.retry_policy import RetryPolicy
+
+logger = logging.getLogger(__name__)
+
+_policies = {}
+
+
+def get_retry_policy(task_name):
+    if task_name not in _policies:
+        options = {**RETRY_POLICY_CONFIG["default"], **RETRY_POLICY_CONFIG["tasks"].get(task_name, {})}
+        _policies[task_name] = RetryPolicy(**options)
+    return _policies[task_name]
+
+
+def retry_task(task, exc, free_retries=0, **options):
+    """Schedule a retry of `task` for `exc` under its policy, or give up; use as `raise retry_task(self, exc)`.
+
+    Fatal errors and spent budgets return `exc` itself, so the task fails now.
+    `free_retries` are earlier retries that don't count against the budget
+    (e.g. rate-limit deferrals).
+    """
+    policy = get_retry_policy(task.name)
+    retries = task.request.retries - free_retries
+    if not policy.should_retry(exc, retries):
+        reason = "retry budget spent" if retries >= policy.max_retries else f"{type(exc).__name__} is not retryable"
+        logger.warning(f"[Retry] {task.name}[{task.request.id}] failed for good after {retries} retries: {reason}")
+        return exc
+    return task.retry(exc=exc, countdown=policy.countdown(retries, exc), max_retries=policy.max_retries + free_retries, **options)
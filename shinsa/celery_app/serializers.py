@@ -0,0 +1,90 @@
+import zlib
+import threading
+import msgpack
+from kombu.serialization import register
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover - optional codec
+    zstandard = None
+
+try:
+    import lz4.frame
+except ImportError:  # pragma: no cover - optional codec
+    lz4 = None
+
+MSGPACK_COMPRESSED = "msgpack-z"
+CONTENT_TYPE = "application/x-msgpack-z"
+
+# Payloads at or above this size are compressed; smaller ones are not worth the CPU
+COMPRESSION_THRESHOLD = 1024
+
+# The first byte of every payload names the codec used for the rest of it
+RAW, ZSTD, LZ4, ZLIB = b"\x00", b"\x01", b"\x02", b"\x03"
+
+
+class _PerThread(threading.local):
+    # zstd (de)compressor objects must not be shared between threads; each thread builds its own
+    def __init__(self, factory):
+        self.codec = factory()
+
+    def __getattr__(self, name):
+        return getattr(self.codec, name)
+
+
+if zstandard is not None:
+    _zstd_compressor = _PerThread(lambda: zstandard.ZstdCompressor(level=3))
+    _zstd_decompressor = _PerThread(zstandard.ZstdDecompressor)
+
+
+def _compress(data):
+    if zstandard is not None:
+        return ZSTD + _zstd_compressor.compress(data)
+    if lz4 is not None:
+        return LZ4 + lz4.frame.compress(data)
+    return ZLIB + zlib.compress(data, 6)
+
+
+def _decompress(codec, data):
+    if codec == ZSTD:
+        return _zstd_decompressor.decompress(data)
+    if codec == LZ4:
+        return lz4.frame.decompress(data)
+    if codec == ZLIB:
+        return zlib.decompress(data)
+    raise ValueError(f"Unknown {MSGPACK_COMPRESSED} codec byte {codec!r}")
+
+
+def encode(obj, threshold=COMPRESSION_THRESHOLD):
+    packed = msgpack.packb(obj, use_bin_type=True)
+    if len(packed) < threshold:
+        return RAW + packed
+    return _compress(packed)
+
+
+def decode(payload):
+    payload = bytes(payload)
+    codec, data = payload[:1], payload[1:]
+    if codec != RAW:
+        data = _decompress(codec, data)
+    return msgpack.unpackb(data, raw=False)
+
+
+def is_compressed_payload(payload):
+    # JSON text never starts with a control byte, so stored results of either format tell themselves apart
+    return isinstance(payload, (bytes, bytearray, memoryview)) and bytes(payload[:1]) in (RAW, ZSTD, LZ4, ZLIB)
+
+
+def register_serializers():
+    register(MSGPACK_COMPRESSED, encode, decode, content_type=CONTENT_TYPE, content_encoding="binary")
+
+
+def build_serializer_annotations(task_routes, queue_serializers):
+    # Celery routes cannot override a task's serializer, so per-task/per-queue choices become
+    # task annotations. An explicit "serializer" on a route wins over its queue's profile.
+    annotations = {}
+    for task_name, route in task_routes.items():
+        serializer = route.get("serializer") or queue_serializers.get(route.get("queue"))
+        if serializer:
+            annotations[task_name] = {"serializer": serializer}
+    return annotations
@@ -1,4 +1,2 @@
-from .customer_tasks import *
-from .crawl_tasks import *
-from .analysis_tasks import *
-from .report_tasks import *
+# Task modules are imported on their own: workers load all of them through the app's
+# autodiscovery at boot, producers import only the module whose tasks they call.
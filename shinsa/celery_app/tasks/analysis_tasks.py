@@ -1,44 +1,84 @@
 import time
 import logging
-import re
-from collections import Counter
 from celery import shared_task
+from shinsa.celery_app.latency import simulate_latency
+from shinsa.celery_app.config import CHANGE_DETECTION_CONFIG
+from shinsa.celery_app.backend import get_backend_client
+from shinsa.celery_app.retries import retry_task
+from shinsa.celery_app.tasks import crawl_tasks, report_tasks
+from shinsa.utils.crawl_cache import content_hash
+from shinsa.utils.task_dedup import fingerprint
+from shinsa.utils.text_analyzer import get_text_analyzer, get_keyword_extractor
 
 logger = logging.getLogger(__name__)
 
 
+_page_fingerprints = None
+
+
+def get_page_fingerprints():
+    global _page_fingerprints
+    if not CHANGE_DETECTION_CONFIG["enabled"]:
+        return None
+    if _page_fingerprints is None:
+        from shinsa.utils.page_fingerprint import PageFingerprints  # NumPy; preloaded when a worker boots
+
+        options = {k: v for k, v in CHANGE_DETECTION_CONFIG.items() if k != "enabled"}
+        _page_fingerprints = PageFingerprints(get_backend_client(), **options)
+    return _page_fingerprints
+
+
 @shared_task(bind=True, max_retries=3, name="analyze_content")
-def analyze_content(self, crawled_data):
+def analyze_content(self, crawled_data, aggregation_id=None):
     try:
         customer = crawled_data["customer"]
         link = crawled_data["link"]
-        content = crawled_data["content"]
         customer_name = customer.get("name", "Unknown")
 
         logger.info(f"[Analysis] Analyzing content from {link} for {customer_name}")
 
-        # Simulate CPU-intensive analysis
-        time.sleep(140)
-
-        # Extract keywords and perform analysis
-        analysis_result = extract_keywords_and_analyze(content)
+        # Extract keywords and perform analysis (once per distinct content across workers,
+        # and not again while the page stays the same)
+        [analysis_result], [change] = analyze_pages([crawled_data], [resolve_content(crawled_data)], analyze=lambda contents: [analyze_text(contents[0])])
 
-        result = {
-            "customer": customer,
-            "link": link,
-            "original_content_length": crawled_data.get("content_length", len(content)),
-            "analysis": analysis_result,
-            "analysis_task_id": self.request.id,
-            "crawl_task_id": crawled_data.get("crawl_task_id"),
-        }
+        result = build_analysis_result(crawled_data, analysis_result, self.request.id, change)
 
-        logger.info(f"[Analysis] Completed analysis for {customer_name}: {len(analysis_result['keywords'])} keywords found")
+        logger.info(f"[Analysis] Completed analysis for {customer_name}: {len(analysis_result['keywords'])} keywords found (page {change['status'] if change else 'not tracked'})")
+        if aggregation_id:
+            # Fold into the customer's running report and return only a marker to the chord
+            report_tasks.get_report_aggregator().add(aggregation_id, result)
+            return build_aggregation_marker(result, aggregation_id)
         return result
 
     except Exception as exc:
         customer_name = crawled_data.get("customer", {}).get("name", "unknown")
         logger.error(f"[Analysis] Error analyzing content for {customer_name}: {str(exc)}")
-        raise self.retry(exc=exc, countdown=60, max_retries=3)
+        raise retry_task(self, exc)
+
+
+@shared_task(bind=True, max_retries=3, name="analyze_content_batch")
+def analyze_content_batch(self, crawled_batch, aggregation_prefix=None):
+    try:
+        logger.info(f"[Analysis Batch] Analyzing {len(crawled_batch)} documents")
+
+        analyses, changes = analyze_pages(crawled_batch, [resolve_content(crawled_data) for crawled_data in crawled_batch])
+        results = [build_analysis_result(crawled_data, analysis, self.request.id, change) for crawled_data, analysis, change in zip(crawled_batch, analyses, changes)]
+
+        changed = report_tasks.summarize_changes(results)
+        logger.info(f"[Analysis Batch] Completed analysis of {len(results)} documents ({changed['skipped']} reused as unchanged, {changed['saved_cpu_seconds']}s saved)")
+        if aggregation_prefix:
+            aggregator = report_tasks.get_report_aggregator()
+            markers = []
+            for result in results:
+                aggregation_id = f"{aggregation_prefix}:{report_tasks.customer_key(result['customer'])}"
+                aggregator.add(aggregation_id, result)
+                markers.append(build_aggregation_marker(result, aggregation_id))
+            return markers
+        return results
+
+    except Exception as exc:
+        logger.error(f"[Analysis Batch] Error analyzing batch of {len(crawled_batch)} documents: {str(exc)}")
+        raise retry_task(self, exc)
 
 
 @shared_task(bind=True, max_retries=3, name="extract_keywords")
@@ -47,59 +87,126 @@ def extract_keywords(self, content, min_length=3, max_keywords=50):
         logger.info("[Keywords] Extracting keywords from content")
 
         # Simulate processing time
-        time.sleep(0.5)
-
-        # Clean and tokenize content
-        words = re.findall(r"\\b[a-zA-Z]{" + str(min_length) + ",}\\b", content.lower())
-
-        # Remove common stop words
-        stop_words = {"the", "and", "or", "but", "in", "on", "at", "to", "for", "of", "with", "by", "from", "about"}
-        filtered_words = [word for word in words if word not in stop_words]
-
-        # Count frequency and get top keywords
-        word_freq = Counter(filtered_words)
-        keywords = [{"word": word, "count": count} for word, count in word_freq.most_common(max_keywords)]
+        simulate_latency("extract_keywords")
 
         result = {
-            "keywords": keywords,
-            "total_words": len(words),
-            "unique_words": len(set(words)),
+            **get_keyword_extractor(min_length).keywords(content, max_keywords),
             "task_id": self.request.id,
         }
 
-        logger.info(f"[Keywords] Extracted {len(keywords)} keywords")
+        logger.info(f"[Keywords] Extracted {len(result['keywords'])} keywords")
         return result
 
     except Exception as exc:
         logger.error(f"[Keywords] Error extracting keywords: {str(exc)}")
-        raise self.retry(exc=exc, countdown=30, max_retries=3)
+        raise retry_task(self, exc)
+
+
+def analysis_key(content):
+    return fingerprint("analysis", content_hash(content))
+
+
+def analyze_text(content):
+    dedup = crawl_tasks.get_deduplicator("analysis")
+    if dedup is None:
+        return compute_analysis(content)
+    return dedup.run(analysis_key(content), lambda: compute_analysis(content))
+
+
+def compute_analysis(content):
+    # Simulate CPU-intensive analysis
+    simulate_latency("analyze_content")
+    return extract_keywords_and_analyze(content)
+
+
+def analyze_texts(contents):
+    def compute_many(texts):
+        # Simulate CPU-intensive analysis (once per batch)
+        simulate_latency("analyze_content")
+
+        from shinsa.utils.batch_analyzer import BatchTextAnalyzer  # NumPy; preloaded when a worker boots
+
+        # The whole batch is tokenized into one shared vocabulary and scored with NumPy
+        return BatchTextAnalyzer().analyze_many(texts)
+
+    dedup = crawl_tasks.get_deduplicator("analysis")
+    if dedup is None:
+        return compute_many(contents)
+    # Documents already analyzed (or being analyzed) elsewhere are left out of the batch
+    return dedup.run_many([analysis_key(content) for content in contents], contents, compute_many)
+
+
+def analyze_pages(crawled_batch, contents, analyze=None):
+    """Analyze crawled pages, reusing the last analysis of every page whose content has not changed."""
+    analyze = analyze or analyze_texts
+    fingerprints = get_page_fingerprints()
+    # Failed crawls carry no page; they are analyzed as before and never fingerprinted
+    tracked = [i for i, crawled_data in enumerate(crawled_batch) if crawled_data.get("status", "success") == "success"] if fingerprints else []
+    changes = [None] * len(crawled_batch)
+    analyses = [None] * len(crawled_batch)
+    if tracked:
+        matches = fingerprints.lookup_many([crawled_batch[i]["link"] for i in tracked], [contents[i] for i in tracked])
+        for i, match in zip(tracked, matches):
+            changes[i] = {"status": match["status"], "saved_cpu_seconds": match.get("saved_cpu_seconds", 0)}
+            analyses[i] = match.get("analysis")
+
+    pending = [i for i in range(len(crawled_batch)) if analyses[i] is None]
+    if pending:
+        started = time.perf_counter()
+        for i, analysis in zip(pending, analyze([contents[i] for i in pending])):
+            analyses[i] = analysis
+        # Time on the cpu_intensive slot, split evenly across the batch; what a later skip saves
+        seconds = (time.perf_counter() - started) / len(pending)
+        store = [i for i in pending if changes[i] is not None]
+        if store:
+            fingerprints.store_many([crawled_batch[i]["link"] for i in store], [contents[i] for i in store], [analyses[i] for i in store], [seconds] * len(store))
+    return analyses, changes
+
+
+def resolve_content(crawled_data):
+    # Claim-checked content is only loaded here, at the step that needs it
+    if "content_ref" not in crawled_data:
+        return crawled_data["content"]
+    return crawl_tasks.get_claim_check().resolve(crawled_data)
+
+
+def build_analysis_result(crawled_data, analysis_result, analysis_task_id, change=None):
+    result = {
+        "customer": crawled_data["customer"],
+        "link": crawled_data["link"],
+        "original_content_length": crawled_data["content_length"] if "content_length" in crawled_data else len(crawled_data["content"]),
+        "analysis": analysis_result,
+        "analysis_task_id": analysis_task_id,
+        "crawl_task_id": crawled_data.get("crawl_task_id"),
+    }
+    if crawled_data.get("workflow_id"):
+        result["workflow_id"] = crawled_data["workflow_id"]
+    if change:
+        result["change_detection"] = change
+    return result
+
+
+def build_aggregation_marker(analysis_result, aggregation_id):
+    marker = {
+        "customer": analysis_result["customer"],
+        "link": analysis_result["link"],
+        "aggregation_id": aggregation_id,
+        "analysis_task_id": analysis_result["analysis_task_id"],
+        "crawl_task_id": analysis_result["crawl_task_id"],
+    }
+    if analysis_result.get("workflow_id"):
+        marker["workflow_id"] = analysis_result["workflow_id"]
+    if "change_detection" in analysis_result:
+        marker["change_detection"] = analysis_result["change_detection"]
+    return marker
 
 
 def extract_keywords_and_analyze(content):
     # Simple keyword extraction and sentiment analysis
-    words = re.findall(r"\\b[a-zA-Z]{3,}\\b", content.lower())
+    return get_text_analyzer().analyze(content)
 
-    # Remove stop words
-    stop_words = {"the", "and", "or", "but", "in", "on", "at", "to", "for", "of", "with", "by", "from", "about", "this", "that", "these", "those", "they", "them", "their"}
-    filtered_words = [word for word in words if word not in stop_words]
 
-    # Get keyword frequency
-    word_freq = Counter(filtered_words)
-    top_keywords = [{"word": word, "count": count} for word, count in word_freq.most_common(20)]
-
-    # Simple sentiment analysis (mock)
-    positive_words = ["good", "great", "excellent", "amazing", "wonderful", "professional", "skilled", "experienced"]
-    negative_words = ["bad", "poor", "terrible", "awful", "unprofessional"]
-
-    positive_count = sum(1 for word in filtered_words if word in positive_words)
-    negative_count = sum(1 for word in filtered_words if word in negative_words)
-
-    sentiment_score = (positive_count - negative_count) / max(len(filtered_words), 1)
-
-    return {
-        "keywords": top_keywords,
-        "word_count": len(words),
-        "unique_words": len(set(filtered_words)),
-        "sentiment_score": sentiment_score,
-        "sentiment": "positive" if sentiment_score > 0.1 else "negative" if sentiment_score < -0.1 else "neutral",
-    }
+@shared_task(name="change_detection_stats")
+def change_detection_stats():
+    fingerprints = get_page_fingerprints()
+    return fingerprints.stats() if fingerprints is not None else {"enabled": False}
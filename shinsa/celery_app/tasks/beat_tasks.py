@@ -1,8 +1,20 @@
 import logging
 from celery import shared_task
+from shinsa.celery_app.config import REDIS_CLEANUP_CONFIG
+from shinsa.celery_app.backend import get_backend_client
+from shinsa.utils.redis_cleanup import RedisCleaner
 
 logger = logging.getLogger(__name__)
 
+_redis_cleaner = None
+
+
+def get_redis_cleaner():
+    global _redis_cleaner
+    if _redis_cleaner is None:
+        _redis_cleaner = RedisCleaner(get_backend_client(), **REDIS_CLEANUP_CONFIG)
+    return _redis_cleaner
+
 
 @shared_task(bind=True, max_retries=3, name="say_hello_task")
 def say_hello(self, name="Aung"):
@@ -12,5 +24,17 @@ def say_hello(self, name="Aung"):
 
 @shared_task(name="cleanup_task")
 def cleanup():
-    logger.info("🧹 Cleaning up old customer data...")
-    return "cleanup done"
+    # Not retried: the next scheduled run resumes from the saved cursor
+    from shinsa.celery_app.tasks.crawl_tasks import get_claim_check
+
+    # File blobs have no TTL of their own; Redis blobs expire with their keys
+    claim_check = get_claim_check()
+    swept = claim_check.store.sweep() if claim_check is not None and claim_check.store.kind == "file" else 0
+    if swept:
+        logger.info(f"🧹 Removed {swept} expired claim-check blobs")
+
+    logger.info("🧹 Cleaning up leaked Redis keys...")
+    stats = get_redis_cleaner().run()
+    if stats is None:
+        return {"skipped": True, "claim_check_swept": swept}
+    return {**stats, "claim_check_swept": swept}
@@ -1,9 +1,266 @@
 import time
 import logging
 from celery import shared_task
+from shinsa.celery_app.latency import simulate_latency
+from shinsa.celery_app.config import CRAWL_LIVE_FETCH, FETCH_ENGINE_CONFIG, CRAWL_CACHE_CONFIG, CLAIM_CHECK_CONFIG, DEDUP_CONFIG, CRAWL_RATE_LIMIT_CONFIG, CIRCUIT_BREAKER_CONFIG
+from shinsa.celery_app.backend import get_backend_client
+from shinsa.celery_app.retries import get_retry_policy, retry_task
+from shinsa.utils.crawl_cache import CrawlCache, normalize_url
+from shinsa.utils.claim_check import ClaimCheck, FileBlobStore, RedisBlobStore
+from shinsa.utils.task_dedup import TaskDeduplicator, fingerprint
+from shinsa.utils.rate_limit import DomainRateLimiter, RateLimited, domain_of, retry_after
+from shinsa.utils.retry_policy import CircuitBreaker, CircuitOpen, FetchError, is_host_failure
 
 logger = logging.getLogger(__name__)
 
+# For demo, generate mock content
+MOCK_CONTENT = """
+        Welcome to {customer_name}'s profile page.
+        About {customer_name}: A professional in the industry.
+        Skills: Python, Data Analysis, Machine Learning, Web Development
+        Experience: Senior Developer at Tech Company
+        Location: San Francisco, CA
+        Interests: Technology, Innovation, Artificial Intelligence
+        Recent posts about: Python programming, data science trends, AI developments
+        """
+
+
+_crawl_cache = None
+
+
+def get_crawl_cache():
+    global _crawl_cache
+    if not CRAWL_CACHE_CONFIG["enabled"]:
+        return None
+    if _crawl_cache is None:
+        options = {k: v for k, v in CRAWL_CACHE_CONFIG.items() if k != "enabled"}
+        _crawl_cache = CrawlCache(get_backend_client(), **options)
+    return _crawl_cache
+
+
+_claim_check = None
+
+
+def get_claim_check():
+    global _claim_check
+    if not CLAIM_CHECK_CONFIG["enabled"]:
+        return None
+    if _claim_check is None:
+        if CLAIM_CHECK_CONFIG["store"] == "file":
+            # Blobs written by an io worker are read by cpu workers, possibly on other hosts
+            if not CLAIM_CHECK_CONFIG["path"]:
+                raise ValueError("CLAIM_CHECK_STORE=file needs CLAIM_CHECK_PATH, a directory shared by every worker")
+            store = FileBlobStore(CLAIM_CHECK_CONFIG["path"], ttl=CLAIM_CHECK_CONFIG["ttl"])
+        else:
+            store = RedisBlobStore(get_backend_client(), ttl=CLAIM_CHECK_CONFIG["ttl"])
+        _claim_check = ClaimCheck(store, threshold=CLAIM_CHECK_CONFIG["threshold"])
+    return _claim_check
+
+
+_rate_limiter = None
+
+
+def get_rate_limiter():
+    global _rate_limiter
+    if not CRAWL_RATE_LIMIT_CONFIG["enabled"]:
+        return None
+    if _rate_limiter is None:
+        _rate_limiter = DomainRateLimiter(get_backend_client(), rate=CRAWL_RATE_LIMIT_CONFIG["rate"], burst=CRAWL_RATE_LIMIT_CONFIG["burst"], domains=CRAWL_RATE_LIMIT_CONFIG["domains"])
+    return _rate_limiter
+
+
+_circuit_breaker = None
+
+
+def get_circuit_breaker():
+    global _circuit_breaker
+    if not CIRCUIT_BREAKER_CONFIG["enabled"]:
+        return None
+    if _circuit_breaker is None:
+        options = {k: v for k, v in CIRCUIT_BREAKER_CONFIG.items() if k != "enabled"}
+        _circuit_breaker = CircuitBreaker(get_backend_client(), **options)
+    return _circuit_breaker
+
+
+_deduplicators = {}
+
+
+def get_deduplicator(namespace):
+    if not DEDUP_CONFIG["enabled"]:
+        return None
+    if namespace not in _deduplicators:
+        options = {k: v for k, v in DEDUP_CONFIG.items() if k != "enabled"}
+        _deduplicators[namespace] = TaskDeduplicator(get_backend_client(), namespace, **options)
+    return _deduplicators[namespace]
+
+
+def get_live_fetch_engine():
+    # Imported on first use, so producers importing this module don't load the HTTP clients
+    from shinsa.utils.green_fetcher import gevent_patched, get_green_fetcher
+
+    if gevent_patched():
+        # An asyncio loop thread does not cooperate with gevent's hub; use the green client there
+        return get_green_fetcher(**FETCH_ENGINE_CONFIG)
+
+    from shinsa.utils.http_fetcher import get_fetch_engine
+
+    return get_fetch_engine(**FETCH_ENGINE_CONFIG)
+
+
+def wait_for_domain(url, rate_slot=None):
+    # Short waits happen here (cooperative under gevent); longer ones raise RateLimited
+    limiter = get_rate_limiter()
+    if limiter is not None:
+        max_wait = CRAWL_RATE_LIMIT_CONFIG["max_wait"]
+        delay = limiter.claim(url, rate_slot, max_wait) if rate_slot is not None else limiter.acquire(url, max_wait)
+        if delay:
+            time.sleep(delay)
+
+
+def note_throttled(url, response):
+    # A 429/503 holds the whole domain for Retry-After, for every worker
+    limiter = get_rate_limiter()
+    if limiter is None or response.get("status") not in (429, 503):
+        return None
+    seconds = retry_after(response)
+    limiter.penalize(url, seconds)
+    return seconds
+
+
+def check_circuit(url):
+    # Raises CircuitOpen while the host is down; True when this request is the recovery probe
+    breaker = get_circuit_breaker()
+    return breaker.before(url) if breaker is not None else False
+
+
+def record_circuit(url, response, probe):
+    breaker = get_circuit_breaker()
+    if breaker is not None:
+        breaker.record(url, not is_host_failure(response), probe)
+
+
+def fetch_url(url, headers=None):
+    if CRAWL_LIVE_FETCH:
+        probe = check_circuit(url)
+        response = get_live_fetch_engine().fetch(url, headers=headers)
+        record_circuit(url, response, probe)
+        throttled = note_throttled(url, response)
+        if throttled is not None:
+            raise RateLimited(domain_of(url), throttled)
+        return response
+    simulate_latency("crawl_link")  # Simulate network latency
+    return {"url": url, "status": 200, "headers": {}, "content": MOCK_CONTENT, "error": None}
+
+
+def fetch_urls(urls, per_url_headers=None):
+    # Every request gets its domain's next slot up front; requests start at their slot, so
+    # throttled domains are spread out while the other domains go ahead
+    limiter = get_rate_limiter()
+    if CRAWL_LIVE_FETCH:
+        return fetch_urls_live(urls, per_url_headers or [None] * len(urls), limiter)
+    start_delays = limiter.schedule(urls) if limiter is not None else None
+    if urls:
+        if start_delays:
+            time.sleep(max(start_delays))
+        simulate_latency("crawl_link")  # Simulate network latency (fetches overlap, so one wait per batch)
+    return [{"url": url, "status": 200, "headers": {}, "content": MOCK_CONTENT, "error": None} for url in urls]
+
+
+def fetch_urls_live(urls, per_url_headers, limiter):
+    # Hosts with an open circuit fail fast in place; the rest are fetched in one round
+    responses = [None] * len(urls)
+    probes = {}
+    for i, url in enumerate(urls):
+        try:
+            probes[i] = check_circuit(url)
+        except CircuitOpen as exc:
+            responses[i] = {"url": url, "status": None, "headers": {}, "content": "", "error": str(exc)}
+    pending = [i for i in range(len(urls)) if responses[i] is None]
+    pending_urls = [urls[i] for i in pending]
+    start_delays = limiter.schedule(pending_urls) if limiter is not None else None
+    fetched = get_live_fetch_engine().fetch_many(pending_urls, per_url_headers=[per_url_headers[i] for i in pending], start_delays=start_delays)
+    for i, response in zip(pending, fetched):
+        record_circuit(urls[i], response, probes[i])
+        note_throttled(urls[i], response)
+        responses[i] = response
+    return responses
+
+
+def crawl_key(url):
+    return fingerprint("crawl", normalize_url(url))
+
+
+def is_cacheable_response(response):
+    # Failed fetches are not shared, so every waiter gets its own attempt (and retries)
+    return not response["error"]
+
+
+def crawl_url(url, rate_slot=None):
+    # One fetch per normalized URL across workers: duplicates wait for it or reuse its response
+    cache = get_crawl_cache()
+
+    def fetch_page(page_url, headers=None):
+        # Only real fetches take the domain's slot; cache hits and coalesced duplicates don't
+        wait_for_domain(page_url, rate_slot)
+        return fetch_url(page_url, headers=headers)
+
+    fetch = (lambda: cache.fetch(url, fetch_page)) if cache is not None else (lambda: fetch_page(url))
+    dedup = get_deduplicator("crawl")
+    if dedup is None:
+        return fetch()
+    return dedup.run(crawl_key(url), fetch, cacheable=is_cacheable_response)
+
+
+def crawl_urls(urls):
+    dedup = get_deduplicator("crawl")
+    if dedup is None:
+        return fetch_urls_cached(urls)
+    return dedup.run_many([crawl_key(url) for url in urls], urls, fetch_urls_cached, cacheable=is_cacheable_response)
+
+
+def fetch_urls_cached(urls):
+    # Fresh cache hits are served directly; everything else is fetched in one concurrent round,
+    # conditionally where the cache holds validators for a stale copy
+    cache = get_crawl_cache()
+    if cache is None:
+        return fetch_urls(urls)
+
+    entries = [cache.lookup(url) for url in urls]
+    responses = [None] * len(urls)
+    pending = []
+    for i, (url, entry) in enumerate(zip(urls, entries)):
+        if entry is not None and cache.is_fresh(entry):
+            responses[i] = cache.hit(url, entry)
+        else:
+            pending.append(i)
+
+    fetched = fetch_urls([urls[i] for i in pending], [cache.conditional_headers(entries[i]) if entries[i] else None for i in pending])
+    for i, response in zip(pending, fetched):
+        responses[i] = cache.resolve(urls[i], entries[i], response)
+    return responses
+
+
+def build_crawl_result(customer, link, content, crawl_task_id, status="success", error=None, cache_hit=False, workflow_id=None):
+    result = {
+        "customer": customer,
+        "link": link,
+        "content": content,
+        "content_length": len(content),
+        "crawl_task_id": crawl_task_id,
+        "status": status,
+        "cache_hit": cache_hit,
+    }
+    if error:
+        result["error"] = error
+    if workflow_id:
+        result["workflow_id"] = workflow_id
+
+    # Large pages go to the blob store; the chain only carries the reference
+    claim_check = get_claim_check()
+    if claim_check is not None:
+        result = claim_check.offload(result, owner=workflow_id)
+    return result
+
 
 @shared_task(bind=True, max_retries=3, name="crawl_link")
 def crawl_link(self, link_data):
@@ -14,41 +271,63 @@ def crawl_link(self, link_data):
 
         logger.info(f"[Crawl] Starting crawl for {customer_name}: {link}")
 
-        # Simulate network request (replace with real crawling)
-        time.sleep(130)  # Simulate network latency
+        response = crawl_url(link, rate_slot=link_data.get("rate_slot"))
+        if response["error"]:
+            raise FetchError.from_response(response)
 
-        # In real implementation, you would do:
-        # response = requests.get(link, timeout=10)
-        # content = response.text
+        result = build_crawl_result(customer, link, response["content"], self.request.id, cache_hit=response.get("cache_hit", False), workflow_id=link_data.get("workflow_id"))
 
-        # For demo, generate mock content
-        mock_content = """
-        Welcome to {customer_name}'s profile page.
-        About {customer_name}: A professional in the industry.
-        Skills: Python, Data Analysis, Machine Learning, Web Development
-        Experience: Senior Developer at Tech Company
-        Location: San Francisco, CA
-        Interests: Technology, Innovation, Artificial Intelligence
-        Recent posts about: Python programming, data science trends, AI developments
-        """
-
-        result = {
-            "customer": customer,
-            "link": link,
-            "content": mock_content,
-            "content_length": len(mock_content),
-            "crawl_task_id": self.request.id,
-            "status": "success",
-        }
-
-        logger.info(f"[Crawl] Successfully crawled {link} for {customer_name}")
+        logger.info(f"[Crawl] Successfully crawled {link} for {customer_name} (cache hit: {result['cache_hit']})")
         return result
 
+    except RateLimited as exc:
+        # Not a failure: book the domain's next free slot and come back exactly then, so this
+        # worker crawls other domains meanwhile. Deferrals don't use up the retry budget.
+        limiter = get_rate_limiter()
+        deferrals = link_data.get("deferrals", 0) + 1
+        countdown = limiter.schedule([link_data["link"]])[0]
+        logger.info(f"[Crawl] {exc}; rescheduling {link_data['link']} in {countdown:.1f}s")
+        max_retries = get_retry_policy(self.name).max_retries + deferrals
+        raise self.retry(args=[{**link_data, "rate_slot": limiter.clock() + countdown, "deferrals": deferrals}], countdown=countdown, max_retries=max_retries)
+
     except Exception as exc:
         customer_name = link_data.get("customer", {}).get("name", "unknown")
         link = link_data.get("link", "unknown")
         logger.error(f"[Crawl] Error crawling {link} for {customer_name}: {str(exc)}")
-        raise self.retry(exc=exc, countdown=60, max_retries=3)
+        raise retry_task(self, exc, free_retries=link_data.get("deferrals", 0), args=[{**link_data, "rate_slot": None}])
+
+
+@shared_task(bind=True, max_retries=3, name="crawl_links_batch")
+def crawl_links_batch(self, link_payloads):
+    try:
+        logger.info(f"[Crawl Batch] Starting batch crawl of {len(link_payloads)} links")
+
+        # All links are fetched concurrently on the shared, connection-pooled engine
+        responses = crawl_urls([p["link"] for p in link_payloads])
+
+        # A failed link is reported in place instead of retrying the whole batch
+        results = [
+            build_crawl_result(
+                payload["customer"],
+                payload["link"],
+                response["content"],
+                self.request.id,
+                status="failed" if response["error"] else "success",
+                error=response["error"],
+                cache_hit=response.get("cache_hit", False),
+                workflow_id=payload.get("workflow_id"),
+            )
+            for payload, response in zip(link_payloads, responses)
+        ]
+
+        failed = sum(1 for r in results if r["status"] != "success")
+        cache_hits = sum(1 for r in results if r["cache_hit"])
+        logger.info(f"[Crawl Batch] Crawled {len(results) - failed} links ({cache_hits} from cache), {failed} failed")
+        return results
+
+    except Exception as exc:
+        logger.error(f"[Crawl Batch] Error crawling batch of {len(link_payloads)} links: {str(exc)}")
+        raise retry_task(self, exc)
 
 
 @shared_task(bind=True, max_retries=3, name="fetch_page_content")
@@ -56,16 +335,14 @@ def fetch_page_content(self, url, customer_info):
     try:
         logger.info(f"[Fetch] Fetching content from: {url}")
 
-        headers = {"User-Agent": "Mozilla/5.0 (compatible; CustomerProcessor/1.0)"}
-
-        # Real implementation would be:
-        # response = requests.get(url, headers=headers, timeout=10)
-        # soup = BeautifulSoup(response.content, 'html.parser')
-        # content = soup.get_text()
-
-        # Mock response for demo
-        time.sleep(2)  # Simulate network request
-        content = f"Sample content from {url} for customer analysis"
+        if CRAWL_LIVE_FETCH:
+            response = fetch_url(url)
+            if response["error"]:
+                raise FetchError.from_response(response)
+            content = response["content"]
+        else:
+            simulate_latency("fetch_page_content")  # Simulate network request
+            content = f"Sample content from {url} for customer analysis"
 
         return {
             "url": url,
@@ -76,4 +353,17 @@ def fetch_page_content(self, url, customer_info):
 
     except Exception as exc:
         logger.error(f"[Fetch] Error fetching {url}: {str(exc)}")
-        raise self.retry(exc=exc, countdown=30, max_retries=3)
+        raise retry_task(self, exc)
+
+
+@shared_task(name="crawl_cache_stats")
+def crawl_cache_stats():
+    cache = get_crawl_cache()
+    return cache.stats() if cache is not None else {"enabled": False}
+
+
+@shared_task(name="dedup_stats")
+def dedup_stats():
+    if not DEDUP_CONFIG["enabled"]:
+        return {"enabled": False}
+    return {namespace: get_deduplicator(namespace).stats() for namespace in ("crawl", "analysis")}
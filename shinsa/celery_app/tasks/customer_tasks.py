@@ -1,35 +1,95 @@
-import time
+import os
 import logging
+from urllib.parse import quote
 from celery import shared_task, chord, chain, group
 from shinsa.celery_app.app import celery_app
+from shinsa.celery_app.config import WORKFLOW_BATCH_CONFIG, LINK_DISCOVERY_CONFIG, TASK_PRIORITIES
+from shinsa.celery_app.latency import simulate_latency
+from shinsa.celery_app.retries import retry_task
+from shinsa.utils.rate_limit import interleave_by_domain
+from shinsa.utils.handle_index import HandleIndex
+from shinsa.utils.name_handles import name_parts
 from shinsa.utils.logger import get_logger
 
 # logger = logging.getLogger(__name__)
 logger = get_logger("coordination", console=True)
 
 
+_handle_index = None
+
+
+def get_handle_index():
+    # Built offline (python -m shinsa.utils.handle_index); without one every handle is a name-built candidate
+    global _handle_index
+    path = LINK_DISCOVERY_CONFIG["index_path"]
+    if _handle_index is None or _handle_index.path != path:
+        if not os.path.exists(path):
+            return None
+        _handle_index = HandleIndex(path)
+    return _handle_index
+
+
+def discover_links(customers):
+    """Profile links for each customer: known handles from the index, name-built candidates for the rest."""
+    index = get_handle_index()
+    sites = LINK_DISCOVERY_CONFIG["sites"]
+    found = []
+    candidates = {}
+    for position, customer in enumerate(customers):
+        # Each name is normalized and transliterated once, for every site
+        parts = name_parts(customer.get("name", ""))
+        known = index.lookup(customer) if index is not None else {}
+        links = []
+        for site, (template, separator) in sites.items():
+            if site in known:
+                links.append(template.format(quote(known[site])))
+            elif parts:
+                url = template.format(quote(separator.join(parts)))
+                links.append(url)
+                candidates.setdefault(url, []).append(position)
+        found.append({"customer": customer, "links": links})
+
+    if candidates and LINK_DISCOVERY_CONFIG["check_candidates"]:
+        # Only unresolved candidates are checked, all in one concurrent round (which also warms the crawl cache)
+        from shinsa.celery_app.tasks.crawl_tasks import crawl_urls
+
+        for url, response in zip(candidates, crawl_urls(list(candidates))):
+            if response["status"] in (404, 410):
+                for position in candidates[url]:
+                    found[position]["links"].remove(url)
+    elif candidates:
+        simulate_latency("find_customer_links")  # Simulate checking candidates (one round per batch)
+    return found
+
+
 @shared_task(bind=True, max_retries=3, name="find_customer_links")
 def find_customer_links(self, customer):
     try:
         customer_name = customer.get("name", "")
         logger.info(f"[Find Links] Processing customer: {customer_name}")
 
-        # Simulate finding links (replace with real logic)
-        time.sleep(120)  # Minimal processing time
-
-        links = [
-            f"https://example.com/{customer_name.replace(' ', '_').lower()}",
-            f"https://socialmedia.com/{customer_name.split()[0].lower()}",
-            f"https://linkedin.com/in/{customer_name.replace(' ', '-').lower()}",
-            f"https://twitter.com/{customer_name.split()[0].lower()}",
-        ]
-        result = {"customer": customer, "links": links, "task_id": self.request.id}
+        result = {**discover_links([customer])[0], "task_id": self.request.id}
 
-        logger.info(f"[Find Links] Found {len(links)} links for {customer_name}")
+        logger.info(f"[Find Links] Found {len(result['links'])} links for {customer_name}")
         return result
     except Exception as exc:
         logger.error(f"[Find Links] Error processing {customer.get('name', 'unknown')}: {str(exc)}")
-        raise self.retry(exc=exc, countdown=60, max_retries=3)
+        raise retry_task(self, exc)
+
+
+@shared_task(bind=True, max_retries=3, name="find_customer_links_batch")
+def find_customer_links_batch(self, customers):
+    try:
+        logger.info(f"[Find Links] Processing {len(customers)} customers")
+
+        # One result message for the whole batch instead of one per customer
+        results = [{**links_result, "task_id": self.request.id} for links_result in discover_links(customers)]
+
+        logger.info(f"[Find Links] Found {sum(len(result['links']) for result in results)} links for {len(customers)} customers")
+        return results
+    except Exception as exc:
+        logger.error(f"[Find Links] Error processing batch of {len(customers)} customers: {str(exc)}")
+        raise retry_task(self, exc)
 
 
 @shared_task(bind=True, max_retries=3, name="process_customer_workflow")
@@ -38,25 +98,34 @@ def process_customer_workflow(self, links_result):
         customer = links_result["customer"]
         links = links_result["links"]
         customer_name = customer.get("name", "Unknown")
+        priority = request_priority(self.request)
 
-        logger.info(f"[Workflow] Starting workflow for {customer_name} with {len(links)} links")
+        logger.info(f"[Workflow] Starting workflow for {customer_name} with {len(links)} links (priority {priority})")
 
         # Import here to avoid circular imports
         from shinsa.celery_app.tasks.crawl_tasks import crawl_link
         from shinsa.celery_app.tasks.analysis_tasks import analyze_content
-        from shinsa.celery_app.tasks.report_tasks import generate_customer_report
+        from shinsa.celery_app.tasks.report_tasks import generate_customer_report, get_report_aggregator
+
+        # Analyses are folded into a running aggregate keyed by this workflow, so only
+        # small markers reach the report chord
+        aggregator = get_report_aggregator()
+        aggregation_id = None
+        if aggregator is not None:
+            aggregation_id = self.request.id
+            aggregator.expect(aggregation_id, customer, links)
 
-        # Create processing chain for each link
+        # Create processing chain for each link; every task of this workflow keeps its priority
         link_chains = []
         for link in links:
             chain_task = chain(
-                crawl_link.s({"customer": customer, "link": link}),
-                analyze_content.s(),
+                crawl_link.s({"customer": customer, "link": link, "workflow_id": self.request.id}).set(priority=priority),
+                analyze_content.s(aggregation_id=aggregation_id).set(priority=priority),
             )
             link_chains.append(chain_task)
 
         # Execute all chains and collect results
-        chord_job = chord(group(link_chains), generate_customer_report.s()).apply_async()
+        chord_job = chord(group(link_chains), generate_customer_report.s().set(priority=priority)).apply_async(priority=priority)
 
         result = {
             "customer": customer,
@@ -71,4 +140,82 @@ def process_customer_workflow(self, links_result):
     except Exception as exc:
         customer_name = links_result.get("customer", {}).get("name", "unknown")
         logger.error(f"[Workflow] Error processing workflow for {customer_name}: {str(exc)}")
-        raise self.retry(exc=exc, countdown=120, max_retries=3)
+        raise retry_task(self, exc)
+
+
+@shared_task(bind=True, max_retries=3, name="process_customers_batch")
+def process_customers_batch(self, links_results, links_per_batch=None):
+    try:
+        links_per_batch = links_per_batch or WORKFLOW_BATCH_CONFIG["links_per_batch"]
+        # Batched link discovery hands over a list of results per task
+        links_results = [item for result in links_results for item in (result if isinstance(result, list) else [result])]
+        customers = [links_result["customer"] for links_result in links_results]
+        link_batches = plan_link_batches(links_results, links_per_batch, workflow_id=self.request.id)
+        links_count = sum(len(batch) for batch in link_batches)
+        priority = request_priority(self.request)
+
+        logger.info(f"[Batch Workflow] Starting workflow for {len(customers)} customers with {links_count} links in {len(link_batches)} batches")
+
+        # Import here to avoid circular imports
+        from shinsa.celery_app.tasks.crawl_tasks import crawl_links_batch
+        from shinsa.celery_app.tasks.analysis_tasks import analyze_content_batch
+        from shinsa.celery_app.tasks.report_tasks import generate_customer_reports_batch, get_report_aggregator, customer_key
+
+        aggregator = get_report_aggregator()
+        aggregation_prefix = None
+        if aggregator is not None:
+            aggregation_prefix = self.request.id
+            for links_result in links_results:
+                aggregator.expect(f"{aggregation_prefix}:{customer_key(links_result['customer'])}", links_result["customer"], links_result["links"])
+
+        # One crawl -> analysis chain per batch instead of per link; reports are split per customer in the callback
+        batch_chains = [
+            chain(crawl_links_batch.s(batch).set(priority=priority), analyze_content_batch.s(aggregation_prefix=aggregation_prefix).set(priority=priority))
+            for batch in link_batches
+        ]
+        chord_job = chord(group(batch_chains), generate_customer_reports_batch.s().set(priority=priority)).apply_async(priority=priority)
+
+        result = {
+            "customers": customers,
+            "workflow_task_id": self.request.id,
+            "report_task_id": chord_job.id,
+            "links_count": links_count,
+            "batches_count": len(link_batches),
+        }
+
+        logger.info(f"[Batch Workflow] Started processing for {len(customers)} customers, report task: {chord_job.id}")
+        return result
+
+    except Exception as exc:
+        logger.error(f"[Batch Workflow] Error processing workflow for {len(links_results)} customers: {str(exc)}")
+        raise retry_task(self, exc)
+
+
+def request_priority(request):
+    # The priority this task was published with, handed down to everything it starts
+    priority = (request.delivery_info or {}).get("priority")
+    return TASK_PRIORITIES["default"] if priority is None else priority
+
+
+def customer_workflow(customer, priority=TASK_PRIORITIES["interactive"]):
+    """Signature running one customer's workflow; all of its tasks run at `priority` (0 = most urgent on Redis)."""
+    # Only the next task reads the links; standalone calls still store them
+    return chain(find_customer_links.s(customer).set(priority=priority, ignore_result=True), process_customer_workflow.s().set(priority=priority))
+
+
+def customers_batch_workflow(customers, priority=TASK_PRIORITIES["batch"]):
+    """Signature running the batched workflow for many customers, behind interactive requests by default."""
+    return chord(group(find_customer_links_batch.s(batch).set(priority=priority) for batch in discovery_batches(customers)), process_customers_batch.s().set(priority=priority))
+
+
+def discovery_batches(customers, customers_per_batch=None):
+    customers = list(customers)
+    customers_per_batch = customers_per_batch or LINK_DISCOVERY_CONFIG["customers_per_batch"]
+    return [customers[i : i + customers_per_batch] for i in range(0, len(customers), customers_per_batch)]
+
+
+def plan_link_batches(links_results, links_per_batch, workflow_id=None):
+    payloads = [{"customer": links_result["customer"], "link": link, "workflow_id": workflow_id} for links_result in links_results for link in links_result["links"]]
+    # Domains round-robin across batches, so each batch's per-domain stagger stays short
+    payloads = interleave_by_domain(payloads, url=lambda payload: payload["link"])
+    return [payloads[i : i + links_per_batch] for i in range(0, len(payloads), links_per_batch)]
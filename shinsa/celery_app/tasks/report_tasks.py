@@ -1,10 +1,52 @@
 import time
+import heapq
 import logging
+from collections import Counter
 from datetime import datetime
 from celery import shared_task
+from shinsa.celery_app.config import REPORT_AGGREGATION_CONFIG, REPORT_STORE_CONFIG, INGEST_CONFIG
+from shinsa.celery_app.backend import get_backend_client
+from shinsa.celery_app.retries import retry_task
+from shinsa.utils.report_aggregator import ReportAggregator
+from shinsa.utils.batch_summary import BatchSummary
+from shinsa.utils.report_store import ReportStore, customer_key
+from shinsa.celery_app.tasks.crawl_tasks import get_claim_check
 
 logger = logging.getLogger(__name__)
 
+_report_aggregator = None
+
+
+def get_report_aggregator():
+    global _report_aggregator
+    if not REPORT_AGGREGATION_CONFIG["enabled"]:
+        return None
+    if _report_aggregator is None:
+        _report_aggregator = ReportAggregator(get_backend_client(), ttl=REPORT_AGGREGATION_CONFIG["ttl"])
+    return _report_aggregator
+
+
+_report_store = None
+
+
+def get_report_store():
+    global _report_store
+    if not REPORT_STORE_CONFIG["enabled"]:
+        return None
+    if _report_store is None:
+        _report_store = ReportStore(REPORT_STORE_CONFIG["path"], busy_timeout=REPORT_STORE_CONFIG["busy_timeout"])
+    return _report_store
+
+
+_batch_summary = None
+
+
+def get_batch_summary():
+    global _batch_summary
+    if _batch_summary is None:
+        _batch_summary = BatchSummary(get_backend_client(), ttl=INGEST_CONFIG["summary_ttl"])
+    return _batch_summary
+
 
 @shared_task(bind=True, max_retries=3, name="generate_customer_report")
 def generate_customer_report(self, analysis_results):
@@ -12,70 +54,57 @@ def generate_customer_report(self, analysis_results):
         if not analysis_results:
             return {"error": "No analysis results provided", "task_id": self.request.id}
 
-        customer = analysis_results[0]["customer"]
-        customer_name = customer.get("name", "Unknown")
-
+        customer_name = analysis_results[0]["customer"].get("name", "Unknown")
         logger.info(f"[Customer Report] Generating report for {customer_name}")
 
-        # Aggregate data from all link analyses
-        total_links = len(analysis_results)
-        total_keywords = []
-        sentiment_scores = []
-        crawled_links = []
-
-        for result in analysis_results:
-            analysis = result.get("analysis", {})
-            total_keywords.extend(analysis.get("keywords", []))
-            sentiment_scores.append(analysis.get("sentiment_score", 0))
-            crawled_links.append(
-                {
-                    "link": result["link"],
-                    "content_length": result.get("original_content_length", 0),
-                    "keywords_count": len(analysis.get("keywords", [])),
-                    "sentiment": analysis.get("sentiment", "neutral"),
-                }
-            )
-
-        # Calculate aggregated metrics
-        avg_sentiment = sum(sentiment_scores) / len(sentiment_scores) if sentiment_scores else 0
-
-        # Get top keywords across all links
-        keyword_counts = {}
-        for kw in total_keywords:
-            word = kw["word"]
-            keyword_counts[word] = keyword_counts.get(word, 0) + kw["count"]
-
-        top_keywords = sorted(
-            [{"word": word, "total_count": count} for word, count in keyword_counts.items()],
-            key=lambda x: x["total_count"],
-            reverse=True,
-        )[:15]
-
-        report = {
-            "customer": customer,
-            "report_metadata": {
-                "generated_at": datetime.utcnow().isoformat(),
-                "report_task_id": self.request.id,
-                "links_processed": total_links,
-            },
-            "summary": {
-                "total_links_analyzed": total_links,
-                "average_sentiment_score": round(avg_sentiment, 3),
-                "overall_sentiment": "positive" if avg_sentiment > 0.1 else "negative" if avg_sentiment < -0.1 else "neutral",
-                "total_unique_keywords": len(top_keywords),
-                "top_keywords": top_keywords,
-            },
-            "link_details": crawled_links,
-            "recommendations": generate_recommendations(avg_sentiment, top_keywords, customer),
-        }
-
-        logger.info(f"[Customer Report] Generated report for {customer_name}: {total_links} links, sentiment: {report['summary']['overall_sentiment']}")
+        aggregation_id = analysis_results[0].get("aggregation_id")
+        if aggregation_id:
+            # Analyses were folded into Redis as they finished; the chord only carried markers
+            report = build_report_from_aggregate(aggregation_id, self.request.id)
+        else:
+            report = build_customer_report(analysis_results, self.request.id)
+        report["change_detection"] = summarize_changes(analysis_results)
+        store_reports([report])
+
+        release_claim_checks(analysis_results)
+        release_aggregates(analysis_results)
+
+        logger.info(f"[Customer Report] Generated report for {customer_name}: {report['summary']['total_links_analyzed']} links, sentiment: {report['summary']['overall_sentiment']}")
         return report
 
     except Exception as exc:
         customer_name = analysis_results[0].get("customer", {}).get("name", "unknown") if analysis_results else "unknown"
         logger.error(f"[Customer Report] Error generating report for {customer_name}: {str(exc)}")
-        raise self.retry(exc=exc, countdown=60, max_retries=3)
+        raise retry_task(self, exc)
+
+
+@shared_task(bind=True, max_retries=3, name="generate_customer_reports_batch")
+def generate_customer_reports_batch(self, analysis_batches):
+    try:
+        # Each chord header result is one analysis batch mixing links from many customers
+        results_by_customer = {}
+        for batch in analysis_batches:
+            for result in batch:
+                results_by_customer.setdefault(result.get("aggregation_id") or customer_key(result["customer"]), []).append(result)
+
+        logger.info(f"[Customer Report] Generating reports for {len(results_by_customer)} customers from {len(analysis_batches)} batches")
+
+        reports = []
+        for key, results in results_by_customer.items():
+            report = build_report_from_aggregate(key, self.request.id) if results[0].get("aggregation_id") else build_customer_report(results, self.request.id)
+            report["change_detection"] = summarize_changes(results)
+            reports.append(report)
+        store_reports(reports)
+
+        release_claim_checks([result for batch in analysis_batches for result in batch])
+        release_aggregates([result for batch in analysis_batches for result in batch])
+
+        logger.info(f"[Customer Report] Generated {len(reports)} customer reports")
+        return reports
+
+    except Exception as exc:
+        logger.error(f"[Customer Report] Error generating batched reports: {str(exc)}")
+        raise retry_task(self, exc)
 
 
 @shared_task(bind=True, max_retries=3, name="batch_generate_report")
@@ -89,29 +118,212 @@ def batch_generate_report(self, customer_workflows):
         # Aggregate batch statistics
         total_links_processed = sum(w.get("links_count", 0) for w in successful_workflows)
 
-        batch_report = {
-            "batch_metadata": {
-                "generated_at": datetime.utcnow().isoformat(),
-                "batch_task_id": self.request.id,
-                "processing_duration": "calculated_externally",
-            },
-            "batch_summary": {
-                "total_customers": len(customer_workflows),
-                "successful_customers": len(successful_workflows),
-                "failed_customers": failed_workflows,
-                "total_links_processed": total_links_processed,
-                "average_links_per_customer": round(total_links_processed / max(len(successful_workflows), 1), 2),
-            },
-            "customer_workflows": successful_workflows,
-            "status": "completed",
-        }
+        batch_report = assemble_batch_report(self.request.id, len(customer_workflows), len(successful_workflows), total_links_processed)
+        batch_report["customer_workflows"] = successful_workflows
+        store_reports(batch_report=batch_report)
 
         logger.info(f"[Batch Report] Batch processing completed: {len(successful_workflows)} successful, {failed_workflows} failed")
         return batch_report
 
     except Exception as exc:
         logger.error(f"[Batch Report] Error generating batch report: {str(exc)}")
-        raise self.retry(exc=exc, countdown=120, max_retries=3)
+        raise retry_task(self, exc)
+
+
+@shared_task(bind=True, max_retries=3, name="record_ingest_window")
+def record_ingest_window(self, window_result, batch_id, window, customers_count):
+    try:
+        # Per-customer windows end in a list of workflow results, batched ones in one batch workflow result.
+        # Both come back once the customers' report chords are dispatched, not when their reports are done
+        if isinstance(window_result, dict):
+            successful = len(window_result.get("customers", []))
+            links = window_result.get("links_count", 0)
+        else:
+            workflows = [w for w in window_result if isinstance(w, dict) and "customer" in w]
+            successful = len(workflows)
+            links = sum(w.get("links_count", 0) for w in workflows)
+
+        completed = get_batch_summary().add_window(batch_id, window, customers_count, successful, links)
+        logger.info(f"[Ingest] Batch {batch_id} window {window}: {successful}/{customers_count} customers, {links} links")
+        if completed:
+            finish_ingest_batch.apply_async(args=[batch_id], task_id=ingest_report_id(batch_id))
+        return {"batch_id": batch_id, "window": window, "successful": successful, "completed": completed}
+
+    except Exception as exc:
+        logger.error(f"[Ingest] Error recording window {window} of batch {batch_id}: {str(exc)}")
+        raise retry_task(self, exc)
+
+
+@shared_task(name="record_failed_ingest_window")
+def record_failed_ingest_window(request, exc, traceback, batch_id, window, customers_count):
+    # Errback of a window workflow: a failed task keeps record_ingest_window from running, so the
+    # window is folded in here with all of its customers failed
+    logger.error(f"[Ingest] Batch {batch_id} window {window} failed: {str(exc)}")
+    completed = get_batch_summary().add_window(batch_id, window, customers_count, 0, 0)
+    if completed:
+        finish_ingest_batch.apply_async(args=[batch_id], task_id=ingest_report_id(batch_id))
+    return {"batch_id": batch_id, "window": window, "successful": 0, "completed": completed}
+
+
+@shared_task(bind=True, max_retries=3, name="finish_ingest_batch")
+def finish_ingest_batch(self, batch_id):
+    try:
+        summary = get_batch_summary().read(batch_id)
+        if summary is None:
+            raise ValueError(f"No summary found for ingest batch {batch_id}")
+
+        batch_report = assemble_batch_report(self.request.id, summary["customers"], summary["successful"], summary["links"])
+        batch_report["batch_metadata"]["ingest_batch_id"] = batch_id
+        batch_report["batch_metadata"]["windows"] = summary["windows_done"]
+        store_reports(batch_report=batch_report)
+
+        logger.info(f"[Ingest] Batch {batch_id} completed: {summary['successful']} successful, {summary['failed']} failed in {summary['windows_done']} windows")
+        return batch_report
+
+    except Exception as exc:
+        logger.error(f"[Ingest] Error finishing batch {batch_id}: {str(exc)}")
+        raise retry_task(self, exc)
+
+
+def ingest_report_id(batch_id):
+    # Fixed, so the submitter can look the report up whichever side completed the batch
+    return f"ingest-report-{batch_id}"
+
+
+def assemble_batch_report(batch_task_id, total_customers, successful_customers, total_links_processed):
+    return {
+        "batch_metadata": {
+            "generated_at": datetime.utcnow().isoformat(),
+            "batch_task_id": batch_task_id,
+            "processing_duration": "calculated_externally",
+        },
+        "batch_summary": {
+            "total_customers": total_customers,
+            "successful_customers": successful_customers,
+            "failed_customers": total_customers - successful_customers,
+            "total_links_processed": total_links_processed,
+            "average_links_per_customer": round(total_links_processed / max(successful_customers, 1), 2),
+        },
+        "status": "completed",
+    }
+
+
+def build_customer_report(analysis_results, report_task_id):
+    customer = analysis_results[0]["customer"]
+
+    # Aggregate data from all link analyses
+    total_links = len(analysis_results)
+    total_keywords = []
+    sentiment_scores = []
+    crawled_links = []
+
+    for result in analysis_results:
+        analysis = result.get("analysis", {})
+        total_keywords.extend(analysis.get("keywords", []))
+        sentiment_scores.append(analysis.get("sentiment_score", 0))
+        crawled_links.append(
+            {
+                "link": result["link"],
+                "content_length": result.get("original_content_length", 0),
+                "keywords_count": len(analysis.get("keywords", [])),
+                "sentiment": analysis.get("sentiment", "neutral"),
+            }
+        )
+
+    # Calculate aggregated metrics
+    avg_sentiment = sum(sentiment_scores) / len(sentiment_scores) if sentiment_scores else 0
+
+    # Get top keywords across all links
+    keyword_counts = Counter()
+    for kw in total_keywords:
+        keyword_counts[kw["word"]] += kw["count"]
+
+    top_keywords = heapq.nlargest(
+        15,
+        ({"word": word, "total_count": count} for word, count in keyword_counts.items()),
+        key=lambda x: x["total_count"],
+    )
+
+    return assemble_customer_report(customer, total_links, avg_sentiment, top_keywords, crawled_links, report_task_id)
+
+
+def build_report_from_aggregate(aggregation_id, report_task_id):
+    aggregator = get_report_aggregator()
+    aggregate = aggregator.read(aggregation_id, top_k=REPORT_AGGREGATION_CONFIG["top_k"])
+    if aggregate is None:
+        raise ValueError(f"No aggregated analysis found for {aggregation_id}")
+
+    avg_sentiment = aggregate["sentiment_sum"] / aggregate["links_processed"] if aggregate["links_processed"] else 0
+    report = assemble_customer_report(
+        aggregate["customer"],
+        aggregate["links_processed"],
+        avg_sentiment,
+        aggregate["top_keywords"],
+        aggregate["crawled_links"],
+        report_task_id,
+    )
+    return report
+
+
+def assemble_customer_report(customer, total_links, avg_sentiment, top_keywords, crawled_links, report_task_id):
+    return {
+        "customer": customer,
+        "report_metadata": {
+            "generated_at": datetime.utcnow().isoformat(),
+            "report_task_id": report_task_id,
+            "links_processed": total_links,
+        },
+        "summary": {
+            "total_links_analyzed": total_links,
+            "average_sentiment_score": round(avg_sentiment, 3),
+            "overall_sentiment": "positive" if avg_sentiment > 0.1 else "negative" if avg_sentiment < -0.1 else "neutral",
+            "total_unique_keywords": len(top_keywords),
+            "top_keywords": top_keywords,
+        },
+        "link_details": crawled_links,
+        "recommendations": generate_recommendations(avg_sentiment, top_keywords, customer),
+    }
+
+
+def store_reports(reports=(), batch_report=None):
+    # The store is an index over reports; a failed write is logged rather than failing the report
+    store = get_report_store()
+    if store is None:
+        return
+    try:
+        store.add_reports(reports)
+        if batch_report is not None:
+            store.add_batch_report(batch_report)
+    except Exception as exc:
+        logger.warning(f"[Report Store] Could not store reports in {store.path}: {str(exc)}")
+
+
+def summarize_changes(analysis_results):
+    # How many pages reused their last analysis (change detection), and the analysis time saved
+    changes = [result["change_detection"] for result in analysis_results if result.get("change_detection")]
+    skipped = sum(1 for change in changes if change["status"] in ("unchanged", "near_duplicate"))
+    return {
+        "pages": len(changes),
+        "skipped": skipped,
+        "skip_rate": round(skipped / max(len(changes), 1), 4),
+        "saved_cpu_seconds": round(sum(change["saved_cpu_seconds"] for change in changes), 3),
+    }
+
+
+def release_claim_checks(analysis_results):
+    # Blobs offloaded by crawl tasks are owned by their workflow and are no longer needed
+    claim_check = get_claim_check()
+    if claim_check is None:
+        return
+    for workflow_id in dict.fromkeys(r["workflow_id"] for r in analysis_results if r.get("workflow_id")):
+        claim_check.release(workflow_id)
+
+
+def release_aggregates(analysis_results):
+    # Last step of a report task: until every report is built and stored, a retry rebuilds from them
+    aggregation_ids = list(dict.fromkeys(r["aggregation_id"] for r in analysis_results if r.get("aggregation_id")))
+    if aggregation_ids:
+        get_report_aggregator().delete(*aggregation_ids)
 
 
 def generate_recommendations(sentiment_score, top_keywords, customer):
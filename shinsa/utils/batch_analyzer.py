@@ -0,0 +1,81 @@
+from collections import Counter
+from itertools import chain
+import numpy as np
+from shinsa.utils.text_analyzer import get_text_analyzer, sentiment_label
+
+
+class BatchTextAnalyzer:
+    """Analyzes many documents at once over a shared vocabulary.
+
+    Each document is tokenized into a Counter, then all (document, word, count)
+    triples are laid out as one sparse COO count matrix so stop-word filtering,
+    totals, sentiment and top-keyword ranking run as NumPy array operations.
+    Output matches TextAnalyzer.analyze for every document.
+    """
+
+    def __init__(self, analyzer=None):
+        self.analyzer = analyzer or get_text_analyzer()
+
+    def count_matrix(self, documents):
+        # COO layout over a vocabulary shared by the batch; within a document,
+        # entries keep first-seen order (Counter order). Vocabulary building and
+        # id lookup stay in C (set union, dict/map) rather than Python loops.
+        pattern = self.analyzer.token_pattern
+        doc_counts = [Counter(pattern.findall(content.lower())) for content in documents]
+        words = list(set().union(*doc_counts))
+        vocabulary = dict(zip(words, range(len(words))))
+
+        sizes = np.fromiter(map(len, doc_counts), dtype=np.int64, count=len(doc_counts))
+        doc_ids = np.repeat(np.arange(len(doc_counts)), sizes)
+        word_ids = np.fromiter(chain.from_iterable(map(vocabulary.__getitem__, counts) for counts in doc_counts), dtype=np.int64, count=int(sizes.sum()))
+        counts = np.fromiter(chain.from_iterable(counts.values() for counts in doc_counts), dtype=np.int64, count=int(sizes.sum()))
+        return words, vocabulary, doc_ids, word_ids, counts
+
+    def lexicon_arrays(self, vocabulary):
+        # Lexicons are tiny, so only their own words are looked up in the vocabulary
+        is_stop = np.zeros(len(vocabulary), dtype=bool)
+        is_stop[[vocabulary[word] for word in self.analyzer.stop_words if word in vocabulary]] = True
+        polarity = np.zeros(len(vocabulary), dtype=np.int64)
+        polarity[[vocabulary[word] for word in self.analyzer.positive_words if word in vocabulary]] = 1
+        polarity[[vocabulary[word] for word in self.analyzer.negative_words if word in vocabulary]] = -1
+        return is_stop, polarity
+
+    def analyze_many(self, documents, max_keywords=20):
+        n = len(documents)
+        words, vocabulary, doc_ids, word_ids, counts = self.count_matrix(documents)
+        is_stop, polarity = self.lexicon_arrays(vocabulary)
+
+        word_count = np.bincount(doc_ids, weights=counts, minlength=n).astype(np.int64)
+
+        keep = ~is_stop[word_ids]
+        doc_ids, word_ids, counts = doc_ids[keep], word_ids[keep], counts[keep]
+        filtered_total = np.bincount(doc_ids, weights=counts, minlength=n).astype(np.int64)
+        unique_words = np.bincount(doc_ids, minlength=n)
+        polarity_total = np.bincount(doc_ids, weights=counts * polarity[word_ids], minlength=n).astype(np.int64)
+
+        # Rank by (document, count desc, first-seen position) like Counter.most_common, then keep the top K
+        positions = np.arange(len(doc_ids))
+        order = np.lexsort((positions, -counts, doc_ids))
+        ranked_docs = doc_ids[order]
+        doc_starts = np.searchsorted(ranked_docs, np.arange(n))
+        rank = np.arange(len(order)) - doc_starts[ranked_docs]
+        top = order[rank < max_keywords]
+        top_docs, top_words, top_counts = doc_ids[top].tolist(), word_ids[top].tolist(), counts[top].tolist()
+
+        keywords = [[] for _ in range(n)]
+        for doc_id, word_id, count in zip(top_docs, top_words, top_counts):
+            keywords[doc_id].append({"word": words[word_id], "count": count})
+
+        results = []
+        for doc_id in range(n):
+            sentiment_score = int(polarity_total[doc_id]) / max(int(filtered_total[doc_id]), 1)
+            results.append(
+                {
+                    "keywords": keywords[doc_id],
+                    "word_count": int(word_count[doc_id]),
+                    "unique_words": int(unique_words[doc_id]),
+                    "sentiment_score": sentiment_score,
+                    "sentiment": sentiment_label(sentiment_score),
+                }
+            )
+        return results
@@ -0,0 +1,77 @@
+import logging
+
+logger = logging.getLogger(__name__)
+
+KEY_PREFIX = "batch-summary"
+COUNTS = ("customers", "successful", "failed", "links")
+
+
+def _decode(value):
+    return value.decode("utf-8") if isinstance(value, bytes) else value
+
+
+# A batch is complete once its submitter has said how many windows there are and that many
+# have been folded in; exactly one caller (the last window or the close) is told so
+COMPLETE_CHECK = """
+local total = tonumber(redis.call('HGET', KEYS[1], 'windows_total'))
+local done = tonumber(redis.call('HGET', KEYS[1], 'windows_done') or '0')
+if total and done >= total and redis.call('HSETNX', KEYS[1], 'completed', '1') == 1 then
+    return 1
+end
+return 0
+"""
+
+# ARGV: ttl, window index, then field/count pairs. The per-window field keeps a
+# redelivered window from being counted twice.
+ADD_WINDOW_SCRIPT = """
+if redis.call('HSETNX', KEYS[1], 'window:' .. ARGV[2], '1') == 0 then
+    return 0
+end
+for i = 3, #ARGV, 2 do
+    redis.call('HINCRBY', KEYS[1], ARGV[i], ARGV[i + 1])
+end
+redis.call('HINCRBY', KEYS[1], 'windows_done', 1)
+redis.call('EXPIRE', KEYS[1], ARGV[1])
+""" + COMPLETE_CHECK
+
+# ARGV: ttl, number of windows
+CLOSE_SCRIPT = """
+redis.call('HSET', KEYS[1], 'windows_total', ARGV[2])
+redis.call('EXPIRE', KEYS[1], ARGV[1])
+""" + COMPLETE_CHECK
+
+
+class BatchSummary:
+    """Running totals of a streamed batch in Redis, folded in one window at a time.
+
+    Windows finish in any order, possibly before the submitter knows how many
+    there will be. `add_window` and `close` both report whether their call
+    completed the batch, so the final report is built once.
+    """
+
+    def __init__(self, client, ttl=24 * 3600):
+        self.client = client
+        self.ttl = ttl
+        self._add_window = client.register_script(ADD_WINDOW_SCRIPT)
+        self._close = client.register_script(CLOSE_SCRIPT)
+
+    def _key(self, batch_id):
+        return f"{KEY_PREFIX}:{batch_id}"
+
+    def add_window(self, batch_id, window, customers, successful, links):
+        counts = {"customers": customers, "successful": successful, "failed": customers - successful, "links": links}
+        args = [self.ttl, window] + [value for field, count in counts.items() for value in (field, count)]
+        return bool(self._add_window(keys=[self._key(batch_id)], args=args))
+
+    def close(self, batch_id, windows):
+        return bool(self._close(keys=[self._key(batch_id)], args=[self.ttl, windows]))
+
+    def windows_done(self, batch_id):
+        return int(self.client.hget(self._key(batch_id), "windows_done") or 0)
+
+    def read(self, batch_id):
+        values = self.client.hgetall(self._key(batch_id))
+        if not values:
+            return None
+        values = {_decode(field): int(value) for field, value in values.items()}
+        return {field: values.get(field, 0) for field in (*COUNTS, "windows_done", "windows_total")}
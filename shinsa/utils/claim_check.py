@@ -0,0 +1,137 @@
+import os
+import mmap
+import time
+import uuid
+import shutil
+import hashlib
+import logging
+
+logger = logging.getLogger(__name__)
+
+KEY_PREFIX = "claim-check"
+UNOWNED = "unowned"
+
+
+def _blob_name(data):
+    # Identical content within one owner is written once
+    return hashlib.sha256(data).hexdigest()
+
+
+class FileBlobStore:
+    """Blobs on a shared filesystem, one directory per owner, memory-mapped on read.
+
+    Nothing expires on its own: `sweep` removes owners (and unowned blobs)
+    that have not been written to for `ttl` seconds.
+    """
+
+    kind = "file"
+
+    def __init__(self, root, ttl=24 * 3600):
+        self.root = root
+        self.ttl = ttl
+
+    def _path(self, key):
+        return os.path.join(self.root, key)
+
+    def put(self, text, owner=None):
+        data = text.encode("utf-8")
+        key = os.path.join(owner or UNOWNED, _blob_name(data))
+        path = self._path(key)
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        else:
+            # Written again: keep it as long as a new blob
+            os.utime(path)
+        return {"store": self.kind, "key": key, "size": len(data), "owner": owner}
+
+    def load_text(self, ref):
+        with open(self._path(ref["key"]), "rb") as f:
+            if ref["size"] == 0:
+                return ""
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                # Decode straight from the mapped pages, without an intermediate bytes copy
+                with memoryview(mapped) as view:
+                    return str(view, "utf-8")
+
+    def release(self, owner):
+        shutil.rmtree(self._path(owner), ignore_errors=True)
+
+    def sweep(self, now=None):
+        """Remove blobs of abandoned workflows; return the number of owners and unowned blobs removed."""
+        cutoff = (now or time.time()) - self.ttl
+        removed = 0
+        if not os.path.isdir(self.root):
+            return removed
+        for entry in os.scandir(self.root):
+            # An owner directory's mtime moves whenever a blob is added to it
+            if entry.name != UNOWNED and entry.stat().st_mtime < cutoff:
+                shutil.rmtree(entry.path, ignore_errors=True)
+                removed += 1
+        unowned = self._path(UNOWNED)
+        if os.path.isdir(unowned):
+            for entry in os.scandir(unowned):
+                if entry.stat().st_mtime < cutoff:
+                    os.remove(entry.path)
+                    removed += 1
+        return removed
+
+
+class RedisBlobStore:
+    """Blobs in Redis keys with a TTL; an owner set lists them for early release."""
+
+    kind = "redis"
+
+    def __init__(self, client, ttl=24 * 3600):
+        self.client = client
+        self.ttl = ttl
+
+    def put(self, text, owner=None):
+        data = text.encode("utf-8")
+        key = f"{KEY_PREFIX}:blob:{owner or UNOWNED}:{_blob_name(data)}"
+        pipe = self.client.pipeline()
+        pipe.set(key, data, ex=self.ttl)
+        if owner:
+            pipe.sadd(f"{KEY_PREFIX}:owner:{owner}", key)
+            pipe.expire(f"{KEY_PREFIX}:owner:{owner}", self.ttl)
+        pipe.execute()
+        return {"store": self.kind, "key": key, "size": len(data), "owner": owner}
+
+    def load_text(self, ref):
+        data = self.client.get(ref["key"])
+        if data is None:
+            raise KeyError(f"Claim-check blob {ref['key']} has expired or was released")
+        return data.decode("utf-8")
+
+    def release(self, owner):
+        owner_key = f"{KEY_PREFIX}:owner:{owner}"
+        keys = self.client.smembers(owner_key)
+        self.client.delete(owner_key, *keys)
+
+
+class ClaimCheck:
+    """Swaps large `content` fields for a blob reference and resolves them back."""
+
+    def __init__(self, store, threshold=16 * 1024):
+        self.store = store
+        self.threshold = threshold
+
+    def offload(self, payload, owner=None):
+        content = payload.get("content")
+        if content is None or len(content) < self.threshold:
+            return payload
+        ref = self.store.put(content, owner)
+        return {**payload, "content": None, "content_ref": ref}
+
+    def resolve(self, payload):
+        ref = payload.get("content_ref")
+        if ref is None:
+            return payload["content"]
+        return self.store.load_text(ref)
+
+    def release(self, owner):
+        self.store.release(owner)
+        logger.info(f"[Claim Check] Released blobs of {owner}")
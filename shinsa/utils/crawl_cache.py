@@ -0,0 +1,234 @@
+import time
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+
+logger = logging.getLogger(__name__)
+
+KEY_PREFIX = "crawl-cache"
+DEFAULT_PORTS = {"http": 80, "https": 443}
+
+
+def normalize_url(url):
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or "").lower()
+    if parts.port and parts.port != DEFAULT_PORTS.get(scheme):
+        host = f"{host}:{parts.port}"
+    path = parts.path.rstrip("/") or "/"
+    query = urlencode(sorted(parse_qsl(parts.query, keep_blank_values=True)))
+    # Fragments never reach the server, so they are dropped
+    return urlunsplit((scheme, host, path, query, ""))
+
+
+def url_key(url):
+    return hashlib.sha256(normalize_url(url).encode("utf-8")).hexdigest()
+
+
+def content_hash(content):
+    return hashlib.sha256(content.encode("utf-8")).hexdigest()
+
+
+def _decode(value):
+    return value.decode("utf-8") if isinstance(value, bytes) else value
+
+
+class LocalLRU:
+    """In-process LRU bounded by entry count and total content bytes."""
+
+    def __init__(self, max_entries=1024, max_bytes=64 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.total_bytes = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def put(self, key, entry):
+        size = len(entry["content"])
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self.total_bytes -= len(old["content"])
+            self._entries[key] = entry
+            self.total_bytes += size
+            while len(self._entries) > self.max_entries or self.total_bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self.total_bytes -= len(evicted["content"])
+
+    def pop(self, key):
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            if entry is not None:
+                self.total_bytes -= len(entry["content"])
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class CrawlCache:
+    """Two-tier crawl content cache: local LRU in front of Redis.
+
+    URL entries (validators + timestamps) point at content blobs stored under
+    their content hash, so pages shared by many URLs are stored once. Entries
+    are fresh for `ttl` seconds and kept for `stale_ttl` seconds so that
+    stale ones can be revalidated with ETag/Last-Modified.
+    """
+
+    def __init__(self, client, ttl=6 * 3600, stale_ttl=7 * 24 * 3600, max_entries=100_000, local_max_entries=1024, local_max_bytes=64 * 1024 * 1024, clock=time.time):
+        self.client = client
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.max_entries = max_entries
+        self.local = LocalLRU(local_max_entries, local_max_bytes)
+        self.clock = clock
+        self.local_stats = {"hits": 0, "local_hits": 0, "misses": 0, "revalidated": 0}
+
+    def _url_entry_key(self, key):
+        return f"{KEY_PREFIX}:url:{key}"
+
+    def _content_key(self, digest):
+        return f"{KEY_PREFIX}:content:{digest}"
+
+    def _count(self, stat):
+        self.local_stats[stat] += 1
+        self.client.incr(f"{KEY_PREFIX}:stats:{stat}")
+
+    def is_fresh(self, entry):
+        return self.clock() - entry["stored_at"] < self.ttl
+
+    def lookup(self, url):
+        key = url_key(url)
+        entry = self.local.get(key)
+        # A stale local copy may have been revalidated by another worker, so check Redis too
+        if entry is not None and self.is_fresh(entry):
+            self.local_stats["local_hits"] += 1
+            return entry
+
+        fields = self.client.hgetall(self._url_entry_key(key))
+        if not fields:
+            return None
+        fields = {_decode(k): _decode(v) for k, v in fields.items()}
+        content = self.client.get(self._content_key(fields["content_hash"]))
+        if content is None:
+            return None
+
+        entry = {
+            "content": _decode(content),
+            "content_hash": fields["content_hash"],
+            "etag": fields.get("etag") or None,
+            "last_modified": fields.get("last_modified") or None,
+            "stored_at": float(fields["stored_at"]),
+        }
+        self.local.put(key, entry)
+        return entry
+
+    def store(self, url, content, etag=None, last_modified=None):
+        key = url_key(url)
+        digest = content_hash(content)
+        now = self.clock()
+        entry = {"content": content, "content_hash": digest, "etag": etag, "last_modified": last_modified, "stored_at": now}
+
+        pipe = self.client.pipeline()
+        pipe.set(self._content_key(digest), content, ex=self.stale_ttl)
+        pipe.hset(
+            self._url_entry_key(key),
+            mapping={"content_hash": digest, "etag": etag or "", "last_modified": last_modified or "", "stored_at": now},
+        )
+        pipe.expire(self._url_entry_key(key), self.stale_ttl)
+        pipe.zadd(f"{KEY_PREFIX}:lru", {key: now})
+        pipe.execute()
+        self.local.put(key, entry)
+        self._evict()
+        return entry
+
+    def touch(self, url, entry):
+        # A 304 response: keep the stored content and restart its freshness window
+        key = url_key(url)
+        now = self.clock()
+        entry = {**entry, "stored_at": now}
+        pipe = self.client.pipeline()
+        pipe.hset(self._url_entry_key(key), "stored_at", now)
+        pipe.expire(self._url_entry_key(key), self.stale_ttl)
+        pipe.expire(self._content_key(entry["content_hash"]), self.stale_ttl)
+        pipe.zadd(f"{KEY_PREFIX}:lru", {key: now})
+        pipe.execute()
+        self.local.put(key, entry)
+        return entry
+
+    def _evict(self):
+        overflow = self.client.zcard(f"{KEY_PREFIX}:lru") - self.max_entries
+        if overflow <= 0:
+            return
+        evicted = [_decode(member) for member, _ in self.client.zpopmin(f"{KEY_PREFIX}:lru", overflow)]
+        # Content blobs may be shared with other URLs, so they are left to expire on their own
+        self.client.delete(*[self._url_entry_key(key) for key in evicted])
+        for key in evicted:
+            self.local.pop(key)
+        logger.info(f"[Crawl Cache] Evicted {len(evicted)} least recently used entries")
+
+    def conditional_headers(self, entry):
+        headers = {}
+        if entry.get("etag"):
+            headers["If-None-Match"] = entry["etag"]
+        if entry.get("last_modified"):
+            headers["If-Modified-Since"] = entry["last_modified"]
+        return headers
+
+    def fetch(self, url, fetch):
+        """Return `fetch(url, headers)`'s response, served from or revalidated against the cache.
+
+        The response gains `cache_hit`, which is true for fresh hits and 304 revalidations.
+        """
+        entry = self.lookup(url)
+        if entry is not None and self.is_fresh(entry):
+            return self.hit(url, entry)
+
+        headers = self.conditional_headers(entry) if entry is not None else {}
+        response = fetch(url, headers or None)
+        return self.resolve(url, entry, response)
+
+    def hit(self, url, entry):
+        self.local_stats["hits"] += 1
+        pipe = self.client.pipeline()
+        pipe.incr(f"{KEY_PREFIX}:stats:hits")
+        pipe.zadd(f"{KEY_PREFIX}:lru", {url_key(url): self.clock()})
+        pipe.execute()
+        return self.response_from_entry(url, entry)
+
+    def resolve(self, url, entry, response):
+        # Fold a fetch response (possibly conditional) into the cache
+        if entry is not None and response.get("status") == 304:
+            self._count("revalidated")
+            return self.response_from_entry(url, self.touch(url, entry))
+
+        self._count("misses")
+        if not response.get("error"):
+            response_headers = {k.lower(): v for k, v in (response.get("headers") or {}).items()}
+            self.store(url, response["content"], etag=response_headers.get("etag"), last_modified=response_headers.get("last-modified"))
+        return {**response, "cache_hit": False}
+
+    def response_from_entry(self, url, entry):
+        return {"url": url, "status": 200, "headers": {}, "content": entry["content"], "error": None, "cache_hit": True}
+
+    def stats(self):
+        shared = self.client.mget([f"{KEY_PREFIX}:stats:{stat}" for stat in ("hits", "misses", "revalidated")])
+        hits, misses, revalidated = (int(value or 0) for value in shared)
+        return {
+            "hits": hits,
+            "misses": misses,
+            "revalidated": revalidated,
+            "hit_ratio": round((hits + revalidated) / max(hits + revalidated + misses, 1), 4),
+            "entries": self.client.zcard(f"{KEY_PREFIX}:lru"),
+            "process": {**self.local_stats, "local_entries": len(self.local), "local_bytes": self.local.total_bytes},
+        }
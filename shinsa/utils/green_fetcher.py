@@ -0,0 +1,164 @@
+import os
+import sys
+import time
+import zlib
+import queue
+import logging
+import threading
+import http.client
+from urllib.parse import urljoin, urlsplit
+from shinsa.utils.http_fetcher import DEFAULT_HEADERS
+
+logger = logging.getLogger(__name__)
+
+REDIRECT_STATUSES = {301, 302, 303, 307, 308}
+MAX_REDIRECTS = 10
+
+
+def gevent_patched():
+    # True inside a `celery worker -P gevent` process, where the standard library is monkey-patched
+    monkey = sys.modules.get("gevent.monkey")
+    return monkey is not None and monkey.is_module_patched("socket")
+
+
+def _decode_body(response, body):
+    encoding = (response.getheader("Content-Encoding") or "").lower()
+    if encoding == "gzip":
+        body = zlib.decompress(body, 16 + zlib.MAX_WBITS)
+    elif encoding == "deflate":
+        body = zlib.decompress(body)
+    return body.decode(response.headers.get_content_charset() or "utf-8", errors="replace")
+
+
+class GreenFetcher:
+    """Blocking HTTP client for gevent workers, cooperative through the patched socket module.
+
+    Same options and result dicts as AsyncFetcher: keep-alive connections are pooled per host,
+    with a global and a per-host concurrency limit. Name resolution is left to gevent's resolver.
+    """
+
+    def __init__(self, limit=500, limit_per_host=8, dns_ttl=300, timeout=10, keepalive_timeout=30, headers=None):
+        self.limit = limit
+        self.limit_per_host = limit_per_host
+        self.timeout = timeout
+        self.keepalive_timeout = keepalive_timeout
+        self.headers = {**DEFAULT_HEADERS, "Accept-Encoding": "gzip, deflate", **(headers or {})}
+        self._slots = threading.BoundedSemaphore(limit)
+        self._host_slots = {}
+        self._idle = {}
+        self._lock = threading.Lock()
+
+    def _host(self, scheme, netloc):
+        key = (scheme, netloc)
+        with self._lock:
+            if key not in self._host_slots:
+                self._host_slots[key] = threading.BoundedSemaphore(self.limit_per_host)
+                self._idle[key] = queue.LifoQueue()
+        return key, self._host_slots[key], self._idle[key]
+
+    def _connection(self, key, idle):
+        while True:
+            try:
+                conn, last_used = idle.get_nowait()
+            except queue.Empty:
+                break
+            if time.monotonic() - last_used < self.keepalive_timeout:
+                return conn, True
+            conn.close()
+        scheme, netloc = key
+        connection_class = http.client.HTTPSConnection if scheme == "https" else http.client.HTTPConnection
+        return connection_class(netloc, timeout=self.timeout), False
+
+    def _get(self, url, headers):
+        parts = urlsplit(url)
+        path = parts.path or "/"
+        if parts.query:
+            path = f"{path}?{parts.query}"
+        key, host_slots, idle = self._host(parts.scheme, parts.netloc)
+        # Per-host slot first, so requests queued behind a busy host don't hold global slots
+        with host_slots, self._slots:
+            conn, reused = self._connection(key, idle)
+            try:
+                conn.request("GET", path, headers=headers)
+                response = conn.getresponse()
+            except (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError):
+                conn.close()
+                if not reused:
+                    raise
+                # The server dropped an idle keep-alive connection; retry once on a fresh one
+                conn, _ = self._connection(key, queue.LifoQueue())
+                conn.request("GET", path, headers=headers)
+                response = conn.getresponse()
+            body = response.read()
+            if response.will_close:
+                conn.close()
+            else:
+                idle.put((conn, time.monotonic()))
+        return response, body
+
+    def fetch(self, url, headers=None):
+        started = time.perf_counter()
+        request_headers = {**self.headers, **(headers or {})}
+        try:
+            current = url
+            for _ in range(MAX_REDIRECTS + 1):
+                response, body = self._get(current, request_headers)
+                location = response.getheader("Location")
+                if response.status not in REDIRECT_STATUSES or not location:
+                    break
+                current = urljoin(current, location)
+            return {
+                "url": url,
+                "status": response.status,
+                "headers": dict(response.getheaders()),
+                "content": _decode_body(response, body),
+                "elapsed": time.perf_counter() - started,
+                "error": None if response.status < 400 else f"HTTP {response.status}",
+            }
+        except (OSError, http.client.HTTPException, zlib.error) as exc:
+            logger.warning(f"[Fetcher] Request to {url} failed: {exc!r}")
+            return {
+                "url": url,
+                "status": None,
+                "headers": {},
+                "content": "",
+                "elapsed": time.perf_counter() - started,
+                "error": repr(exc),
+            }
+
+    def fetch_many(self, urls, headers=None, per_url_headers=None, start_delays=None):
+        import gevent
+
+        # Results keep the order of `urls`; the semaphores enforce the concurrency limits
+        per_url_headers = per_url_headers or [None] * len(urls)
+        start_delays = start_delays or [0] * len(urls)
+        jobs = [
+            gevent.spawn_later(delay, self.fetch, url, {**(headers or {}), **(extra or {})} or None)
+            for url, extra, delay in zip(urls, per_url_headers, start_delays)
+        ]
+        gevent.joinall(jobs)
+        return [job.get() for job in jobs]
+
+    def close(self):
+        with self._lock:
+            for idle in self._idle.values():
+                while True:
+                    try:
+                        conn, _ = idle.get_nowait()
+                    except queue.Empty:
+                        break
+                    conn.close()
+
+
+_fetcher = None
+_fetcher_pid = None
+_fetcher_lock = threading.Lock()
+
+
+def get_green_fetcher(**fetcher_options):
+    global _fetcher, _fetcher_pid
+    with _fetcher_lock:
+        if _fetcher is None or _fetcher_pid != os.getpid():
+            _fetcher = GreenFetcher(**fetcher_options)
+            _fetcher_pid = os.getpid()
+        return _fetcher
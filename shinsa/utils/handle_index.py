@@ -0,0 +1,122 @@
+"""On-disk index of known profile handles, memory-mapped for lookups.
+
+Build one from JSON lines of {"name": ..., "email": ... (optional), "handles": {"linkedin.com": ...}}:
+
+    python -m shinsa.utils.handle_index handles.jsonl handles.idx
+
+Layout: a 16-byte header (magic, slot count), an open-addressing table of
+(64-bit key hash, record offset) slots at most half full, then the records,
+each a length-prefixed JSON object holding its key and handles. A lookup
+hashes the key, probes the table in the mapped pages and decodes one record.
+"""
+
+import os
+import sys
+import json
+import mmap
+import struct
+import hashlib
+import logging
+from shinsa.utils.name_handles import normalize_name
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b"SHNDX001"
+HEADER = struct.Struct("<8sQ")
+SLOT = struct.Struct("<QQ")
+LENGTH = struct.Struct("<I")
+
+
+def _key_hash(key):
+    # Never 0, which marks an empty slot
+    return int.from_bytes(hashlib.blake2b(key.encode("utf-8"), digest_size=8).digest(), "little") | 1
+
+
+def customer_keys(customer):
+    # An email identifies a customer better than a name two customers may share
+    keys = []
+    if customer.get("email"):
+        keys.append(f"email:{customer['email'].strip().casefold()}")
+    if customer.get("name"):
+        keys.append(f"name:{normalize_name(customer['name'])}")
+    return keys
+
+
+def build_handle_index(entries, path):
+    """Write an index for `entries` ({"name", "email", "handles"} dicts) to `path`; return the number of keys."""
+    records = {}
+    for entry in entries:
+        for key in customer_keys(entry):
+            records.setdefault(key, {}).update(entry["handles"])
+
+    slots = 1
+    while slots < 2 * max(len(records), 1):
+        slots *= 2
+    table = [(0, 0)] * slots
+    blobs = []
+    offset = HEADER.size + slots * SLOT.size
+    for key, handles in records.items():
+        blob = json.dumps({"key": key, "handles": handles}, ensure_ascii=False).encode("utf-8")
+        slot = _key_hash(key) % slots
+        while table[slot][0]:
+            slot = (slot + 1) % slots
+        table[slot] = (_key_hash(key), offset)
+        blobs.append(LENGTH.pack(len(blob)) + blob)
+        offset += LENGTH.size + len(blob)
+
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(HEADER.pack(MAGIC, slots))
+        f.write(b"".join(SLOT.pack(*slot) for slot in table))
+        f.write(b"".join(blobs))
+    os.replace(tmp_path, path)
+    return len(records)
+
+
+class HandleIndex:
+    """Read-only view of a handle index file; safe to share across forked processes."""
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, "rb") as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, self.slots = HEADER.unpack_from(self._map, 0)
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not a handle index")
+
+    def get(self, key):
+        wanted = _key_hash(key)
+        slot = wanted % self.slots
+        while True:
+            key_hash, offset = SLOT.unpack_from(self._map, HEADER.size + slot * SLOT.size)
+            if not key_hash:
+                return None
+            if key_hash == wanted:
+                (length,) = LENGTH.unpack_from(self._map, offset)
+                record = json.loads(self._map[offset + LENGTH.size : offset + LENGTH.size + length])
+                if record["key"] == key:
+                    return record["handles"]
+            slot = (slot + 1) % self.slots
+
+    def lookup(self, customer):
+        """Known handles for a customer by site, from the email entry first, then the name entry."""
+        handles = {}
+        for key in reversed(customer_keys(customer)):
+            handles.update(self.get(key) or {})
+        return handles
+
+    def close(self):
+        self._map.close()
+
+
+def main():
+    if len(sys.argv) != 3:
+        sys.exit("Usage: python -m shinsa.utils.handle_index handles.jsonl handles.idx")
+    with open(sys.argv[1], encoding="utf-8") as f:
+        count = build_handle_index((json.loads(line) for line in f if line.strip()), sys.argv[2])
+    print(f"Indexed {count} keys into {sys.argv[2]}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+import os
+import time
+import asyncio
+import logging
+import threading
+import aiohttp
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_HEADERS = {"User-Agent": "Mozilla/5.0 (compatible; CustomerProcessor/1.0)"}
+
+
+class AsyncFetcher:
+    """asyncio HTTP client with pooled keep-alive connections, per-host limits and DNS caching."""
+
+    def __init__(self, limit=500, limit_per_host=8, dns_ttl=300, timeout=10, keepalive_timeout=30, headers=None):
+        self.limit = limit
+        self.limit_per_host = limit_per_host
+        self.dns_ttl = dns_ttl
+        self.timeout = timeout
+        self.keepalive_timeout = keepalive_timeout
+        self.headers = {**DEFAULT_HEADERS, **(headers or {})}
+        self._session = None
+
+    async def _get_session(self):
+        # Session (and its connector) is created lazily so it binds to the running loop
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=self.limit,
+                limit_per_host=self.limit_per_host,
+                use_dns_cache=True,
+                ttl_dns_cache=self.dns_ttl,
+                keepalive_timeout=self.keepalive_timeout,
+            )
+            self._session = aiohttp.ClientSession(
+                connector=connector,
+                timeout=aiohttp.ClientTimeout(total=self.timeout),
+                headers=self.headers,
+            )
+        return self._session
+
+    async def fetch(self, url, headers=None):
+        session = await self._get_session()
+        started = time.perf_counter()
+        try:
+            async with session.get(url, headers=headers) as response:
+                content = await response.text(errors="replace")
+                return {
+                    "url": url,
+                    "status": response.status,
+                    "headers": dict(response.headers),
+                    "content": content,
+                    "elapsed": time.perf_counter() - started,
+                    "error": None if response.status < 400 else f"HTTP {response.status}",
+                }
+        except (aiohttp.ClientError, asyncio.TimeoutError) as exc:
+            logger.warning(f"[Fetcher] Request to {url} failed: {exc!r}")
+            return {
+                "url": url,
+                "status": None,
+                "headers": {},
+                "content": "",
+                "elapsed": time.perf_counter() - started,
+                "error": repr(exc),
+            }
+
+    async def fetch_after(self, delay, url, headers=None):
+        if delay:
+            await asyncio.sleep(delay)
+        return await self.fetch(url, headers=headers)
+
+    async def fetch_many(self, urls, headers=None, per_url_headers=None, start_delays=None):
+        # Results keep the order of `urls`; the connector enforces the concurrency limits.
+        # start_delays stagger requests (per-domain politeness) without holding a connection.
+        per_url_headers = per_url_headers or [None] * len(urls)
+        start_delays = start_delays or [0] * len(urls)
+        return await asyncio.gather(
+            *(self.fetch_after(delay, url, headers={**(headers or {}), **(extra or {})} or None) for url, extra, delay in zip(urls, per_url_headers, start_delays))
+        )
+
+    async def close(self):
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+
+
+class FetchEngine:
+    """Runs an AsyncFetcher on a private event-loop thread so synchronous task code can share one pool."""
+
+    def __init__(self, **fetcher_options):
+        self.fetcher = AsyncFetcher(**fetcher_options)
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, name="fetch-engine", daemon=True)
+        self._thread.start()
+
+    def run(self, coro, timeout=None):
+        return asyncio.run_coroutine_threadsafe(coro, self._loop).result(timeout)
+
+    def fetch(self, url, headers=None):
+        return self.run(self.fetcher.fetch(url, headers=headers))
+
+    def fetch_many(self, urls, headers=None, per_url_headers=None, start_delays=None):
+        return self.run(self.fetcher.fetch_many(urls, headers=headers, per_url_headers=per_url_headers, start_delays=start_delays))
+
+    def close(self):
+        if self._loop.is_closed():
+            return
+        self.run(self.fetcher.close())
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+        self._loop.close()
+
+
+_engine = None
+_engine_pid = None
+_engine_lock = threading.Lock()
+
+
+def get_fetch_engine(**fetcher_options):
+    # One engine per process: prefork children must not reuse the parent's loop thread or sockets
+    global _engine, _engine_pid
+    with _engine_lock:
+        if _engine is None or _engine_pid != os.getpid():
+            _engine = FetchEngine(**fetcher_options)
+            _engine_pid = os.getpid()
+        return _engine
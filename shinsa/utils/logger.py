@@ -1,16 +1,312 @@
 import os
 import sys
+import json
+import queue
+import atexit
 import logging
-from datetime import datetime
-from logging.handlers import TimedRotatingFileHandler
+import threading
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, TimedRotatingFileHandler
 
 # PROJECT_ROOT = os.path.dirname(os.path.abspath(__file__))
 # PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-print(f"Project Root: {PROJECT_ROOT}")
+# Created on the first write, so importing this module has no filesystem side effects
 LOG_DIR = os.path.join(PROJECT_ROOT, "logs")
-print(f"Log Directory: {LOG_DIR}")
-os.makedirs(LOG_DIR, exist_ok=True)
+
+# "direct": every process writes its own handlers synchronously (the original behaviour).
+# "queue": loggers only enqueue; one writer thread per process tree (per worker node) formats
+# JSON lines, writes them in batches and is the only one to rotate the files. That covers the
+# get_logger loggers and, through the package logger, every logging.getLogger(__name__) in shinsa.
+LOG_CONFIG = {
+    "mode": os.getenv("SHINSA_LOG_MODE", "direct"),
+    "batch_size": int(os.getenv("SHINSA_LOG_BATCH_SIZE", "256")),
+}
+
+TEXT_FORMAT = "[{asctime}] | {levelname:^8} | {name}:{funcName} | {message}"
+PACKAGE_LOGGER = "shinsa"
+
+
+class TaskContextFilter(logging.Filter):
+    """Adds task_id/task_name/customer from the running Celery task, in the emitting process."""
+
+    def filter(self, record):
+        task = _current_task()
+        request = task.request if task is not None else None
+        record.task_id = getattr(request, "id", None)
+        record.task_name = task.name if record.task_id else None
+        if not hasattr(record, "customer"):
+            record.customer = _customer_from_args(getattr(request, "args", None))
+        return True
+
+
+def _current_task():
+    global _current_task
+    # Bound on first use so importing the logger does not import Celery
+    from celery._state import get_current_task
+
+    _current_task = get_current_task
+    return get_current_task()
+
+
+def _customer_from_args(args):
+    # Customer tasks take the customer dict first; link/crawl/analysis payloads carry it under "customer"
+    first = args[0] if args else None
+    if not isinstance(first, dict):
+        return None
+    customer = first.get("customer", first)
+    if isinstance(customer, dict):
+        return customer.get("email") or customer.get("name")
+    return None
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record):
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "func": record.funcName,
+            "pid": record.process,
+            "message": record.getMessage(),
+            "task_id": getattr(record, "task_id", None),
+            "task_name": getattr(record, "task_name", None),
+            "customer": getattr(record, "customer", None),
+        }
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry["exc"] = record.exc_text
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class LazyTimedRotatingFileHandler(TimedRotatingFileHandler):
+    """Opens its file (and creates the log directory) on the first record, not on construction."""
+
+    def __init__(self, filename, **kwargs):
+        super().__init__(filename, delay=True, **kwargs)
+
+    def _open(self):
+        os.makedirs(os.path.dirname(self.baseFilename), exist_ok=True)
+        return super()._open()
+
+
+class BatchedTimedRotatingFileHandler(LazyTimedRotatingFileHandler):
+    """Writes a batch of records with one write/flush, rolling over between records when due."""
+
+    def emit_batch(self, records):
+        chunk = []
+        for record in records:
+            if record.levelno < self.level:
+                continue
+            if self.shouldRollover(record):
+                self._write(chunk)
+                chunk = []
+                self.doRollover()
+            chunk.append(self.format(record) + self.terminator)
+        self._write(chunk)
+
+    def _write(self, chunk):
+        if not chunk:
+            return
+        if self.stream is None:
+            self.stream = self._open()
+        self.stream.write("".join(chunk))
+        self.stream.flush()
+
+
+class LogPipeline:
+    """Queue plus a single writer thread that owns the per-logger file handlers.
+
+    In multiprocess mode the queue is a multiprocessing.Queue created before the
+    worker forks, so prefork children only pickle records into it and the
+    parent is the only process that ever touches (and rotates) the log files.
+    """
+
+    _STOP = None
+
+    def __init__(self, log_dir=LOG_DIR, batch_size=256, writer_id=None, multiprocess=False):
+        self.log_dir = log_dir
+        self.batch_size = batch_size
+        self.writer_id = writer_id
+        self.multiprocess = multiprocess
+        if multiprocess:
+            import multiprocessing
+
+            self.queue = multiprocessing.Queue()
+        else:
+            self.queue = queue.SimpleQueue()
+        self._handlers = {}
+        self._owner_pid = os.getpid()
+        self._thread = threading.Thread(target=self._run, name="shinsa-log-writer", daemon=True)
+        self._thread.start()
+
+    def put(self, record):
+        self.queue.put_nowait(record)
+
+    def owned_by_current_process(self):
+        return os.getpid() == self._owner_pid
+
+    def _writer_handlers(self, name):
+        if name not in self._handlers:
+            date_str = datetime.now().strftime("%Y-%m-%d")
+            suffix = f"_{self.writer_id}" if self.writer_id else ""
+            json_formatter = JsonFormatter()
+            handlers = []
+            for level, file_name in ((logging.DEBUG, f"{name}_{date_str}{suffix}.log"), (logging.ERROR, f"{name}_{date_str}{suffix}_error.log")):
+                handler = BatchedTimedRotatingFileHandler(os.path.join(self.log_dir, file_name), when="midnight", interval=1, backupCount=7, encoding="utf-8")
+                handler.setLevel(level)
+                handler.setFormatter(json_formatter)
+                handlers.append(handler)
+            self._handlers[name] = handlers
+        return self._handlers[name]
+
+    def _write(self, entries):
+        by_logger = {}
+        for entry in entries:
+            record = logging.makeLogRecord(entry)
+            # Module loggers share their package's files; "logger" in each line keeps the module name
+            by_logger.setdefault(getattr(record, "log_name", None) or record.name, []).append(record)
+        console_lines = []
+        for name, group in by_logger.items():
+            for handler in self._writer_handlers(name):
+                handler.emit_batch(group)
+            console_lines.extend(_console_line(record) for record in group if getattr(record, "console", False) and record.levelno >= logging.INFO)
+        if console_lines:
+            sys.stdout.write("".join(console_lines))
+            sys.stdout.flush()
+
+    def _run(self):
+        stopping = False
+        while not stopping:
+            records = [self.queue.get()]
+            while len(records) < self.batch_size:
+                try:
+                    records.append(self.queue.get_nowait())
+                except queue.Empty:
+                    break
+            if any(record is self._STOP for record in records):
+                stopping = True
+                records = [record for record in records if record is not self._STOP]
+            try:
+                self._write(records)
+            except Exception:  # pragma: no cover - never let logging kill the writer
+                import traceback
+
+                traceback.print_exc(file=sys.stderr)
+
+    def stop(self):
+        if self.owned_by_current_process() and self._thread.is_alive():
+            self.queue.put(self._STOP)
+            self._thread.join(timeout=10)
+        for handlers in self._handlers.values():
+            for handler in handlers:
+                handler.close()
+        self._handlers.clear()
+
+    def close_producer(self):
+        # Called in prefork children on exit so records still in the feeder thread are not lost
+        if self.multiprocess:
+            self.queue.close()
+            self.queue.join_thread()
+
+
+_console_formatter = logging.Formatter(fmt=TEXT_FORMAT, datefmt="%H:%M:%S", style="{")
+_pipeline = None
+_pipeline_lock = threading.Lock()
+
+
+def _console_line(record):
+    return _console_formatter.format(record) + "\n"
+
+
+def start_log_pipeline(writer_id=None, multiprocess=False, log_dir=LOG_DIR):
+    global _pipeline
+    with _pipeline_lock:
+        if _pipeline is not None and _pipeline.owned_by_current_process():
+            _pipeline.stop()
+        _pipeline = LogPipeline(log_dir=log_dir, batch_size=LOG_CONFIG["batch_size"], writer_id=writer_id, multiprocess=multiprocess)
+    _attach_package_logger()
+    return _pipeline
+
+
+def get_log_pipeline():
+    global _pipeline
+    # A pipeline inherited through fork is only usable if it has a cross-process queue
+    if _pipeline is None or not (_pipeline.owned_by_current_process() or _pipeline.multiprocess):
+        with _pipeline_lock:
+            if _pipeline is None or not (_pipeline.owned_by_current_process() or _pipeline.multiprocess):
+                _pipeline = LogPipeline(batch_size=LOG_CONFIG["batch_size"])
+    return _pipeline
+
+
+def stop_log_pipeline():
+    global _pipeline
+    with _pipeline_lock:
+        if _pipeline is not None:
+            if _pipeline.owned_by_current_process():
+                _pipeline.stop()
+            else:
+                _pipeline.close_producer()
+            _pipeline = None
+    _detach_package_logger()
+
+
+atexit.register(stop_log_pipeline)
+
+
+class PipelineQueueHandler(QueueHandler):
+    """Enqueues records for the log pipeline; the cost in the caller is a filter pass and a put."""
+
+    def __init__(self, console=True, log_name=None):
+        super().__init__(None)
+        self.console = console
+        self.log_name = log_name
+        self.addFilter(TaskContextFilter())
+
+    def prepare(self, record):
+        # Only the fields the writer needs, so the child pickles a small dict instead of a LogRecord
+        exc_text = record.exc_text
+        if record.exc_info and not exc_text:
+            exc_text = _console_formatter.formatException(record.exc_info)
+        return {
+            "name": record.name,
+            "levelno": record.levelno,
+            "levelname": record.levelname,
+            "created": record.created,
+            "msecs": record.msecs,
+            "funcName": record.funcName,
+            "process": record.process,
+            "msg": record.getMessage(),
+            "exc_text": exc_text,
+            "task_id": record.task_id,
+            "task_name": record.task_name,
+            "customer": record.customer,
+            "console": self.console,
+            "log_name": self.log_name,
+        }
+
+    def enqueue(self, record):
+        get_log_pipeline().put(record)
+
+
+def _attach_package_logger():
+    # Task modules log through logging.getLogger(__name__), which propagates to the package logger
+    logger = logging.getLogger(PACKAGE_LOGGER)
+    if not any(isinstance(handler, PipelineQueueHandler) for handler in logger.handlers):
+        logger.addHandler(PipelineQueueHandler(log_name=PACKAGE_LOGGER))
+        logger.setLevel(logging.DEBUG)
+        logger.propagate = False
+
+
+def _detach_package_logger():
+    logger = logging.getLogger(PACKAGE_LOGGER)
+    handlers = [handler for handler in logger.handlers if isinstance(handler, PipelineQueueHandler)]
+    if handlers:
+        for handler in handlers:
+            logger.removeHandler(handler)
+        logger.setLevel(logging.NOTSET)
+        logger.propagate = True
 
 
 def get_logger(name: str = "app_logger", console: bool = True) -> logging.Logger:
@@ -19,19 +315,24 @@ def get_logger(name: str = "app_logger", console: bool = True) -> logging.Logger
     if not logger.handlers:
         logger.setLevel(logging.DEBUG)  # Capture all logs
 
+        if LOG_CONFIG["mode"] == "queue":
+            logger.addHandler(PipelineQueueHandler(console=console))
+            logger.propagate = False
+            return logger
+
         date_str = datetime.now().strftime("%Y-%m-%d")
         log_name = name + "_" + date_str
         # 1️⃣ File handler for all logs
         all_log_file = os.path.join(LOG_DIR, f"{log_name}.log")
-        all_handler = TimedRotatingFileHandler(all_log_file, when="midnight", interval=1, backupCount=7, encoding="utf-8")
+        all_handler = LazyTimedRotatingFileHandler(all_log_file, when="midnight", interval=1, backupCount=7, encoding="utf-8")
         all_handler.setLevel(logging.DEBUG)
-        formatter = logging.Formatter(fmt="[{asctime}] | {levelname:^8} | {name}:{funcName} | {message}", datefmt="%Y-%m-%d %H:%M:%S", style="{")
+        formatter = logging.Formatter(fmt=TEXT_FORMAT, datefmt="%Y-%m-%d %H:%M:%S", style="{")
         all_handler.setFormatter(formatter)
         logger.addHandler(all_handler)
 
         # 2️⃣ File handler for error/critical logs only
         error_log_file = os.path.join(LOG_DIR, f"{log_name}_error.log")
-        error_handler = TimedRotatingFileHandler(error_log_file, when="midnight", interval=1, backupCount=7, encoding="utf-8")
+        error_handler = LazyTimedRotatingFileHandler(error_log_file, when="midnight", interval=1, backupCount=7, encoding="utf-8")
         error_handler.setLevel(logging.ERROR)
         error_handler.setFormatter(formatter)
         logger.addHandler(error_handler)
@@ -40,7 +341,7 @@ def get_logger(name: str = "app_logger", console: bool = True) -> logging.Logger
         if console:
             console_handler = logging.StreamHandler(sys.stdout)
             console_handler.setLevel(logging.INFO)
-            console_formatter = logging.Formatter(fmt="[{asctime}] | {levelname:^8} | {name}:{funcName} | {message}", datefmt="%H:%M:%S", style="{")
+            console_formatter = logging.Formatter(fmt=TEXT_FORMAT, datefmt="%H:%M:%S", style="{")
             console_handler.setFormatter(console_formatter)
             logger.addHandler(console_handler)
 
@@ -0,0 +1,62 @@
+import re
+import unicodedata
+
+# Hepburn romaji for hiragana; katakana is mapped onto hiragana first
+_HIRAGANA = (
+    "あいうえおかきくけこさしすせそたちつてとなにぬねのはひふへほまみむめもやゆよらりるれろわをん"
+    "がぎぐげござじずぜぞだぢづでどばびぶべぼぱぴぷぺぽぁぃぅぇぉゔ"
+)
+_ROMAJI = (
+    "a i u e o ka ki ku ke ko sa shi su se so ta chi tsu te to na ni nu ne no ha hi fu he ho ma mi mu me mo ya yu yo ra ri ru re ro wa o n "
+    "ga gi gu ge go za ji zu ze zo da ji zu de do ba bi bu be bo pa pi pu pe po a i u e o vu"
+).split()
+KANA_ROMAJI = dict(zip(_HIRAGANA, _ROMAJI))
+SMALL_Y = {"ゃ": "a", "ゅ": "u", "ょ": "o"}
+WORD_PATTERN = re.compile(r"\w+")
+APOSTROPHES = re.compile(r"['’]")
+
+
+def normalize_name(name):
+    """Canonical form of a name for lookups: NFKC, case-folded, single spaces."""
+    return " ".join(unicodedata.normalize("NFKC", name or "").casefold().split())
+
+
+def _hiragana(char):
+    # Katakana (ァ..ヶ) sit 0x60 above their hiragana
+    return chr(ord(char) - 0x60) if "ァ" <= char <= "ヶ" else char
+
+
+def transliterate(text):
+    """Latin-script text for a name: accents dropped and kana romanized.
+
+    Scripts without a reading rule here (kanji, for one) are kept as they are;
+    names in them are resolved through the handle index.
+    """
+    out = []
+    double_next = False
+    for char in map(_hiragana, unicodedata.normalize("NFKC", text)):
+        if char in ("っ", "ッ"):
+            double_next = True
+            continue
+        if char == "ー":
+            continue
+        if char in SMALL_Y and out and out[-1].endswith("i"):
+            # きゃ -> kya, しゃ -> sha
+            base = out.pop()[:-1]
+            char = base + ("" if base.endswith(("sh", "ch", "j")) else "y") + SMALL_Y[char]
+        elif char in KANA_ROMAJI:
+            char = KANA_ROMAJI[char]
+        else:
+            char = "".join(c for c in unicodedata.normalize("NFKD", char) if not unicodedata.combining(c))
+        if double_next and char[:1].isalpha() and char[0] not in "aiueon":
+            # っ doubles the next consonant; before ch Hepburn writes t (まっちゃ -> matcha)
+            char = ("t" if char.startswith("ch") else char[0]) + char
+        double_next = False
+        out.append(char)
+    return "".join(out)
+
+
+def name_parts(name):
+    """Lower-case, transliterated words of a name, ready to be joined into a handle."""
+    # O'Brien -> obrien rather than o, brien
+    return WORD_PATTERN.findall(APOSTROPHES.sub("", transliterate(normalize_name(name)).lower()))
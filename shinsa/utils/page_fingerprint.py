@@ -0,0 +1,127 @@
+import re
+import json
+import time
+import hashlib
+import logging
+from collections import Counter
+import numpy as np
+from shinsa.utils.crawl_cache import content_hash, url_key
+
+logger = logging.getLogger(__name__)
+
+KEY_PREFIX = "page-fingerprint"
+STATUSES = ("unchanged", "near_duplicate", "changed", "new")
+TOKEN_PATTERN = re.compile(r"\w+")
+BIT_POSITIONS = np.arange(64, dtype=np.uint64)
+
+
+def _decode(value):
+    return value.decode("utf-8") if isinstance(value, bytes) else value
+
+
+def simhash(content, shingle_size=3):
+    """64-bit simhash over word shingles: near-identical pages differ in only a few bits."""
+    words = TOKEN_PATTERN.findall(content.lower())
+    shingles = Counter(" ".join(words[i : i + shingle_size]) for i in range(max(len(words) - shingle_size + 1, 0)))
+    if not shingles and words:
+        shingles = Counter([" ".join(words)])
+    if not shingles:
+        return 0
+
+    hashes = np.fromiter((int.from_bytes(hashlib.blake2b(shingle.encode("utf-8"), digest_size=8).digest(), "big") for shingle in shingles), dtype=np.uint64, count=len(shingles))
+    weights = np.fromiter(shingles.values(), dtype=np.int64, count=len(shingles))
+    # Every shingle votes its weight up or down on each bit; the sign of the tally is the bit
+    bits = ((hashes[:, None] >> BIT_POSITIONS) & np.uint64(1)).astype(np.int64)
+    tally = ((2 * bits - 1) * weights[:, None]).sum(axis=0)
+    return sum(1 << int(position) for position in np.flatnonzero(tally > 0))
+
+
+def hamming_distance(a, b):
+    return (a ^ b).bit_count()
+
+
+class PageFingerprints:
+    """The last analysis of each URL, kept with the fingerprint of the content it was made from.
+
+    A recrawl is "unchanged" when its SHA-256 matches and a "near_duplicate"
+    when its simhash is within `max_distance` bits; both reuse the stored
+    analysis. Near duplicates leave the stored fingerprint as it is, so a page
+    drifting in small steps is analyzed again once the drift adds up.
+    """
+
+    def __init__(self, client, ttl=7 * 24 * 3600, max_distance=3, shingle_size=3, clock=time.time):
+        self.client = client
+        self.ttl = ttl
+        self.max_distance = max_distance
+        self.shingle_size = shingle_size
+        self.clock = clock
+
+    def _url_key(self, url):
+        return f"{KEY_PREFIX}:url:{url_key(url)}"
+
+    def _stats_key(self):
+        return f"{KEY_PREFIX}:stats"
+
+    def lookup_many(self, urls, contents):
+        """Classify each page against its URL's record; reusable pages come with the stored analysis."""
+        pipe = self.client.pipeline()
+        for url in urls:
+            pipe.hgetall(self._url_key(url))
+        records = pipe.execute()
+
+        matches = []
+        for content, record in zip(contents, records):
+            record = {_decode(field): _decode(value) for field, value in record.items()}
+            status = self.classify(content, record)
+            match = {"status": status}
+            if status in ("unchanged", "near_duplicate"):
+                match["analysis"] = json.loads(record["analysis"])
+                match["saved_cpu_seconds"] = float(record["cpu_seconds"])
+            matches.append(match)
+
+        pipe = self.client.pipeline()
+        for status, count in Counter(match["status"] for match in matches).items():
+            pipe.hincrby(self._stats_key(), status, count)
+        saved = sum(match.get("saved_cpu_seconds", 0) for match in matches)
+        if saved:
+            pipe.hincrbyfloat(self._stats_key(), "saved_cpu_seconds", saved)
+        for url, match in zip(urls, matches):
+            if "analysis" in match:
+                pipe.expire(self._url_key(url), self.ttl)
+        pipe.execute()
+        return matches
+
+    def classify(self, content, record):
+        if not record:
+            return "new"
+        if record["digest"] == content_hash(content):
+            return "unchanged"
+        if hamming_distance(int(record["simhash"]), simhash(content, self.shingle_size)) <= self.max_distance:
+            return "near_duplicate"
+        return "changed"
+
+    def store_many(self, urls, contents, analyses, cpu_seconds):
+        pipe = self.client.pipeline()
+        for url, content, analysis, seconds in zip(urls, contents, analyses, cpu_seconds):
+            key = self._url_key(url)
+            record = {
+                "digest": content_hash(content),
+                "simhash": simhash(content, self.shingle_size),
+                "analysis": json.dumps(analysis),
+                "cpu_seconds": round(seconds, 6),
+                "stored_at": self.clock(),
+            }
+            pipe.hset(key, mapping=record)
+            pipe.expire(key, self.ttl)
+        pipe.execute()
+
+    def stats(self):
+        values = {_decode(field): _decode(value) for field, value in self.client.hgetall(self._stats_key()).items()}
+        counts = {status: int(values.get(status, 0)) for status in STATUSES}
+        pages = sum(counts.values())
+        skipped = counts["unchanged"] + counts["near_duplicate"]
+        return {
+            **counts,
+            "skip_rate": round(skipped / max(pages, 1), 4),
+            "saved_cpu_seconds": round(float(values.get("saved_cpu_seconds", 0)), 3),
+        }
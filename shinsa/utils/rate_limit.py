@@ -0,0 +1,145 @@
+import math
+import time
+import logging
+from collections import OrderedDict, deque
+from urllib.parse import urlsplit
+
+logger = logging.getLogger(__name__)
+
+KEY_PREFIX = "crawl-rate"
+
+# GCRA token bucket: the key holds the domain's theoretical arrival time (TAT). A request may
+# start once now >= TAT - tolerance, and each start pushes the TAT one interval further.
+# max_wait < 0 always reserves (the caller will wait); otherwise a longer wait reserves nothing.
+ACQUIRE_SCRIPT = """
+local now = tonumber(ARGV[1])
+local interval = tonumber(ARGV[2])
+local tolerance = tonumber(ARGV[3])
+local max_wait = tonumber(ARGV[4])
+local tat = math.max(tonumber(redis.call('GET', KEYS[1])) or now, now)
+local wait = math.max(tat - tolerance - now, 0)
+if max_wait >= 0 and wait > max_wait then
+    return {0, tostring(wait)}
+end
+tat = tat + interval
+redis.call('SET', KEYS[1], tostring(tat), 'PX', math.ceil((tat - now) * 1000) + 1000)
+return {1, tostring(wait)}
+"""
+
+# After a 429/503 nobody may start before `until`
+PENALIZE_SCRIPT = """
+local tat = math.max(tonumber(redis.call('GET', KEYS[1])) or 0, tonumber(ARGV[1]))
+redis.call('SET', KEYS[1], tostring(tat), 'PX', ARGV[2])
+return tostring(tat)
+"""
+
+
+class RateLimited(Exception):
+    def __init__(self, domain, retry_after):
+        super().__init__(domain, retry_after)
+        self.domain = domain
+        self.retry_after = retry_after
+
+    def __str__(self):
+        return f"{self.domain} is rate limited for {self.retry_after:.1f}s"
+
+
+def domain_of(url):
+    host = (urlsplit(url).hostname or "").lower()
+    return host[4:] if host.startswith("www.") else host
+
+
+def interleave_by_domain(items, url=lambda item: item):
+    """Round-robin over domains, keeping each domain's own order, so no domain comes in a burst."""
+    queues = OrderedDict()
+    for item in items:
+        queues.setdefault(domain_of(url(item)), deque()).append(item)
+    interleaved = []
+    while queues:
+        for domain in list(queues):
+            interleaved.append(queues[domain].popleft())
+            if not queues[domain]:
+                del queues[domain]
+    return interleaved
+
+
+class DomainRateLimiter:
+    """Per-domain token buckets in Redis, shared by every worker that crawls.
+
+    `rate` is requests per second and `burst` the bucket size; `domains` overrides
+    both for a domain and its subdomains, e.g. {"linkedin.com": {"rate": 0.5, "burst": 1}},
+    which then share one bucket.
+    All workers must share the clock, which is why it defaults to wall time.
+    """
+
+    def __init__(self, client, rate=2.0, burst=4, domains=None, grace=0.1, clock=time.time):
+        self.client = client
+        self.rate = rate
+        self.burst = burst
+        self.domains = domains or {}
+        self.grace = grace
+        self.clock = clock
+        self._acquire = client.register_script(ACQUIRE_SCRIPT)
+        self._penalize = client.register_script(PENALIZE_SCRIPT)
+
+    def _key(self, domain):
+        return f"{KEY_PREFIX}:{domain}"
+
+    def policy(self, domain):
+        """Return (bucket, rate, burst) for a domain."""
+        for suffix, override in self.domains.items():
+            if domain == suffix or domain.endswith(f".{suffix}"):
+                return suffix, override.get("rate", self.rate), override.get("burst", self.burst)
+        return domain, self.rate, self.burst
+
+    def _run(self, domain, max_wait):
+        bucket, rate, burst = self.policy(domain)
+        interval = 1.0 / rate
+        acquired, wait = self._acquire(keys=[self._key(bucket)], args=[repr(self.clock()), repr(interval), repr((burst - 1) * interval), repr(max_wait)])
+        return bool(acquired), float(wait)
+
+    def acquire(self, url, max_wait):
+        """Reserve the next slot for the URL's domain and return how long to wait for it.
+
+        Raises RateLimited (reserving nothing) when the wait would be longer than max_wait.
+        """
+        domain = domain_of(url)
+        acquired, wait = self._run(domain, max_wait)
+        if not acquired:
+            raise RateLimited(domain, wait)
+        return wait
+
+    def schedule(self, urls):
+        """Reserve a slot for every URL and return their start delays, in the order of `urls`.
+
+        Each domain's requests are spaced by its own rate, so a batch interleaves domains:
+        fast domains go first instead of queueing behind a throttled one.
+        """
+        return [self._run(domain_of(url), -1)[1] for url in urls]
+
+    def claim(self, url, slot_at, max_wait):
+        """Return the wait for a slot booked earlier with schedule() (slot_at is its clock time).
+
+        A slot missed by more than `grace` seconds is given up: starting late would land in a
+        later request's slot. A fresh one is acquired instead, as with acquire().
+        """
+        now = self.clock()
+        if now <= slot_at + self.grace:
+            return max(slot_at - now, 0)
+        return self.acquire(url, max_wait)
+
+    def penalize(self, url, seconds):
+        domain = domain_of(url)
+        bucket, rate, burst = self.policy(domain)
+        until = self.clock() + seconds + (burst - 1) / rate
+        self._penalize(keys=[self._key(bucket)], args=[repr(until), math.ceil((seconds + burst / rate) * 1000) + 1000])
+        logger.warning(f"[Rate Limit] {domain} throttled us; holding it for {seconds:.0f}s")
+
+
+def retry_after(response, default=60):
+    # Retry-After as delta-seconds; HTTP dates and missing headers fall back to the default
+    headers = {k.lower(): v for k, v in (response.get("headers") or {}).items()}
+    try:
+        return max(float(headers.get("retry-after", default)), 0)
+    except ValueError:
+        return default
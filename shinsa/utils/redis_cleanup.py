@@ -0,0 +1,140 @@
+import re
+import time
+import uuid
+import fnmatch
+import logging
+
+logger = logging.getLogger(__name__)
+
+KEY_PREFIX = "cleanup"
+CURSOR_KEY = f"{KEY_PREFIX}:cursor"
+SWEEP_KEY = f"{KEY_PREFIX}:sweep"
+LOCK_KEY = f"{KEY_PREFIX}:lock"
+# A checkpoint older than this is dropped and the next run starts a new sweep
+CHECKPOINT_TTL = 7 * 24 * 3600
+
+# UNLINK the keys that still have no TTL and have been idle for ARGV[1] seconds (a writer may
+# be between creating a key and setting its TTL). Servers that cannot report idle time (LFU
+# eviction) rely on the TTL check alone. Sizes come from MEMORY USAGE, or the DUMP length on
+# servers without it. Checked and removed in one step, so a key given a TTL meanwhile is kept.
+RECLAIM_SCRIPT = """
+local unlinked, bytes = 0, 0
+for _, key in ipairs(KEYS) do
+    local idle = redis.pcall('OBJECT', 'IDLETIME', key)
+    if (type(idle) ~= 'number' or idle >= tonumber(ARGV[1])) and redis.call('TTL', key) == -1 then
+        local size = redis.pcall('MEMORY', 'USAGE', key)
+        if type(size) ~= 'number' then
+            local dump = redis.call('DUMP', key)
+            size = dump and #dump or 0
+        end
+        redis.call('UNLINK', key)
+        unlinked = unlinked + 1
+        bytes = bytes + size
+    end
+end
+return {unlinked, bytes}
+"""
+
+RELEASE_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+
+class RedisCleaner:
+    """Incremental cleanup of leaked keys, safe to run against a live Redis.
+
+    Keys matching `patterns` that have no TTL and have been idle for `min_idle`
+    seconds are leaks: everything this app writes there expires on its own.
+    Each run walks the keyspace with SCAN from the cursor the last run saved
+    and UNLINKs leaks in batches of `batch_size`, until the sweep completes or
+    the run has spent `time_budget` seconds or `max_ops` commands. Runs hold a
+    lock, so overlapping runs skip.
+    """
+
+    def __init__(self, client, patterns, scan_count=1000, batch_size=500, min_idle=600, time_budget=30, max_ops=100000, pause=0.01, lock_ttl=600, clock=time.monotonic, sleep=time.sleep):
+        self.client = client
+        self.patterns = list(patterns)
+        self.scan_count = scan_count
+        self.batch_size = batch_size
+        self.min_idle = min_idle
+        self.time_budget = time_budget
+        self.max_ops = max_ops
+        self.pause = pause
+        self.lock_ttl = lock_ttl
+        self.clock = clock
+        self.sleep = sleep
+        self._managed = re.compile("|".join(fnmatch.translate(pattern) for pattern in self.patterns))
+        self._reclaim = client.register_script(RECLAIM_SCRIPT)
+        self._release = client.register_script(RELEASE_SCRIPT)
+
+    def is_managed(self, key):
+        if isinstance(key, bytes):
+            key = key.decode("utf-8", "replace")
+        return self._managed.match(key) is not None
+
+    def run(self):
+        """Continue the sweep; return this run's stats, or None if another run holds the lock."""
+        token = uuid.uuid4().hex
+        if not self.client.set(LOCK_KEY, token, nx=True, ex=self.lock_ttl):
+            logger.info("[Cleanup] Another cleanup run is in progress; skipping")
+            return None
+        try:
+            return self._sweep()
+        finally:
+            self._release(keys=[LOCK_KEY], args=[token])
+
+    def _sweep(self):
+        started = self.clock()
+        cursor = int(self.client.get(CURSOR_KEY) or 0)
+        stats = {"resumed_from": cursor, "scanned": 0, "unlinked": 0, "bytes": 0, "ops": 0, "complete": False}
+        while True:
+            cursor, keys = self.client.scan(cursor, count=self.scan_count)
+            page = {"scanned": len(keys), "unlinked": 0, "bytes": 0}
+            leaks = [key for key in keys if self.is_managed(key)]
+            for i in range(0, len(leaks), self.batch_size):
+                unlinked, size = self._reclaim(keys=leaks[i : i + self.batch_size], args=[self.min_idle])
+                stats["ops"] += 1
+                page["unlinked"] += unlinked
+                page["bytes"] += size
+            for field, count in page.items():
+                stats[field] += count
+
+            stats["complete"] = cursor == 0
+            self._checkpoint(cursor, page)
+            stats["ops"] += 2  # the SCAN and the checkpoint
+            if stats["complete"] or self.clock() - started >= self.time_budget or stats["ops"] >= self.max_ops:
+                break
+            if self.pause:
+                self.sleep(self.pause)
+
+        stats["cursor"] = cursor
+        stats["elapsed"] = self.clock() - started
+        if stats["complete"]:
+            stats["sweep"] = self._finish_sweep()
+        logger.info(
+            f"[Cleanup] Scanned {stats['scanned']} keys from cursor {stats['resumed_from']}, unlinked {stats['unlinked']} "
+            f"({stats['bytes']} bytes) in {stats['elapsed']:.1f}s; " + ("sweep complete" if stats["complete"] else f"resuming from cursor {cursor}")
+        )
+        return stats
+
+    def _checkpoint(self, cursor, page):
+        # Saved after every page, so a run that dies loses at most one page of progress
+        pipe = self.client.pipeline()
+        if cursor:
+            pipe.set(CURSOR_KEY, cursor, ex=CHECKPOINT_TTL)
+        else:
+            pipe.delete(CURSOR_KEY)
+        for field, count in page.items():
+            pipe.hincrby(SWEEP_KEY, field, count)
+        pipe.expire(SWEEP_KEY, CHECKPOINT_TTL)
+        pipe.execute()
+
+    def _finish_sweep(self):
+        pipe = self.client.pipeline()
+        pipe.hgetall(SWEEP_KEY)
+        pipe.delete(SWEEP_KEY)
+        totals, _ = pipe.execute()
+        return {field.decode() if isinstance(field, bytes) else field: int(value) for field, value in totals.items()}
@@ -0,0 +1,108 @@
+import json
+import logging
+
+logger = logging.getLogger(__name__)
+
+KEY_PREFIX = "report-agg"
+
+# Folds one link in, all or nothing: the per-link entry (the idempotency guard) is only written
+# together with that link's keyword counts and sentiment. KEYS: meta, keywords, links;
+# ARGV: ttl, link, detail, sentiment score, then word/count pairs.
+ADD_SCRIPT = """
+if redis.call('HSETNX', KEYS[3], ARGV[2], ARGV[3]) == 0 then
+    return 0
+end
+for i = 5, #ARGV, 2 do
+    redis.call('ZINCRBY', KEYS[2], ARGV[i + 1], ARGV[i])
+end
+redis.call('HINCRBYFLOAT', KEYS[1], 'sentiment_sum', ARGV[4])
+for _, key in ipairs(KEYS) do
+    redis.call('EXPIRE', key, ARGV[1])
+end
+return 1
+"""
+
+
+def _decode(value):
+    return value.decode("utf-8") if isinstance(value, bytes) else value
+
+
+class ReportAggregator:
+    """Folds analysis results into per-report running totals in Redis.
+
+    Each aggregation keeps a keyword sorted set (the top-K heap), a sentiment
+    sum and one small detail entry per link, so a report can be assembled in
+    O(K) without the analysis results ever travelling through the chord.
+    """
+
+    def __init__(self, client, ttl=24 * 3600):
+        self.client = client
+        self.ttl = ttl
+        self._add = client.register_script(ADD_SCRIPT)
+
+    def _keys(self, aggregation_id):
+        base = f"{KEY_PREFIX}:{aggregation_id}"
+        return f"{base}:meta", f"{base}:keywords", f"{base}:links"
+
+    def expect(self, aggregation_id, customer, links):
+        meta_key, _, _ = self._keys(aggregation_id)
+        pipe = self.client.pipeline()
+        pipe.hset(meta_key, mapping={"customer": json.dumps(customer), "links": json.dumps(links), "sentiment_sum": 0})
+        pipe.expire(meta_key, self.ttl)
+        pipe.execute()
+
+    def add(self, aggregation_id, analysis_result):
+        meta_key, keywords_key, links_key = self._keys(aggregation_id)
+        analysis = analysis_result.get("analysis", {})
+        detail = {
+            "link": analysis_result["link"],
+            "content_length": analysis_result.get("original_content_length", 0),
+            "keywords_count": len(analysis.get("keywords", [])),
+            "sentiment": analysis.get("sentiment", "neutral"),
+            "sentiment_score": analysis.get("sentiment_score", 0),
+        }
+
+        # The per-link entry doubles as an idempotency guard for redelivered or retried tasks
+        args = [self.ttl, analysis_result["link"], json.dumps(detail), float(detail["sentiment_score"])]
+        for kw in analysis.get("keywords", []):
+            args += [kw["word"], int(kw["count"])]
+        if not self._add(keys=[meta_key, keywords_key, links_key], args=args):
+            logger.info(f"[Report Aggregator] {analysis_result['link']} already folded into {aggregation_id}")
+            return False
+        return True
+
+    def read(self, aggregation_id, top_k=15):
+        meta_key, keywords_key, links_key = self._keys(aggregation_id)
+        pipe = self.client.pipeline()
+        pipe.hgetall(meta_key)
+        # Highest counts first; Redis orders equal counts by word, descending
+        pipe.zrevrange(keywords_key, 0, top_k - 1, withscores=True)
+        pipe.hgetall(links_key)
+        meta, top, details = pipe.execute()
+        if not meta:
+            return None
+
+        top = [(_decode(word), int(count)) for word, count in top]
+        if len(top) == top_k:
+            # Words tied with the last one may sort before it alphabetically; fetch the whole tie for the cut
+            cutoff = top[-1][1]
+            tied = self.client.zrangebyscore(keywords_key, cutoff, cutoff)
+            top = [kw for kw in top if kw[1] > cutoff] + [(_decode(word), cutoff) for word in tied]
+        top = sorted(top, key=lambda kw: (-kw[1], kw[0]))[:top_k]
+
+        meta = {_decode(k): _decode(v) for k, v in meta.items()}
+        details = {_decode(k): json.loads(_decode(v)) for k, v in details.items()}
+        # Link details follow the workflow's link order; links that never finished are left out
+        crawled_links = [details[link] for link in json.loads(meta["links"]) if link in details]
+        return {
+            "customer": json.loads(meta["customer"]),
+            "links_processed": len(crawled_links),
+            "sentiment_sum": float(meta["sentiment_sum"]),
+            "top_keywords": [{"word": word, "total_count": count} for word, count in top],
+            "crawled_links": [{k: v for k, v in detail.items() if k != "sentiment_score"} for detail in crawled_links],
+        }
+
+    def delete(self, *aggregation_ids):
+        keys = [key for aggregation_id in aggregation_ids for key in self._keys(aggregation_id)]
+        if keys:
+            self.client.delete(*keys)
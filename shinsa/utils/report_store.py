@@ -0,0 +1,208 @@
+import os
+import json
+import sqlite3
+import logging
+import threading
+from datetime import datetime
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS reports (
+    id INTEGER PRIMARY KEY,
+    report_task_id TEXT NOT NULL,
+    customer_key TEXT NOT NULL,
+    customer_name TEXT,
+    customer_email TEXT,
+    generated_at TEXT NOT NULL,
+    links_processed INTEGER NOT NULL,
+    sentiment_score REAL NOT NULL,
+    overall_sentiment TEXT NOT NULL,
+    report TEXT NOT NULL,
+    UNIQUE (report_task_id, customer_key)
+);
+CREATE INDEX IF NOT EXISTS reports_customer ON reports (customer_key, generated_at);
+CREATE INDEX IF NOT EXISTS reports_generated_at ON reports (generated_at);
+CREATE INDEX IF NOT EXISTS reports_sentiment ON reports (overall_sentiment, generated_at);
+CREATE INDEX IF NOT EXISTS reports_sentiment_score ON reports (sentiment_score);
+
+CREATE TABLE IF NOT EXISTS report_keywords (
+    word TEXT NOT NULL,
+    report_id INTEGER NOT NULL REFERENCES reports (id) ON DELETE CASCADE,
+    total_count INTEGER NOT NULL,
+    PRIMARY KEY (word, report_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS report_keywords_report ON report_keywords (report_id);
+
+CREATE TABLE IF NOT EXISTS batch_reports (
+    batch_task_id TEXT PRIMARY KEY,
+    generated_at TEXT NOT NULL,
+    total_customers INTEGER NOT NULL,
+    successful_customers INTEGER NOT NULL,
+    total_links_processed INTEGER NOT NULL,
+    report TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS batch_reports_generated_at ON batch_reports (generated_at);
+"""
+
+SUMMARY_COLUMNS = "report_task_id, customer_key, customer_name, customer_email, generated_at, links_processed, sentiment_score, overall_sentiment"
+
+
+def customer_key(customer):
+    # Namespaced so an email-less customer never shares a key with one whose email equals their name
+    if customer.get("email"):
+        return f"email:{customer['email']}"
+    return f"name:{customer.get('name', '')}"
+
+
+def _timestamp(value):
+    # Reports carry naive UTC ISO timestamps, which sort as text
+    return value.isoformat() if isinstance(value, datetime) else value
+
+
+def _between(column, since, until, conditions=None, params=None):
+    conditions, params = list(conditions or []), list(params or [])
+    if since is not None:
+        conditions.append(f"{column} >= ?")
+        params.append(_timestamp(since))
+    if until is not None:
+        conditions.append(f"{column} < ?")
+        params.append(_timestamp(until))
+    return " AND ".join(conditions) or "1", params
+
+
+class ReportStore:
+    """Customer and batch reports in a local SQLite database (WAL), indexed for lookups.
+
+    Reports are indexed by customer, generation time, sentiment and top
+    keywords, so "latest report for this email" or "whose sentiment dropped
+    since Monday" are index reads instead of result backend scans. Writes from
+    one task go in one transaction; readers in other processes are not blocked
+    by writers.
+
+    The database is local to one host: queries see only the reports generated
+    by that node's workers, not those of other coordination hosts.
+    """
+
+    def __init__(self, path, busy_timeout=30):
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.path = path
+        # Autocommit mode: transactions are opened explicitly around writes
+        self.connection = sqlite3.connect(path, timeout=busy_timeout, isolation_level=None, check_same_thread=False)
+        self.connection.row_factory = sqlite3.Row
+        self._lock = threading.Lock()
+        with self._lock:
+            self.connection.execute("PRAGMA journal_mode=WAL")
+            self.connection.execute("PRAGMA synchronous=NORMAL")
+            self.connection.execute("PRAGMA foreign_keys=ON")
+            self.connection.executescript(SCHEMA)
+
+    def add_reports(self, reports):
+        """Insert customer reports in one transaction; a report stored again replaces the old copy."""
+        if not reports:
+            return 0
+        with self._lock:
+            cursor = self.connection.cursor()
+            cursor.execute("BEGIN IMMEDIATE")
+            try:
+                for report in reports:
+                    metadata, summary = report["report_metadata"], report["summary"]
+                    key = customer_key(report["customer"])
+                    cursor.execute("DELETE FROM reports WHERE report_task_id = ? AND customer_key = ?", (metadata["report_task_id"], key))
+                    cursor.execute(
+                        f"INSERT INTO reports ({SUMMARY_COLUMNS}, report) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                        (
+                            metadata["report_task_id"],
+                            key,
+                            report["customer"].get("name"),
+                            report["customer"].get("email"),
+                            metadata["generated_at"],
+                            summary["total_links_analyzed"],
+                            summary["average_sentiment_score"],
+                            summary["overall_sentiment"],
+                            json.dumps(report),
+                        ),
+                    )
+                    report_id = cursor.lastrowid
+                    cursor.executemany(
+                        "INSERT OR REPLACE INTO report_keywords (word, report_id, total_count) VALUES (?, ?, ?)",
+                        [(keyword["word"], report_id, keyword["total_count"]) for keyword in summary["top_keywords"]],
+                    )
+                cursor.execute("COMMIT")
+            except BaseException:
+                cursor.execute("ROLLBACK")
+                raise
+        return len(reports)
+
+    def add_batch_report(self, batch_report):
+        metadata, summary = batch_report["batch_metadata"], batch_report["batch_summary"]
+        with self._lock:
+            self.connection.execute(
+                "INSERT OR REPLACE INTO batch_reports (batch_task_id, generated_at, total_customers, successful_customers, total_links_processed, report) VALUES (?, ?, ?, ?, ?, ?)",
+                (metadata["batch_task_id"], metadata["generated_at"], summary["total_customers"], summary["successful_customers"], summary["total_links_processed"], json.dumps(batch_report)),
+            )
+
+    def _query(self, sql, params=()):
+        with self._lock:
+            return [dict(row) for row in self.connection.execute(sql, params).fetchall()]
+
+    def latest(self, email=None, name=None):
+        """The newest full report for a customer (looked up by email, else by name), or None."""
+        rows = self._query("SELECT report FROM reports WHERE customer_key = ? ORDER BY generated_at DESC LIMIT 1", (customer_key({"email": email, "name": name}),))
+        return json.loads(rows[0]["report"]) if rows else None
+
+    def get(self, report_task_id):
+        """Full reports produced by one report task (a batched report task produces several)."""
+        return [json.loads(row["report"]) for row in self._query("SELECT report FROM reports WHERE report_task_id = ? ORDER BY id", (report_task_id,))]
+
+    def history(self, email=None, name=None, since=None, until=None, limit=100):
+        """Report summaries for a customer, newest first."""
+        where, params = _between("generated_at", since, until, ["customer_key = ?"], [customer_key({"email": email, "name": name})])
+        return self._query(f"SELECT {SUMMARY_COLUMNS} FROM reports WHERE {where} ORDER BY generated_at DESC LIMIT ?", (*params, limit))
+
+    def by_sentiment(self, overall_sentiment, since=None, until=None, limit=100):
+        where, params = _between("generated_at", since, until, ["overall_sentiment = ?"], [overall_sentiment])
+        return self._query(f"SELECT {SUMMARY_COLUMNS} FROM reports WHERE {where} ORDER BY generated_at DESC LIMIT ?", (*params, limit))
+
+    def by_keyword(self, word, since=None, until=None, limit=100):
+        """Report summaries whose top keywords include `word`, most mentions first."""
+        where, params = _between("r.generated_at", since, until, ["k.word = ?"], [word.lower()])
+        columns = ", ".join(f"r.{column}" for column in SUMMARY_COLUMNS.split(", "))
+        return self._query(
+            f"SELECT {columns}, k.total_count AS keyword_count FROM report_keywords k JOIN reports r ON r.id = k.report_id "
+            f"WHERE {where} ORDER BY k.total_count DESC, r.generated_at DESC LIMIT ?",
+            (*params, limit),
+        )
+
+    def sentiment_drops(self, since, until=None, min_drop=0.1, limit=100):
+        """Customers whose latest report in [since, until) scores at least `min_drop` below their last report before `since`."""
+        where, params = _between("generated_at", since, until)
+        return self._query(
+            f"""WITH latest AS (
+                SELECT customer_key, MAX(generated_at) AS generated_at FROM reports WHERE {where} GROUP BY customer_key
+            ),
+            compared AS (
+                SELECT current.customer_key, current.customer_name, current.customer_email, current.report_task_id,
+                       current.generated_at, current.sentiment_score,
+                       (SELECT previous.sentiment_score FROM reports previous
+                        WHERE previous.customer_key = current.customer_key AND previous.generated_at < ?
+                        ORDER BY previous.generated_at DESC LIMIT 1) AS previous_sentiment_score
+                FROM latest JOIN reports current ON current.customer_key = latest.customer_key AND current.generated_at = latest.generated_at
+            )
+            SELECT *, round(previous_sentiment_score - sentiment_score, 3) AS sentiment_drop FROM compared
+            WHERE previous_sentiment_score - sentiment_score >= ?
+            ORDER BY sentiment_drop DESC LIMIT ?""",
+            (*params, _timestamp(since), min_drop, limit),
+        )
+
+    def batches(self, since=None, until=None, limit=100):
+        where, params = _between("generated_at", since, until)
+        return self._query(
+            f"SELECT batch_task_id, generated_at, total_customers, successful_customers, total_links_processed FROM batch_reports WHERE {where} ORDER BY generated_at DESC LIMIT ?",
+            (*params, limit),
+        )
+
+    def close(self):
+        with self._lock:
+            self.connection.close()
@@ -0,0 +1,172 @@
+import random
+import logging
+from urllib.parse import urlsplit
+import redis.exceptions
+
+logger = logging.getLogger(__name__)
+
+KEY_PREFIX = "circuit"
+
+# HTTP statuses worth another attempt; any other 4xx will fail the same way again
+RETRYABLE_STATUSES = frozenset({408, 425, 429, 500, 502, 503, 504})
+
+# Bugs and bad input: the same arguments fail the same way on every attempt. A missing file (e.g.
+# a released claim-check blob) or a denied one is an OSError too, but not a transient one.
+FATAL_ERRORS = (TypeError, ValueError, LookupError, AttributeError, ArithmeticError, AssertionError, NotImplementedError, ImportError, FileNotFoundError, PermissionError)
+# Outages and timeouts of the network, Redis or the broker
+RETRYABLE_ERRORS = (ConnectionError, TimeoutError, OSError, redis.exceptions.ConnectionError, redis.exceptions.TimeoutError, redis.exceptions.BusyLoadingError)
+
+
+# Exceptions keep their constructor arguments in args so result backends can rebuild them
+class FetchError(RuntimeError):
+    def __init__(self, url, status, error):
+        super().__init__(url, status, error)
+        self.url = url
+        self.status = status
+        self.error = error
+
+    def __str__(self):
+        return f"{self.error} ({self.url})"
+
+    @classmethod
+    def from_response(cls, response):
+        return cls(response["url"], response.get("status"), response["error"])
+
+    @property
+    def retryable(self):
+        # No status means the request never completed (DNS, connect, timeout)
+        return self.status is None or self.status in RETRYABLE_STATUSES
+
+
+class CircuitOpen(Exception):
+    def __init__(self, host, retry_after):
+        super().__init__(host, retry_after)
+        self.host = host
+        self.retry_after = retry_after
+
+    def __str__(self):
+        return f"circuit for {self.host} is open for {self.retry_after:.0f}s"
+
+
+def is_retryable(exc):
+    """Classify an exception: True to retry it, False when another attempt would fail the same way."""
+    if isinstance(exc, FetchError):
+        return exc.retryable
+    if isinstance(exc, CircuitOpen):
+        return True
+    # Checked first: some fatal errors are OSErrors
+    if isinstance(exc, FATAL_ERRORS):
+        return False
+    if isinstance(exc, RETRYABLE_ERRORS):
+        return True
+    # Unknown errors keep the old behaviour and are retried
+    return True
+
+
+class RetryPolicy:
+    """Exponential backoff with full jitter and a retry budget.
+
+    Retry n (0-based) waits uniform(0, min(cap, base * 2**n)) seconds, so retries
+    of tasks that failed together spread out instead of coming back as a wave.
+    Errors that carry their own wait (CircuitOpen, Retry-After) wait that long plus
+    up to `base` seconds of jitter. Fatal errors are never retried, and a task gets
+    at most `max_retries` retries.
+    """
+
+    def __init__(self, base=10, cap=300, max_retries=3, rng=random.random):
+        self.base = base
+        self.cap = cap
+        self.max_retries = max_retries
+        self.rng = rng
+
+    def should_retry(self, exc, retries):
+        return retries < self.max_retries and is_retryable(exc)
+
+    def countdown(self, retries, exc=None):
+        hint = getattr(exc, "retry_after", None)
+        if hint is not None:
+            return hint + self.rng() * self.base
+        return self.rng() * min(self.cap, self.base * 2**retries)
+
+
+# Failure count in a fixed window that starts at the first failure (the key expires `window` seconds
+# later); at the threshold (or when a half-open probe fails) the circuit opens
+RECORD_FAILURE_SCRIPT = """
+local failures = redis.call('INCR', KEYS[1])
+if failures == 1 then
+    redis.call('EXPIRE', KEYS[1], ARGV[1])
+end
+if failures >= tonumber(ARGV[2]) or redis.call('EXISTS', KEYS[4]) == 1 then
+    redis.call('SET', KEYS[2], '1', 'EX', ARGV[3])
+    redis.call('SET', KEYS[3], '1', 'EX', ARGV[4])
+    redis.call('DEL', KEYS[1], KEYS[4])
+    return 1
+end
+return 0
+"""
+
+
+class CircuitBreaker:
+    """Per-host circuit breakers in Redis, shared by every worker.
+
+    `failure_threshold` failures within `window` seconds of a host's first
+    failure (a fixed window, restarted once it expires) open its circuit:
+    requests to it fail fast with CircuitOpen for `open_seconds`. After that one
+    request is let through as a probe; its success closes the circuit and its
+    failure opens it again. Successes cost no Redis writes unless they are probes.
+    """
+
+    def __init__(self, client, failure_threshold=5, window=60, open_seconds=60, probe_timeout=30):
+        self.client = client
+        self.failure_threshold = failure_threshold
+        self.window = window
+        self.open_seconds = open_seconds
+        self.probe_timeout = probe_timeout
+        self._record_failure = client.register_script(RECORD_FAILURE_SCRIPT)
+
+    def _keys(self, host):
+        # failures, open (TTL = open time left), tripped (until closed), probe (held by the prober)
+        return [f"{KEY_PREFIX}:{host}:{name}" for name in ("failures", "open", "tripped", "probe")]
+
+    def before(self, url):
+        """Raise CircuitOpen if requests to the URL's host must fail fast; return whether this is the probe."""
+        host = urlsplit(url).netloc.lower()
+        _, open_key, tripped_key, probe_key = self._keys(host)
+        pipe = self.client.pipeline()
+        pipe.pttl(open_key)
+        pipe.exists(tripped_key)
+        open_ms, tripped = pipe.execute()
+        if open_ms > 0:
+            raise CircuitOpen(host, open_ms / 1000)
+        if not tripped:
+            return False
+        if not self.client.set(probe_key, "1", nx=True, ex=self.probe_timeout):
+            raise CircuitOpen(host, max(self.client.pttl(probe_key), 0) / 1000)
+        logger.info(f"[Circuit] Probing {host}")
+        return True
+
+    def record(self, url, ok, probe=False):
+        host = urlsplit(url).netloc.lower()
+        keys = self._keys(host)
+        if ok:
+            if probe:
+                self.client.delete(*keys)
+                logger.info(f"[Circuit] {host} recovered; circuit closed")
+            return
+        tripped_ttl = self.open_seconds + self.probe_timeout + self.window
+        if self._record_failure(keys=keys, args=[self.window, self.failure_threshold, self.open_seconds, tripped_ttl]):
+            logger.warning(f"[Circuit] {host} is failing; failing fast for {self.open_seconds}s")
+
+    def state(self, url):
+        host = urlsplit(url).netloc.lower()
+        open_key, tripped = self.client.mget(self._keys(host)[1:3])
+        if open_key:
+            return "open"
+        return "half_open" if tripped else "closed"
+
+
+def is_host_failure(response):
+    # Counts toward the breaker: the host is down or erroring, not refusing one URL or throttling
+    status = response.get("status")
+    return bool(response.get("error")) and (status is None or status in RETRYABLE_STATUSES - {429})
+
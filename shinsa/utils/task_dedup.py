@@ -0,0 +1,182 @@
+import json
+import time
+import uuid
+import hashlib
+import logging
+
+logger = logging.getLogger(__name__)
+
+KEY_PREFIX = "dedup"
+STATS = ("executed", "coalesced", "reused")
+
+# Release only locks still holding our token: one that outlived lock_ttl may belong to another owner now
+RELEASE_SCRIPT = """
+local released = 0
+for _, key in ipairs(KEYS) do
+    if redis.call('GET', key) == ARGV[1] then
+        released = released + redis.call('DEL', key)
+    end
+end
+return released
+"""
+
+
+def fingerprint(*parts):
+    # Stable across processes and runs: canonical JSON of the arguments that determine the work
+    canonical = json.dumps(parts, sort_keys=True, separators=(",", ":"), ensure_ascii=False, default=str)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+class TaskDeduplicator:
+    """Runs each distinct piece of work once across all workers sharing a Redis.
+
+    Work is identified by a fingerprint. A finished result is kept for `window`
+    seconds and reused by later identical requests. While a result is being
+    computed, its owner holds a lock and identical requests poll for the
+    result instead of repeating the work. If the owner fails, or its result is
+    not cacheable, the lock is released and the waiters compute it themselves.
+    """
+
+    def __init__(self, client, namespace, window=300, lock_ttl=600, wait_timeout=300, poll_interval=0.05, max_poll_interval=1.0, clock=time.monotonic, sleep=time.sleep):
+        self.client = client
+        self.namespace = namespace
+        self.window = window
+        self.lock_ttl = lock_ttl
+        self.wait_timeout = wait_timeout
+        self.poll_interval = poll_interval
+        self.max_poll_interval = max_poll_interval
+        self.clock = clock
+        self.sleep = sleep
+        self.local_stats = dict.fromkeys(STATS, 0)
+        self._release = client.register_script(RELEASE_SCRIPT)
+
+    def _result_key(self, key):
+        return f"{KEY_PREFIX}:{self.namespace}:result:{key}"
+
+    def _lock_key(self, key):
+        return f"{KEY_PREFIX}:{self.namespace}:lock:{key}"
+
+    def _stats_key(self, stat):
+        return f"{KEY_PREFIX}:{self.namespace}:stats:{stat}"
+
+    def run(self, key, compute, cacheable=None):
+        """Return `compute()`'s result for `key`, shared with identical in-flight or recent calls."""
+        return self.run_many([key], [None], lambda items: [compute()], cacheable)[0]
+
+    def run_many(self, keys, items, compute_many, cacheable=None):
+        """Resolve a batch: `compute_many(items)` is called only with the first item of each key nobody else has."""
+        cacheable = cacheable or (lambda value: True)
+        first_items = {}
+        for key, item in zip(keys, items):
+            first_items.setdefault(key, item)
+        unique = list(first_items)
+
+        reused = self._load(unique)
+        owned, busy, token = self._acquire([key for key in unique if key not in reused])
+        computed = self._compute(owned, first_items, compute_many, cacheable, token=token) if owned else {}
+        coalesced = self._wait(busy) if busy else {}
+        # Owners that failed or produced an uncacheable result leave nothing behind; do it here
+        leftovers = [key for key in busy if key not in coalesced]
+        if leftovers:
+            computed.update(self._compute(leftovers, first_items, compute_many, cacheable))
+
+        counts = dict.fromkeys(STATS, 0)
+        seen = set()
+        results = []
+        for key in keys:
+            if key in reused:
+                counts["reused"] += 1
+                results.append(reused[key])
+            elif key in coalesced or key in seen:
+                counts["coalesced"] += 1
+                results.append(coalesced[key] if key in coalesced else computed[key])
+            else:
+                counts["executed"] += 1
+                seen.add(key)
+                results.append(computed[key])
+        self._count(counts)
+        return results
+
+    def _load(self, keys):
+        if not keys:
+            return {}
+        values = self.client.mget([self._result_key(key) for key in keys])
+        return {key: json.loads(value) for key, value in zip(keys, values) if value is not None}
+
+    def _acquire(self, keys):
+        if not keys:
+            return [], [], None
+        token = uuid.uuid4().hex
+        pipe = self.client.pipeline()
+        for key in keys:
+            pipe.set(self._lock_key(key), token, nx=True, ex=self.lock_ttl)
+        acquired = pipe.execute()
+        owned = [key for key, ok in zip(keys, acquired) if ok]
+        busy = [key for key, ok in zip(keys, acquired) if not ok]
+        return owned, busy, token
+
+    def _compute(self, keys, first_items, compute_many, cacheable, token=None):
+        # With a token, `keys` are locked by this call and released once their results are stored
+        lock_keys = [self._lock_key(key) for key in keys]
+        try:
+            values = compute_many([first_items[key] for key in keys])
+        except Exception:
+            if token:
+                self._release(keys=lock_keys, args=[token])
+            raise
+
+        computed = dict(zip(keys, values))
+        pipe = self.client.pipeline()
+        for key, value in computed.items():
+            if cacheable(value):
+                pipe.set(self._result_key(key), json.dumps(value), ex=self.window)
+        if token:
+            self._release(keys=lock_keys, args=[token], client=pipe)
+        pipe.execute()
+        return computed
+
+    def _wait(self, keys):
+        deadline = self.clock() + self.wait_timeout
+        interval = self.poll_interval
+        remaining = list(keys)
+        resolved = {}
+        while remaining and self.clock() < deadline:
+            self.sleep(interval)
+            interval = min(interval * 2, self.max_poll_interval)
+            pipe = self.client.pipeline()
+            pipe.mget([self._result_key(key) for key in remaining])
+            for key in remaining:
+                pipe.exists(self._lock_key(key))
+            values, *locked = pipe.execute()
+            still_running = []
+            for key, value, lock in zip(remaining, values, locked):
+                if value is not None:
+                    resolved[key] = json.loads(value)
+                elif lock:
+                    still_running.append(key)
+            remaining = still_running
+        if remaining:
+            logger.warning(f"[Dedup] Gave up waiting on {len(remaining)} in-flight {self.namespace} results after {self.wait_timeout}s")
+        return resolved
+
+    def _count(self, counts):
+        pipe = self.client.pipeline()
+        for stat, count in counts.items():
+            if count:
+                self.local_stats[stat] += count
+                pipe.incrby(self._stats_key(stat), count)
+        pipe.execute()
+        saved = counts["reused"] + counts["coalesced"]
+        if saved:
+            logger.info(f"[Dedup] {self.namespace}: {counts['executed']} executed, {counts['coalesced']} coalesced, {counts['reused']} reused")
+
+    def stats(self):
+        executed, coalesced, reused = (int(value or 0) for value in self.client.mget([self._stats_key(stat) for stat in STATS]))
+        return {
+            "executed": executed,
+            "coalesced": coalesced,
+            "reused": reused,
+            "saved": coalesced + reused,
+            "saved_ratio": round((coalesced + reused) / max(executed + coalesced + reused, 1), 4),
+            "process": dict(self.local_stats),
+        }
@@ -0,0 +1,66 @@
+import re
+from collections import Counter
+from functools import lru_cache
+
+ANALYSIS_STOP_WORDS = frozenset({"the", "and", "or", "but", "in", "on", "at", "to", "for", "of", "with", "by", "from", "about", "this", "that", "these", "those", "they", "them", "their"})
+KEYWORD_STOP_WORDS = frozenset({"the", "and", "or", "but", "in", "on", "at", "to", "for", "of", "with", "by", "from", "about"})
+POSITIVE_WORDS = frozenset({"good", "great", "excellent", "amazing", "wonderful", "professional", "skilled", "experienced"})
+NEGATIVE_WORDS = frozenset({"bad", "poor", "terrible", "awful", "unprofessional"})
+
+
+def sentiment_label(sentiment_score):
+    return "positive" if sentiment_score > 0.1 else "negative" if sentiment_score < -0.1 else "neutral"
+
+
+class TextAnalyzer:
+    """Precompiled tokenizer and frozenset lexicons, built once per worker process.
+
+    Text is tokenized and counted in a single pass; stop-word filtering and
+    sentiment are then computed over the vocabulary instead of every token.
+    """
+
+    def __init__(self, min_length=3, stop_words=ANALYSIS_STOP_WORDS, positive_words=POSITIVE_WORDS, negative_words=NEGATIVE_WORDS):
+        self.token_pattern = re.compile(rf"\b[a-zA-Z]{{{min_length},}}\b")
+        self.stop_words = frozenset(stop_words)
+        self.positive_words = frozenset(positive_words)
+        self.negative_words = frozenset(negative_words)
+
+    def count(self, content):
+        # Returns (all token counts, stop-word-filtered counts); both keep first-seen order
+        token_counts = Counter(self.token_pattern.findall(content.lower()))
+        filtered_counts = Counter({word: count for word, count in token_counts.items() if word not in self.stop_words})
+        return token_counts, filtered_counts
+
+    def analyze(self, content, max_keywords=20):
+        token_counts, filtered_counts = self.count(content)
+        filtered_total = filtered_counts.total()
+
+        positive_count = sum(filtered_counts[word] for word in self.positive_words if word in filtered_counts)
+        negative_count = sum(filtered_counts[word] for word in self.negative_words if word in filtered_counts)
+        sentiment_score = (positive_count - negative_count) / max(filtered_total, 1)
+
+        return {
+            "keywords": [{"word": word, "count": count} for word, count in filtered_counts.most_common(max_keywords)],
+            "word_count": token_counts.total(),
+            "unique_words": len(filtered_counts),
+            "sentiment_score": sentiment_score,
+            "sentiment": sentiment_label(sentiment_score),
+        }
+
+    def keywords(self, content, max_keywords=50):
+        token_counts, filtered_counts = self.count(content)
+        return {
+            "keywords": [{"word": word, "count": count} for word, count in filtered_counts.most_common(max_keywords)],
+            "total_words": token_counts.total(),
+            "unique_words": len(token_counts),
+        }
+
+
+@lru_cache(maxsize=None)
+def get_text_analyzer():
+    return TextAnalyzer()
+
+
+@lru_cache(maxsize=16)
+def get_keyword_extractor(min_length=3):
+    return TextAnalyzer(min_length=min_length, stop_words=KEYWORD_STOP_WORDS)
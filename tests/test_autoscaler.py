@@ -0,0 +1,209 @@
+import fakeredis
+from shinsa.celery_app.autoscaler import AutoscaleController, CeleryPoolControl, PrometheusRuntimeSource, RedisQueueDepthSource
+
+POLICIES = {
+    "io_intensive": {"min": 4, "max": 100, "target_drain_seconds": 60, "default_runtime": 1.0, "max_step": 20},
+    "cpu_intensive": {"min": 1, "max": 8, "target_drain_seconds": 60, "default_runtime": 1.0, "max_step": 4},
+}
+
+
+class FakeDepths:
+    def __init__(self, **depths):
+        self.values = depths
+
+    def depths(self, queues):
+        return {queue: self.values.get(queue, 0) for queue in queues}
+
+
+class FakeRuntimes:
+    def __init__(self, **runtimes):
+        self.values = runtimes
+
+    def runtimes(self, queues):
+        return dict(self.values)
+
+
+class FakePools:
+    def __init__(self, **sizes):
+        self.sizes = sizes
+        self.calls = []
+
+    def concurrency(self, queue):
+        return self.sizes.get(queue)
+
+    def grow(self, queue, n):
+        self.calls.append(("grow", queue, n))
+        self.sizes[queue] += n
+
+    def shrink(self, queue, n):
+        self.calls.append(("shrink", queue, n))
+        self.sizes[queue] -= n
+
+
+class FakeControl:
+    """app.control of worker nodes whose stats, like Celery's, keep the boot size after pool_grow/pool_shrink."""
+
+    def __init__(self, **pools):
+        self.pools = pools
+        self.sizes = {destination: pool.get("max-concurrency", len(pool.get("processes", []))) for destination, pool in pools.items()}
+        self.pids = dict.fromkeys(pools, 1)
+
+    def inspect(self, destination, timeout):
+        return type("Inspect", (), {"stats": lambda _: {node: {"pid": self.pids[node], "pool": self.pools[node]} for node in destination if node in self.pools}})()
+
+    def pool_grow(self, n, destination):
+        self.resize(destination[0], n)
+
+    def pool_shrink(self, n, destination):
+        self.resize(destination[0], -n)
+
+    def resize(self, node, n):
+        self.sizes[node] += n
+        # Prefork lists its live processes
+        if "processes" in self.pools[node]:
+            self.pools[node]["processes"] = list(range(self.sizes[node]))
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def make_controller(depths, runtimes, pools, clock):
+    return AutoscaleController(depths, runtimes, pools, POLICIES, cooldown=30, hysteresis=0.25, scale_down_ticks=3, clock=clock)
+
+
+def test_backlog_grows_pool_in_bounded_steps_up_to_max():
+    depths, pools, clock = FakeDepths(io_intensive=3000, cpu_intensive=0), FakePools(io_intensive=20, cpu_intensive=2), FakeClock()
+    controller = make_controller(depths, FakeRuntimes(io_intensive=2.0), pools, clock)
+
+    controller.tick()
+    assert pools.sizes["io_intensive"] == 40  # wants 100 (3000 x 2s / 60s), at most +20 per change
+    controller.tick()
+    assert pools.sizes["io_intensive"] == 40  # still cooling down
+    clock.now += 31
+    controller.tick()
+    clock.now += 31
+    controller.tick()
+    clock.now += 31
+    controller.tick()
+    assert pools.sizes["io_intensive"] == 100
+    assert ("grow", "cpu_intensive", 1) not in pools.calls
+
+
+def test_scale_down_needs_sustained_low_target_and_stops_at_min():
+    depths, pools, clock = FakeDepths(io_intensive=0), FakePools(io_intensive=40, cpu_intensive=1), FakeClock()
+    controller = make_controller(depths, FakeRuntimes(), pools, clock)
+
+    for _ in range(2):
+        clock.now += 31
+        controller.tick()
+    assert pools.sizes["io_intensive"] == 40
+
+    clock.now += 31
+    controller.tick()
+    assert pools.sizes["io_intensive"] == 20  # third low tick, at most -20
+    for _ in range(6):
+        clock.now += 31
+        controller.tick()
+    assert pools.sizes["io_intensive"] == 4
+    assert pools.sizes["cpu_intensive"] == 1
+
+
+def test_hysteresis_band_does_not_flap():
+    # Target oscillates between 17 and 20 around a pool of 20: inside the 25% band, nothing changes
+    depths, pools, clock = FakeDepths(io_intensive=600), FakePools(io_intensive=20, cpu_intensive=1), FakeClock()
+    controller = make_controller(depths, FakeRuntimes(io_intensive=2.0), pools, clock)
+
+    for depth in [600, 510, 600, 510, 510, 510, 510]:
+        depths.values["io_intensive"] = depth
+        clock.now += 31
+        controller.tick()
+    assert pools.calls == []
+
+
+def test_pool_size_is_tracked_when_worker_stats_lag():
+    control = FakeControl(**{"io@host": {"max-concurrency": 20}, "cpu@host": {"max-concurrency": 2, "processes": [11, 12]}})
+    pools = CeleryPoolControl(type("App", (), {"control": control})(), {"io_intensive": "io@host", "cpu_intensive": "cpu@host"})
+    depths, clock = FakeDepths(io_intensive=3000, cpu_intensive=600), FakeClock()
+    controller = make_controller(depths, FakeRuntimes(io_intensive=2.0, cpu_intensive=1.0), pools, clock)
+
+    for _ in range(8):
+        clock.now += 31
+        controller.tick()
+    # gevent: grown from the applied size in +20 steps and held at max, though stats still say 20
+    assert control.sizes["io@host"] == 100
+    # prefork: the live size is the process list
+    assert control.sizes["cpu@host"] == 8 and control.pools["cpu@host"]["max-concurrency"] == 2
+
+    depths.values["io_intensive"] = 0
+    for _ in range(3):
+        clock.now += 31
+        controller.tick()
+    assert control.sizes["io@host"] == 80
+
+    # A restarted worker is back at its boot size
+    control.pids["io@host"], control.sizes["io@host"] = 2, 20
+    assert pools.concurrency("io_intensive") == 20
+
+
+def test_gevent_pool_is_kept_within_bounds():
+    from celery.concurrency.gevent import TaskPool
+
+    pool = TaskPool(limit=20)
+    pool.start()
+
+    class GeventNode:
+        def inspect(self, destination, timeout):
+            return type("Inspect", (), {"stats": lambda _: {"io@host": {"pid": 1, "pool": pool.info}}})()
+
+        def pool_grow(self, n, destination):
+            pool.grow(n)
+
+        def pool_shrink(self, n, destination):
+            pool.shrink(n)
+
+    pools = CeleryPoolControl(type("App", (), {"control": GeventNode()})(), {"io_intensive": "io@host"})
+    depths, clock = FakeDepths(io_intensive=6000), FakeClock()
+    controller = AutoscaleController(depths, FakeRuntimes(io_intensive=2.0), pools, {"io_intensive": POLICIES["io_intensive"]}, cooldown=30, scale_down_ticks=3, clock=clock)
+
+    for _ in range(8):
+        clock.now += 31
+        controller.tick()
+    assert pool._pool.size == 100 and pool.info["max-concurrency"] == 20
+
+    depths.values["io_intensive"] = 0
+    for _ in range(30):
+        clock.now += 31
+        controller.tick()
+    assert pool._pool.size == 4
+    pool.stop()
+
+
+def test_redis_depth_source_and_unreachable_worker():
+    client = fakeredis.FakeRedis()
+    client.rpush("io_intensive", *range(7))
+    assert RedisQueueDepthSource(client).depths(["io_intensive", "cpu_intensive"]) == {"io_intensive": 7, "cpu_intensive": 0}
+
+    pools = FakePools(cpu_intensive=1)
+    decisions = make_controller(RedisQueueDepthSource(client), FakeRuntimes(), pools, FakeClock()).tick()
+    assert [decision["queue"] for decision in decisions] == ["cpu_intensive"]
+
+
+def test_prometheus_runtime_source_uses_deltas_between_scrapes():
+    scrapes = iter(
+        [
+            'shinsa_task_runtime_seconds_sum{queue="io_intensive",state="SUCCESS",task="crawl_link"} 10.0\n'
+            'shinsa_task_runtime_seconds_count{queue="io_intensive",state="SUCCESS",task="crawl_link"} 10.0\n',
+            'shinsa_task_runtime_seconds_sum{queue="io_intensive",state="SUCCESS",task="crawl_link"} 40.0\n'
+            'shinsa_task_runtime_seconds_count{queue="io_intensive",state="SUCCESS",task="crawl_link"} 20.0\n',
+        ]
+    )
+    source = PrometheusRuntimeSource({"io_intensive": "http://worker/metrics"})
+    source.scrape = lambda url: next(scrapes)
+
+    assert source.runtimes(["io_intensive"]) == {"io_intensive": 1.0}
+    assert source.runtimes(["io_intensive"]) == {"io_intensive": 3.0}
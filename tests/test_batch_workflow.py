@@ -0,0 +1,45 @@
+import time
+from shinsa.celery_app.config import CRAWL_CACHE_CONFIG, DEDUP_CONFIG, CHANGE_DETECTION_CONFIG, REPORT_STORE_CONFIG
+from shinsa.celery_app.tasks.customer_tasks import plan_link_batches
+from shinsa.celery_app.tasks.crawl_tasks import crawl_link, crawl_links_batch
+from shinsa.celery_app.tasks.analysis_tasks import analyze_content, analyze_content_batch
+from shinsa.celery_app.tasks.report_tasks import generate_customer_report, generate_customer_reports_batch
+
+links_results = [
+    {
+        "customer": {"name": "Aung Myo Tun", "email": "aungmyotun@gmail.com"},
+        "links": ["https://example.com/aung_myo_tun", "https://twitter.com/aung", "https://linkedin.com/in/aung-myo-tun"],
+    },
+    {
+        "customer": {"name": "清水 勝美", "email": "shimizu@example.com"},
+        "links": ["https://example.com/清水_勝美", "https://twitter.com/清水"],
+    },
+]
+
+
+def test_plan_link_batches():
+    batches = plan_link_batches(links_results, 2)
+
+    assert [len(batch) for batch in batches] == [2, 2, 1]
+    assert [p["link"] for batch in batches for p in batch] == [link for r in links_results for link in r["links"]]
+
+
+def test_batched_reports_match_per_link_reports(monkeypatch):
+    monkeypatch.setattr(time, "sleep", lambda seconds: None)
+    monkeypatch.setitem(CRAWL_CACHE_CONFIG, "enabled", False)
+    monkeypatch.setitem(DEDUP_CONFIG, "enabled", False)
+    monkeypatch.setitem(CHANGE_DETECTION_CONFIG, "enabled", False)
+    monkeypatch.setitem(REPORT_STORE_CONFIG, "enabled", False)
+
+    analysis_batches = [analyze_content_batch.apply(args=[crawl_links_batch.apply(args=[batch]).get()]).get() for batch in plan_link_batches(links_results, 2)]
+    batched_reports = generate_customer_reports_batch.apply(args=[analysis_batches]).get()
+
+    assert len(batched_reports) == len(links_results)
+    for links_result, batched in zip(links_results, batched_reports):
+        analyses = [analyze_content.apply(args=[crawl_link.apply(args=[{"customer": links_result["customer"], "link": link}]).get()]).get() for link in links_result["links"]]
+        report = generate_customer_report.apply(args=[analyses]).get()
+
+        assert batched["customer"] == report["customer"]
+        assert batched["summary"] == report["summary"]
+        assert batched["link_details"] == report["link_details"]
+        assert batched["recommendations"] == report["recommendations"]
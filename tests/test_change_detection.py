@@ -0,0 +1,68 @@
+import time
+import random
+import fakeredis
+from shinsa.celery_app.tasks import analysis_tasks, report_tasks
+from shinsa.utils.page_fingerprint import PageFingerprints, hamming_distance, simhash
+from shinsa.utils.text_analyzer import get_text_analyzer
+
+URL = "https://example.com/profile"
+
+
+def make_page(seed, words=600):
+    rng = random.Random(seed)
+    vocabulary = ["python", "data", "growth", "team", "cloud", "design", "customer", "excellent", "service", "quality", "poor", "review"]
+    return " ".join(f"{rng.choice(vocabulary)}{rng.randint(0, 50)}" for _ in range(words))
+
+
+def edit_one_word(page):
+    words = page.split()
+    words[len(words) // 2] = "edited"
+    return " ".join(words)
+
+
+def test_simhash_separates_small_edits_from_different_pages():
+    page = make_page(1)
+    assert simhash(page) == simhash(page)
+    assert hamming_distance(simhash(page), simhash(edit_one_word(page))) <= 3
+    assert hamming_distance(simhash(page), simhash(make_page(2))) > 10
+
+
+def test_unchanged_and_near_identical_pages_reuse_the_last_analysis(monkeypatch):
+    fingerprints = PageFingerprints(fakeredis.FakeStrictRedis())
+    monkeypatch.setattr(analysis_tasks, "get_page_fingerprints", lambda: fingerprints)
+    analyzed = []
+
+    def analyze(contents):
+        analyzed.extend(contents)
+        time.sleep(0.01)
+        return [get_text_analyzer().analyze(content) for content in contents]
+
+    page = make_page(1)
+    crawls = [{"link": URL}, {"link": f"{URL}/failed", "status": "failed"}]
+    analyses, changes = analysis_tasks.analyze_pages(crawls, [page, ""], analyze=analyze)
+    assert [change and change["status"] for change in changes] == ["new", None]
+
+    # The recrawl, a one-word edit of it, then a rewrite
+    statuses = []
+    for content in (page, edit_one_word(page), make_page(2)):
+        reused, [change] = analysis_tasks.analyze_pages([{"link": URL}], [content], analyze=analyze)
+        statuses.append(change["status"])
+        if change["status"] != "changed":
+            assert reused == analyses[:1] and change["saved_cpu_seconds"] > 0
+
+    assert statuses == ["unchanged", "near_duplicate", "changed"]
+    assert analyzed == [page, "", make_page(2)]
+    stats = fingerprints.stats()
+    assert (stats["new"], stats["unchanged"], stats["near_duplicate"], stats["changed"]) == (1, 1, 1, 1)
+    assert stats["skip_rate"] == 0.5 and stats["saved_cpu_seconds"] > 0
+
+
+def test_reports_show_skip_rate_and_saved_time():
+    results = [
+        {"change_detection": {"status": "unchanged", "saved_cpu_seconds": 1.5}},
+        {"change_detection": {"status": "near_duplicate", "saved_cpu_seconds": 0.5}},
+        {"change_detection": {"status": "changed", "saved_cpu_seconds": 0}},
+        {"change_detection": {"status": "new", "saved_cpu_seconds": 0}},
+        {"link": "untracked"},
+    ]
+    assert report_tasks.summarize_changes(results) == {"pages": 4, "skipped": 2, "skip_rate": 0.5, "saved_cpu_seconds": 2.0}
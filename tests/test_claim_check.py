@@ -0,0 +1,85 @@
+import os
+import time
+import fakeredis
+import pytest
+from shinsa.utils.claim_check import ClaimCheck, FileBlobStore, RedisBlobStore
+from shinsa.celery_app.config import CLAIM_CHECK_CONFIG, CRAWL_CACHE_CONFIG, DEDUP_CONFIG, CHANGE_DETECTION_CONFIG, REPORT_AGGREGATION_CONFIG, REPORT_STORE_CONFIG
+from shinsa.celery_app.tasks import crawl_tasks
+from shinsa.celery_app.tasks.analysis_tasks import analyze_content
+from shinsa.celery_app.tasks.report_tasks import generate_customer_report
+
+page = "清水 勝美 — skilled Python developer. " * 1000
+
+
+@pytest.fixture(params=["file", "redis"])
+def claim_check(request, tmp_path):
+    store = FileBlobStore(str(tmp_path)) if request.param == "file" else RedisBlobStore(fakeredis.FakeRedis())
+    return ClaimCheck(store, threshold=1024)
+
+
+def test_offload_and_resolve(claim_check):
+    small = {"link": "https://twitter.com/aung", "content": "short page"}
+    large = {"link": "https://linkedin.com/in/aung", "content": page}
+
+    assert claim_check.offload(small, owner="workflow-1") is small
+    offloaded = claim_check.offload(large, owner="workflow-1")
+    assert offloaded["content"] is None and offloaded["content_ref"]["size"] == len(page.encode("utf-8"))
+    assert claim_check.resolve(offloaded) == page
+    assert claim_check.resolve(small) == "short page"
+    # Same content within a workflow is stored once
+    assert claim_check.offload(large, owner="workflow-1")["content_ref"] == offloaded["content_ref"]
+
+    claim_check.release("workflow-1")
+    with pytest.raises((KeyError, FileNotFoundError)):
+        claim_check.resolve(offloaded)
+
+
+def test_empty_file_blob(tmp_path):
+    store = FileBlobStore(str(tmp_path))
+    assert store.load_text(store.put("", owner="workflow-2")) == ""
+
+
+def test_sweep_removes_blobs_of_abandoned_workflows(tmp_path):
+    store = FileBlobStore(str(tmp_path), ttl=3600)
+    abandoned = store.put(page, owner="workflow-abandoned")
+    unowned = store.put("unowned page")
+    old = time.time() - 7200
+    for path in (tmp_path / "workflow-abandoned", tmp_path / unowned["key"]):
+        os.utime(path, (old, old))
+    live = store.put(page, owner="workflow-live")
+
+    assert store.sweep() == 2
+    assert store.load_text(live) == page
+    with pytest.raises(FileNotFoundError):
+        store.load_text(abandoned)
+
+
+def test_file_store_needs_a_shared_path(monkeypatch):
+    monkeypatch.setattr(crawl_tasks, "_claim_check", None)
+    monkeypatch.setitem(CLAIM_CHECK_CONFIG, "store", "file")
+    monkeypatch.setitem(CLAIM_CHECK_CONFIG, "path", None)
+    with pytest.raises(ValueError):
+        crawl_tasks.get_claim_check()
+
+
+def test_chain_carries_reference_and_report_releases_it(tmp_path, monkeypatch):
+    monkeypatch.setattr(time, "sleep", lambda seconds: None)
+    monkeypatch.setitem(CRAWL_CACHE_CONFIG, "enabled", False)
+    monkeypatch.setitem(DEDUP_CONFIG, "enabled", False)
+    monkeypatch.setitem(CHANGE_DETECTION_CONFIG, "enabled", False)
+    monkeypatch.setitem(REPORT_AGGREGATION_CONFIG, "enabled", False)
+    monkeypatch.setitem(REPORT_STORE_CONFIG, "enabled", False)
+    monkeypatch.setattr(crawl_tasks, "_claim_check", ClaimCheck(FileBlobStore(str(tmp_path)), threshold=1024))
+    monkeypatch.setattr(crawl_tasks, "fetch_url", lambda url, headers=None: {"url": url, "status": 200, "headers": {}, "content": page, "error": None})
+    customer = {"name": "清水 勝美", "email": "shimizu@example.com"}
+
+    crawled = crawl_tasks.crawl_link.apply(args=[{"customer": customer, "link": "https://linkedin.com/in/shimizu", "workflow_id": "workflow-3"}]).get()
+    assert crawled["content"] is None and crawled["content_length"] == len(page)
+    assert os.path.isdir(tmp_path / "workflow-3")
+
+    analysis = analyze_content.apply(args=[crawled]).get()
+    assert analysis["analysis"]["keywords"][0] == {"word": "skilled", "count": 1000}
+    assert analysis["original_content_length"] == len(page)
+
+    generate_customer_report.apply(args=[[analysis]]).get()
+    assert not os.path.exists(tmp_path / "workflow-3")
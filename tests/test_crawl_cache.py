@@ -0,0 +1,122 @@
+import fakeredis
+from shinsa.utils.crawl_cache import CrawlCache, LocalLRU, normalize_url
+from shinsa.celery_app.tasks import crawl_tasks
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1_000_000.0
+
+    def __call__(self):
+        return self.now
+
+
+class FakeOrigin:
+    def __init__(self, content="<html>profile</html>", etag='"v1"'):
+        self.content = content
+        self.etag = etag
+        self.requests = []
+
+    def __call__(self, url, headers=None):
+        self.requests.append(headers or {})
+        if headers and headers.get("If-None-Match") == self.etag:
+            return {"url": url, "status": 304, "headers": {}, "content": "", "error": None}
+        return {"url": url, "status": 200, "headers": {"ETag": self.etag}, "content": self.content, "error": None}
+
+
+def make_cache(**options):
+    clock = FakeClock()
+    return CrawlCache(fakeredis.FakeRedis(), clock=clock, **options), clock
+
+
+def test_normalize_url():
+    assert normalize_url("HTTPS://Twitter.com:443/Aung/?b=2&a=1#bio") == "https://twitter.com/Aung?a=1&b=2"
+    assert normalize_url("http://example.com") == normalize_url("http://EXAMPLE.com/")
+    assert normalize_url("http://example.com:8080/x") == "http://example.com:8080/x"
+
+
+def test_hit_miss_and_shared_tier():
+    cache, _ = make_cache()
+    origin = FakeOrigin()
+
+    first = cache.fetch("https://twitter.com/aung", origin)
+    second = cache.fetch("https://TWITTER.com/aung/", origin)
+
+    assert first["cache_hit"] is False and second["cache_hit"] is True
+    assert second["content"] == origin.content
+    assert len(origin.requests) == 1
+
+    # Another worker (empty local tier) sharing the same Redis gets a hit too
+    other = CrawlCache(cache.client, clock=cache.clock)
+    assert other.fetch("https://twitter.com/aung", origin)["cache_hit"] is True
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"]) == (2, 1)
+
+
+def test_stale_entry_is_revalidated_with_etag():
+    cache, clock = make_cache(ttl=60)
+    origin = FakeOrigin()
+    cache.fetch("https://linkedin.com/in/aung", origin)
+
+    clock.now += 120
+    revalidated = cache.fetch("https://linkedin.com/in/aung", origin)
+
+    assert revalidated["cache_hit"] is True and revalidated["content"] == origin.content
+    assert origin.requests[-1] == {"If-None-Match": '"v1"'}
+    assert cache.stats()["revalidated"] == 1
+
+    # Changed content replaces the entry
+    clock.now += 120
+    origin.content, origin.etag = "<html>new</html>", '"v2"'
+    changed = cache.fetch("https://linkedin.com/in/aung", origin)
+    assert changed["cache_hit"] is False and changed["content"] == "<html>new</html>"
+
+
+def test_identical_content_is_stored_once():
+    cache, _ = make_cache()
+    origin = FakeOrigin()
+    cache.fetch("https://twitter.com/aung", origin)
+    cache.fetch("https://socialmedia.com/aung", origin)
+
+    assert len(cache.client.keys("crawl-cache:content:*")) == 1
+    assert len(cache.client.keys("crawl-cache:url:*")) == 2
+
+
+def test_lru_eviction():
+    cache, clock = make_cache(max_entries=2)
+    origin = FakeOrigin()
+    for name in ("a", "b"):
+        cache.fetch(f"https://twitter.com/{name}", origin)
+        clock.now += 1
+    cache.fetch("https://twitter.com/a", origin)  # refresh "a"
+    clock.now += 1
+    cache.fetch("https://twitter.com/c", origin)
+
+    assert cache.stats()["entries"] == 2
+    assert cache.fetch("https://twitter.com/a", origin)["cache_hit"] is True
+    assert cache.fetch("https://twitter.com/b", origin)["cache_hit"] is False
+
+
+def test_local_lru_is_bounded_by_bytes():
+    lru = LocalLRU(max_entries=10, max_bytes=10)
+    lru.put("a", {"content": "12345"})
+    lru.put("b", {"content": "12345"})
+    lru.put("c", {"content": "123"})
+
+    assert lru.get("a") is None and lru.get("b") is not None
+    assert lru.total_bytes == 8
+
+
+def test_crawl_links_batch_reports_cache_hits(monkeypatch):
+    cache, _ = make_cache()
+    monkeypatch.setattr(crawl_tasks, "get_crawl_cache", lambda: cache)
+    monkeypatch.setitem(crawl_tasks.DEDUP_CONFIG, "enabled", False)
+    monkeypatch.setattr(crawl_tasks, "fetch_urls", lambda urls, per_url_headers=None: [FakeOrigin()(url) for url in urls])
+    customer = {"name": "Aung Myo Tun"}
+    payloads = [{"customer": customer, "link": "https://twitter.com/aung"}]
+
+    first = crawl_tasks.crawl_links_batch.apply(args=[payloads]).get()
+    second = crawl_tasks.crawl_links_batch.apply(args=[payloads]).get()
+
+    assert first[0]["cache_hit"] is False and second[0]["cache_hit"] is True
+    assert second[0]["content"] == first[0]["content"]
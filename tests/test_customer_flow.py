@@ -2,7 +2,7 @@ from shinsa.utils.logger import get_logger
 from datetime import datetime, timedelta, timezone
 from celery import chord, chain, group
 from shinsa.celery_app.app import celery_app
-from shinsa.celery_app.tasks.customer_tasks import find_customer_links, process_customer_workflow
+from shinsa.celery_app.tasks.customer_tasks import find_customer_links, process_customer_workflow, process_customers_batch
 from shinsa.celery_app.tasks.report_tasks import batch_generate_report
 
 logger = get_logger("test_customer_flow")
@@ -96,11 +96,31 @@ def test_batch_job():
     batch_job = chord(group(customer_workflows), batch_generate_report.s()).apply_async()
 
 
+def test_batched_job():
+    customers = [
+        {
+            "name": "Aung Myo Tun",
+            "email": "aungmyotun@gmail.com",
+            "address": "Tokyo",
+        },
+        {
+            "name": "清水 勝美",
+            "email": "shimizu@example.com",
+            "address": "Osaka",
+        },
+    ]
+
+    # Links of all customers are crawled and analyzed in shared batches
+    batch_job = chord(group(find_customer_links.s(customer) for customer in customers), process_customers_batch.s()).apply_async()
+    logger.info(f"Batched workflow task ID {batch_job.id}")
+
+
 if __name__ == "__main__":
     # test_apply()
     # test_apply_async()
     # test_singature()
     test_send_task()
     # test_batch_job()
+    # test_batched_job()
     # test_scehdule()
     logger.info("Test module execution completed.")
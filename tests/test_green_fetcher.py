@@ -0,0 +1,87 @@
+import sys
+import json
+import time
+import gzip
+import threading
+import subprocess
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import pytest
+from shinsa.celery_app.tasks import crawl_tasks
+from shinsa.utils.http_fetcher import FetchEngine
+
+
+class SlowHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive
+    delay = 0.2
+    active = 0
+    max_active = 0
+    connections = set()
+    lock = threading.Lock()
+
+    def do_GET(self):
+        cls = type(self)
+        with cls.lock:
+            cls.connections.add(self.client_address)
+            cls.active += 1
+            cls.max_active = max(cls.max_active, cls.active)
+        time.sleep(cls.delay)
+        with cls.lock:
+            cls.active -= 1
+
+        if self.path.startswith("/moved"):
+            self.send_response(302)
+            self.send_header("Location", "/page/target")
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        body = gzip.compress(f"page {self.path}".encode())
+        self.send_response(200)
+        self.send_header("Content-Encoding", "gzip")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def slow_server():
+    SlowHandler.active = SlowHandler.max_active = 0
+    SlowHandler.connections = set()
+    server = ThreadingHTTPServer(("127.0.0.1", 0), SlowHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
+
+
+def run_patched(code):
+    # gevent has to patch the interpreter before anything else imports socket, as `celery worker -P gevent` does
+    script = "from gevent import monkey; monkey.patch_all()\n" + code
+    completed = subprocess.run([sys.executable, "-c", script], capture_output=True, text=True, check=True, timeout=60)
+    return json.loads(completed.stdout)
+
+
+def test_green_fetcher_is_concurrent_under_gevent(slow_server):
+    result = run_patched(f"""
+import json, time
+from shinsa.celery_app.tasks.crawl_tasks import get_live_fetch_engine
+engine = get_live_fetch_engine()
+urls = ["{slow_server}/page/%d" % i for i in range(16)] + ["{slow_server}/moved"]
+started = time.perf_counter()
+responses = engine.fetch_many(urls)
+print(json.dumps({{"engine": type(engine).__name__, "elapsed": time.perf_counter() - started, "contents": [r["content"] for r in responses]}}))
+""")
+
+    assert result["engine"] == "GreenFetcher"
+    assert result["contents"] == [f"page /page/{i}" for i in range(16)] + ["page /page/target"]
+    # 17 requests of 0.2s at 8 per host: a few rounds, not 17 sequential requests
+    assert result["elapsed"] < 2.0
+    assert 2 < SlowHandler.max_active <= 8
+    assert len(SlowHandler.connections) <= 8
+
+
+def test_live_fetch_engine_without_gevent_is_the_asyncio_engine():
+    assert isinstance(crawl_tasks.get_live_fetch_engine(), FetchEngine)
@@ -0,0 +1,96 @@
+import time
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import pytest
+from shinsa.utils.http_fetcher import FetchEngine
+from shinsa.celery_app.tasks import crawl_tasks
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive
+    delay = 0.05
+    active = 0
+    max_active = 0
+    connections = set()
+    lock = threading.Lock()
+
+    def do_GET(self):
+        cls = type(self)
+        with cls.lock:
+            cls.connections.add(self.client_address)
+            cls.active += 1
+            cls.max_active = max(cls.max_active, cls.active)
+        time.sleep(cls.delay)
+        with cls.lock:
+            cls.active -= 1
+
+        if self.path.startswith("/missing"):
+            body, status = b"not found", 404
+        else:
+            body, status = f"page {self.path}".encode(), 200
+        self.send_response(status)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def stub_server():
+    StubHandler.active = StubHandler.max_active = 0
+    StubHandler.connections = set()
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
+
+
+def test_fetch_many_keeps_order_and_limits_per_host(stub_server):
+    engine = FetchEngine(limit_per_host=4)
+    try:
+        urls = [f"{stub_server}/page/{i}" for i in range(20)]
+        responses = engine.fetch_many(urls)
+    finally:
+        engine.close()
+
+    assert [r["content"] for r in responses] == [f"page /page/{i}" for i in range(20)]
+    assert all(r["status"] == 200 and r["error"] is None for r in responses)
+    assert StubHandler.max_active <= 4
+    # 20 requests over at most 4 pooled keep-alive connections
+    assert len(StubHandler.connections) <= 4
+
+
+def test_fetch_reports_errors(stub_server):
+    engine = FetchEngine()
+    try:
+        missing = engine.fetch(f"{stub_server}/missing")
+        refused = engine.fetch("http://127.0.0.1:1/")
+    finally:
+        engine.close()
+
+    assert missing["status"] == 404 and missing["error"] == "HTTP 404"
+    assert refused["status"] is None and refused["error"]
+
+
+def test_crawl_links_batch_matches_crawl_link_shape(stub_server, monkeypatch):
+    monkeypatch.setattr(crawl_tasks, "CRAWL_LIVE_FETCH", True)
+    monkeypatch.setitem(crawl_tasks.CRAWL_CACHE_CONFIG, "enabled", False)
+    monkeypatch.setitem(crawl_tasks.DEDUP_CONFIG, "enabled", False)
+    customer = {"name": "Aung Myo Tun", "email": "aungmyotun@gmail.com"}
+    payloads = [
+        {"customer": customer, "link": f"{stub_server}/profile/aung"},
+        {"customer": customer, "link": f"{stub_server}/missing/aung"},
+    ]
+
+    results = crawl_tasks.crawl_links_batch.apply(args=[payloads]).get()
+
+    assert [r["link"] for r in results] == [p["link"] for p in payloads]
+    ok, failed = results
+    assert set(ok) == {"customer", "link", "content", "content_length", "crawl_task_id", "status", "cache_hit"}
+    assert ok["status"] == "success" and ok["content"] == "page /profile/aung"
+    assert ok["content_length"] == len(ok["content"])
+    assert failed["status"] == "failed" and failed["error"] == "HTTP 404"
@@ -0,0 +1,25 @@
+import sys
+import subprocess
+
+PRODUCER_IMPORT = "from shinsa.celery_app.tasks.customer_tasks import find_customer_links"
+
+
+def run_python(code):
+    return subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True)
+
+
+def test_producer_import_skips_worker_only_dependencies():
+    completed = run_python(f"import sys; {PRODUCER_IMPORT}; print(sorted(m for m in ('numpy', 'aiohttp', 'prometheus_client') if m in sys.modules))")
+    assert completed.stdout == "[]\n"
+
+
+def test_producer_import_has_no_output_or_log_files():
+    completed = run_python(
+        f"import logging.handlers as h; opened = []; h.TimedRotatingFileHandler._open = lambda self: opened.append(self) or open('/dev/null', 'a'); {PRODUCER_IMPORT}; print(len(opened))"
+    )
+    assert completed.stdout == "0\n"
+
+
+def test_worker_boot_preloads_heavy_modules():
+    completed = run_python("import sys; from shinsa.celery_app.app import preload_worker_modules; preload_worker_modules(); print('numpy' in sys.modules and 'aiohttp' in sys.modules)")
+    assert completed.stdout == "True\n"
@@ -0,0 +1,105 @@
+import json
+from contextlib import ExitStack
+import fakeredis
+import pytest
+from celery.contrib.testing.worker import start_worker
+from benchmarks import harness
+from shinsa.celery_app.app import celery_app
+from shinsa.celery_app.config import REPORT_STORE_CONFIG
+from shinsa.celery_app.ingest import CustomerIngestor, build_window_workflow, iter_customers
+from shinsa.celery_app.tasks import customer_tasks, report_tasks
+from shinsa.utils.batch_summary import BatchSummary
+
+
+class FakeDepthSource:
+    def __init__(self, depths):
+        self.depths_seen = list(depths)
+
+    def depths(self, queues):
+        depth = self.depths_seen.pop(0) if len(self.depths_seen) > 1 else self.depths_seen[0]
+        return {queues[0]: depth}
+
+
+def test_customers_are_read_lazily_from_jsonl_and_csv(tmp_path):
+    jsonl = tmp_path / "customers.jsonl"
+    jsonl.write_text("\n".join(json.dumps({"name": f"Customer {i}"}) for i in range(3)) + "\n\nnot json\n")
+    csv_file = tmp_path / "customers.csv"
+    csv_file.write_text("name,website\nAcme,https://acme.example\nBeta,\n")
+
+    customers = iter_customers(str(jsonl))
+    assert next(customers) == {"name": "Customer 0"}
+    assert [customer["name"] for customer in customers] == ["Customer 1", "Customer 2"]
+    assert list(iter_customers(str(csv_file))) == [{"name": "Acme", "website": "https://acme.example"}, {"name": "Beta"}]
+
+
+def test_submission_pauses_while_the_queues_are_deep():
+    summary = BatchSummary(fakeredis.FakeStrictRedis())
+    sleeps, submitted, finished = [], [], []
+
+    def submit(customers, batch_id, window):
+        submitted.append(len(customers))
+
+    ingestor = CustomerIngestor(submit, finished.append, FakeDepthSource([500, 50, 50, 500, 50]), summary, ["coordination"], window=4, max_queue_depth=100, poll_interval=1, sleep=sleeps.append)
+    result = ingestor.run(({"name": f"Customer {i}"} for i in range(10)), "b1")
+
+    assert submitted == [4, 4, 2]
+    assert result == {"batch_id": "b1", "customers": 10, "windows": 3, "paused_seconds": 2}
+    # One pause before the first window and one before the third, both for a deep queue
+    assert sleeps == [1, 1]
+    assert finished == []
+
+
+def test_submitter_gives_up_on_a_stuck_pipeline_and_closes_the_batch():
+    summary = BatchSummary(fakeredis.FakeStrictRedis())
+    submitted, finished = [], []
+    ingestor = CustomerIngestor(lambda customers, batch_id, window: submitted.append(window), finished.append, FakeDepthSource([50, 500]), summary, ["coordination"], window=4, max_queue_depth=100, poll_interval=1, max_wait=3, sleep=lambda seconds: None)
+
+    with pytest.raises(TimeoutError):
+        ingestor.run(({"name": f"Customer {i}"} for i in range(10)), "stuck")
+
+    assert submitted == [0]
+    assert summary.read("stuck")["windows_total"] == 1
+    summary.add_window("stuck", 0, 4, 4, 8)
+    assert finished == [] and summary.read("stuck")["customers"] == 4
+
+
+@pytest.mark.parametrize("mode", ["batched", "per-customer"])
+def test_failed_window_is_folded_in_as_failed(mode, monkeypatch):
+    def failing_discovery(customers):
+        raise ValueError("malformed customer")
+
+    monkeypatch.setattr(customer_tasks, "discover_links", failing_discovery)
+    monkeypatch.setitem(REPORT_STORE_CONFIG, "enabled", False)
+    saved = harness.configure_app(latency_scale=0.0001)
+    try:
+        with ExitStack() as stack:
+            for queue, (pool, concurrency) in harness.DEFAULT_WORKERS.items():
+                stack.enter_context(start_worker(celery_app, pool=pool, concurrency=concurrency, queues=[queue], perform_ping_check=False, shutdown_timeout=30))
+            summary = report_tasks.get_batch_summary()
+            summary.close("failing", 1)
+
+            build_window_workflow([{"name": "Aung Myo Tun"}, {"name": "Bob Smith"}], "failing", 0, mode).apply_async()
+            # The failed window is the last one, so it completes the batch and the batch report is built
+            report = celery_app.AsyncResult(report_tasks.ingest_report_id("failing")).get(timeout=20)
+    finally:
+        harness.restore_app(saved)
+
+    assert report["batch_summary"]["total_customers"] == 2
+    assert report["batch_summary"]["failed_customers"] == 2
+
+
+def test_batch_completes_once_whichever_side_finishes_last():
+    summary = BatchSummary(fakeredis.FakeStrictRedis())
+
+    # The last window lands after the submitter closed the batch
+    assert not summary.add_window("late", 0, 10, 9, 40)
+    assert not summary.close("late", 2)
+    assert summary.add_window("late", 1, 5, 5, 20)
+    assert not summary.add_window("late", 1, 5, 5, 20)
+    assert summary.read("late") == {"customers": 15, "successful": 14, "failed": 1, "links": 60, "windows_done": 2, "windows_total": 2}
+
+    # Every window finished before the close
+    assert not summary.add_window("early", 0, 3, 3, 6)
+    assert summary.close("early", 1)
+    assert not summary.close("early", 1)
+
@@ -0,0 +1,69 @@
+import time
+from shinsa.celery_app.config import LINK_DISCOVERY_CONFIG
+from shinsa.celery_app.tasks import crawl_tasks
+from shinsa.celery_app.tasks.customer_tasks import find_customer_links, find_customer_links_batch
+from shinsa.utils.handle_index import HandleIndex, build_handle_index
+from shinsa.utils.name_handles import name_parts, normalize_name
+
+aung = {"name": "Aung Myo Tun", "email": "aungmyotun@gmail.com"}
+shimizu = {"name": "清水 勝美", "email": "shimizu@example.com"}
+shimizu_kenji = {"name": "清水 健二"}
+
+
+def test_names_are_normalized_and_transliterated():
+    assert normalize_name("  Ａｕｎｇ   Myo TUN ") == "aung myo tun"
+    assert name_parts("José Ñúñez-García") == ["jose", "nunez", "garcia"]
+    assert name_parts("キョウコ ハットリ") == ["kyouko", "hattori"]
+    assert name_parts("まっちゃ") == ["matcha"]
+    assert name_parts("O'Brien") == ["obrien"]
+    # No reading rule for kanji: both words are kept, so two 清水 no longer share a handle
+    assert name_parts(shimizu["name"]) == ["清水", "勝美"]
+
+
+def test_handle_index_prefers_email_entries(tmp_path):
+    path = str(tmp_path / "data" / "handles.idx")
+    entries = [
+        {"name": shimizu["name"], "handles": {"linkedin.com": "katsumi-shimizu", "twitter.com": "shimizu_k"}},
+        {"name": shimizu["name"], "email": "Shimizu@Example.com", "handles": {"twitter.com": "katsumi_s"}},
+    ] + [{"name": f"Customer{i} Index", "handles": {"example.com": f"customer{i}"}} for i in range(200)]
+    assert build_handle_index(entries, path) == 202
+
+    index = HandleIndex(path)
+    assert index.lookup(shimizu) == {"linkedin.com": "katsumi-shimizu", "twitter.com": "katsumi_s"}
+    assert index.lookup({"name": "CUSTOMER150  index"}) == {"example.com": "customer150"}
+    assert index.lookup(shimizu_kenji) == {}
+    index.close()
+
+
+def test_batch_discovery_resolves_known_handles_and_checks_the_rest_once(tmp_path, monkeypatch):
+    path = str(tmp_path / "handles.idx")
+    build_handle_index([{"name": shimizu["name"], "email": shimizu["email"], "handles": {"linkedin.com": "katsumi-shimizu", "twitter.com": "katsumi_s"}}], path)
+    monkeypatch.setitem(LINK_DISCOVERY_CONFIG, "index_path", path)
+    monkeypatch.setitem(LINK_DISCOVERY_CONFIG, "check_candidates", True)
+    checked = []
+
+    def crawl_urls(urls):
+        checked.append(urls)
+        return [{"url": url, "status": 404 if "twitter.com/aung" in url else 200, "headers": {}, "content": "", "error": None} for url in urls]
+
+    monkeypatch.setattr(crawl_tasks, "crawl_urls", crawl_urls)
+
+    results = find_customer_links_batch.apply(args=[[aung, shimizu, shimizu_kenji]], task_id="discovery").get()
+
+    assert [result["customer"] for result in results] == [aung, shimizu, shimizu_kenji]
+    assert results[0]["links"] == ["https://example.com/aung_myo_tun", "https://socialmedia.com/aungmyotun", "https://linkedin.com/in/aung-myo-tun"]
+    assert results[1]["links"][2:] == ["https://linkedin.com/in/katsumi-shimizu", "https://twitter.com/katsumi_s"]
+    assert not set(results[1]["links"]) & set(results[2]["links"])
+    # Indexed handles are trusted; the other candidates are checked together in one round
+    assert len(checked) == 1 and len(checked[0]) == 10
+    assert all(result["task_id"] == "discovery" for result in results)
+
+
+def test_single_and_batched_discovery_agree(monkeypatch):
+    monkeypatch.setattr(time, "sleep", lambda seconds: None)
+    monkeypatch.setitem(LINK_DISCOVERY_CONFIG, "index_path", "/nonexistent/handles.idx")
+
+    single = [find_customer_links.apply(args=[customer]).get() for customer in (aung, shimizu)]
+    batched = find_customer_links_batch.apply(args=[[aung, shimizu]]).get()
+
+    assert [result["links"] for result in single] == [result["links"] for result in batched]
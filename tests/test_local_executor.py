@@ -0,0 +1,59 @@
+import time
+import pytest
+from shinsa.celery_app import config
+from shinsa.celery_app.config import DEDUP_CONFIG, CHANGE_DETECTION_CONFIG, REPORT_STORE_CONFIG
+from shinsa.celery_app.local import LocalExecutor
+from shinsa.celery_app.tasks import crawl_tasks
+from shinsa.celery_app.tasks.analysis_tasks import analyze_content
+from shinsa.celery_app.tasks.customer_tasks import find_customer_links
+from shinsa.celery_app.tasks.report_tasks import generate_customer_report
+from shinsa.utils.retry_policy import FetchError
+
+customer = {"name": "Aung Myo Tun", "email": "aungmyotun@gmail.com", "address": "Tokyo"}
+
+
+@pytest.fixture
+def executor(monkeypatch):
+    for stage in config.SIMULATED_LATENCIES:
+        monkeypatch.setitem(config.SIMULATED_LATENCIES, stage, 0)
+    monkeypatch.setitem(DEDUP_CONFIG, "enabled", False)
+    monkeypatch.setitem(CHANGE_DETECTION_CONFIG, "enabled", False)
+    monkeypatch.setitem(REPORT_STORE_CONFIG, "enabled", False)
+    with LocalExecutor(max_workers=2) as executor:
+        yield executor
+
+
+def test_local_report_matches_the_task_graph(executor):
+    report = executor.run(customer)
+
+    links = find_customer_links.apply(args=[customer]).get()["links"]
+    crawled = [{"customer": customer, "link": link, "content": response["content"], "content_length": len(response["content"]), "crawl_task_id": "crawl"} for link, response in zip(links, crawl_tasks.fetch_urls(links))]
+    expected = generate_customer_report.apply(args=[[analyze_content.apply(args=[page]).get() for page in crawled]]).get()
+
+    assert report["report_metadata"]["report_task_id"].startswith("local-")
+    for field in ("customer", "summary", "link_details", "recommendations", "change_detection"):
+        assert report[field] == expected[field]
+
+
+def test_many_customers_share_the_loop_and_failures_are_reported(executor, monkeypatch):
+    fetch_urls = crawl_tasks.fetch_urls
+    in_flight, peak = [], []
+
+    def failing_for_bob(urls, per_url_headers=None):
+        in_flight.append(urls)
+        peak.append(len(in_flight))
+        time.sleep(0.05)
+        in_flight.remove(urls)
+        return [{**response, "status": 503, "error": "HTTP 503"} if "bob" in response["url"] else response for response in fetch_urls(urls, per_url_headers)]
+
+    monkeypatch.setattr(crawl_tasks, "fetch_urls", failing_for_bob)
+    customers = [{"name": f"Customer{i} Local", "email": f"customer{i}@example.com"} for i in range(8)] + [{"name": "Bob Smith"}]
+
+    outcome = executor.run_many(customers)
+
+    # Crawls overlap instead of running one customer after another
+    assert max(peak) > 1
+    assert [report["customer"] for report in outcome["reports"]] == customers[:8]
+    assert [failure["customer"] for failure in outcome["failed"]] == [customers[8]]
+    with pytest.raises(FetchError):
+        executor.run(customers[8])
@@ -1,4 +1,15 @@
-from shinsa.utils.logger import get_logger
+import os
+import sys
+import json
+import logging
+import subprocess
+import multiprocessing
+from types import SimpleNamespace
+from celery import Celery
+from celery.concurrency.prefork import TaskPool as PreforkPool
+from shinsa.celery_app import app as app_module
+from shinsa.utils import logger as logger_module
+from shinsa.utils.logger import BatchedTimedRotatingFileHandler, JsonFormatter, get_logger, start_log_pipeline, stop_log_pipeline
 
 
 def test_logging():
@@ -19,6 +30,139 @@ def test_logger_instance():
     assert logger1 is not logger3, "Logger instances with different names should not be identical."
 
 
+def read_json_lines(path):
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f]
+
+
+def test_queue_mode_writes_json_lines_with_task_context(tmp_path, monkeypatch):
+    monkeypatch.setitem(logger_module.LOG_CONFIG, "mode", "queue")
+    start_log_pipeline(writer_id="node1", log_dir=str(tmp_path))
+    logger = get_logger("queue_mode_task")
+
+    app = Celery("queue_mode_test", set_as_current=False)
+
+    @app.task(name="log_customer")
+    def log_customer(customer):
+        logger.info(f"processing {customer['name']}")
+
+    try:
+        log_customer.apply(args=[{"name": "Aung Myo Tun", "email": "aung@example.com"}], task_id="task-1")
+        logger.error("outside any task")
+    finally:
+        stop_log_pipeline()
+
+    [all_log] = [name for name in os.listdir(tmp_path) if name.endswith("_node1.log")]
+    entries = read_json_lines(tmp_path / all_log)
+    assert entries[0]["message"] == "processing Aung Myo Tun"
+    assert entries[0]["task_id"] == "task-1"
+    assert entries[0]["task_name"] == "log_customer"
+    assert entries[0]["customer"] == "aung@example.com"
+    assert entries[1]["task_id"] is None
+    [error_log] = [name for name in os.listdir(tmp_path) if name.endswith("_node1_error.log")]
+    assert [entry["message"] for entry in read_json_lines(tmp_path / error_log)] == ["outside any task"]
+
+
+def test_queue_mode_covers_module_loggers(tmp_path, monkeypatch):
+    monkeypatch.setitem(logger_module.LOG_CONFIG, "mode", "queue")
+    start_log_pipeline(writer_id="node1", log_dir=str(tmp_path))
+    try:
+        logging.getLogger("shinsa.celery_app.tasks.crawl_tasks").info("[Crawl] crawling")
+        logging.getLogger("shinsa.celery_app.tasks.report_tasks").debug("[Report] built")
+    finally:
+        stop_log_pipeline()
+
+    [all_log] = [name for name in os.listdir(tmp_path) if name.startswith("shinsa_") and name.endswith("_node1.log")]
+    entries = read_json_lines(tmp_path / all_log)
+    assert [(entry["logger"], entry["message"]) for entry in entries] == [
+        ("shinsa.celery_app.tasks.crawl_tasks", "[Crawl] crawling"),
+        ("shinsa.celery_app.tasks.report_tasks", "[Report] built"),
+    ]
+    # Once the pipeline stops, module records propagate to the root handlers again
+    assert logging.getLogger("shinsa").propagate and not logging.getLogger("shinsa").handlers
+
+
+def _log_from_child(count):
+    child_logger = logging.getLogger("queue_mode_fork")
+    for i in range(count):
+        child_logger.info(f"child {i}")
+    stop_log_pipeline()
+
+
+def test_queue_mode_forked_children_write_through_the_parent(tmp_path, monkeypatch):
+    monkeypatch.setitem(logger_module.LOG_CONFIG, "mode", "queue")
+    start_log_pipeline(log_dir=str(tmp_path), multiprocess=True)
+    get_logger("queue_mode_fork", console=False)
+
+    context = multiprocessing.get_context("fork")
+    children = [context.Process(target=_log_from_child, args=(50,)) for _ in range(3)]
+    for child in children:
+        child.start()
+    for child in children:
+        child.join(10)
+    stop_log_pipeline()
+
+    [all_log] = [name for name in os.listdir(tmp_path) if not name.endswith("_error.log")]
+    entries = read_json_lines(tmp_path / all_log)
+    assert len(entries) == 150
+    assert {entry["pid"] for entry in entries} == {child.pid for child in children}
+
+
+def test_batched_handler_rolls_over_when_due(tmp_path):
+    handler = BatchedTimedRotatingFileHandler(str(tmp_path / "rotating.log"), when="midnight", backupCount=2, encoding="utf-8")
+    handler.setFormatter(JsonFormatter())
+
+    def record(message):
+        return logging.LogRecord("rotating", logging.INFO, __file__, 1, message, None, None)
+
+    handler.emit_batch([record("before midnight"), record("also before")])
+    handler.rolloverAt = 0  # midnight has passed
+    handler.emit_batch([record("after midnight")])
+    handler.close()
+
+    rotated = [name for name in os.listdir(tmp_path) if name != "rotating.log"]
+    assert len(rotated) == 1
+    assert [entry["message"] for entry in read_json_lines(tmp_path / rotated[0])] == ["before midnight", "also before"]
+    assert [entry["message"] for entry in read_json_lines(tmp_path / "rotating.log")] == ["after midnight"]
+
+
+GEVENT_WORKER = """
+from gevent import monkey
+
+monkey.patch_all()
+import gevent
+from types import SimpleNamespace
+from shinsa.utils import logger as logger_module
+
+logger_module.LOG_CONFIG["mode"] = "queue"
+from shinsa.celery_app.app import start_worker_log_pipeline
+
+start_worker_log_pipeline(sender=SimpleNamespace(hostname="gevent-node", pool_cls="gevent"))
+logger_module.get_logger("gevent_worker", console=False).info("from a greenlet")
+gevent.sleep(0.5)
+logger_module.stop_log_pipeline()
+print("hub alive")
+"""
+
+
+def test_queue_mode_under_gevent_keeps_the_hub_running():
+    # Monkey-patching is process-wide, so the gevent worker runs in its own interpreter
+    result = subprocess.run([sys.executable, "-c", GEVENT_WORKER], capture_output=True, text=True, timeout=30, cwd=os.path.dirname(os.path.dirname(__file__)))
+    assert result.returncode == 0, result.stderr
+    assert result.stdout.strip().endswith("hub alive")
+
+
+def test_only_prefork_workers_use_a_cross_process_log_queue(monkeypatch):
+    started = []
+    monkeypatch.setitem(logger_module.LOG_CONFIG, "mode", "queue")
+    monkeypatch.setattr(app_module, "start_log_pipeline", lambda **kwargs: started.append(kwargs["multiprocess"]))
+
+    for pool in ("prefork", "gevent", "threads", PreforkPool):
+        app_module.start_worker_log_pipeline(sender=SimpleNamespace(hostname="node1", pool_cls=pool))
+
+    assert started == [True, False, False, True]
+
+
 if __name__ == "__main__":
     test_logging()
     test_logger_instance()
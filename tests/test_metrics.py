@@ -0,0 +1,71 @@
+import os
+import urllib.request
+from types import SimpleNamespace
+from prometheus_client import CollectorRegistry
+from benchmarks.harness import run_pipeline
+from shinsa.celery_app.config import METRICS_CONFIG
+from shinsa.celery_app.metrics import TaskMetrics, prepare_multiproc_dir, start_metrics_server
+
+
+def sample(registry, name, **labels):
+    return registry.get_sample_value(name, labels) or 0
+
+
+def test_task_metrics_record_pipeline_stages():
+    registry = CollectorRegistry()
+    metrics = TaskMetrics(registry=registry)
+    metrics.connect()
+    try:
+        run_pipeline(customers=2, mode="batched", latency_scale=0.0001, timeout=60)
+    finally:
+        metrics.disconnect()
+
+    # Links for both customers are discovered by one batch task
+    labels = {"task": "find_customer_links_batch", "queue": "coordination"}
+    assert sample(registry, "shinsa_task_published_total", **labels) == 1
+    assert sample(registry, "shinsa_task_queue_wait_seconds_count", **labels) == 1
+    assert sample(registry, "shinsa_task_payload_bytes_count", **labels) == 1
+    assert sample(registry, "shinsa_task_payload_bytes_sum", **labels) > 0
+    assert sample(registry, "shinsa_task_runtime_seconds_count", state="SUCCESS", **labels) == 1
+    assert sample(registry, "shinsa_task_runtime_seconds_count", task="crawl_links_batch", queue="io_intensive", state="SUCCESS") == 1
+    assert sample(registry, "shinsa_task_retries_count", **labels) == 1
+
+
+def test_task_metrics_count_retries_and_failures_for_routed_tasks_only():
+    registry = CollectorRegistry()
+    metrics = TaskMetrics(registry=registry)
+    crawl = SimpleNamespace(name="crawl_link")
+
+    metrics.on_retry(sender=crawl)
+    metrics.on_failure(sender=crawl, exception=TimeoutError())
+    metrics.on_retry(sender=SimpleNamespace(name="unrouted_task"))
+
+    assert sample(registry, "shinsa_task_retry_total", task="crawl_link", queue="io_intensive") == 1
+    assert sample(registry, "shinsa_task_failure_total", task="crawl_link", queue="io_intensive", exception="TimeoutError") == 1
+    assert sample(registry, "shinsa_task_retry_total", task="unrouted_task", queue="io_intensive") == 0
+
+
+def test_metrics_server_exposes_prometheus_text():
+    server = start_metrics_server(0)
+    try:
+        body = urllib.request.urlopen(f"http://127.0.0.1:{server.server_port}/metrics", timeout=5).read().decode()
+    finally:
+        server.shutdown()
+    assert "# TYPE" in body
+
+
+def test_multiproc_dir_is_only_emptied_when_created_here(tmp_path, monkeypatch):
+    configured = tmp_path / "operator-metrics"
+    configured.mkdir()
+    (configured / "keep.txt").write_text("operator data")
+    monkeypatch.setenv("PROMETHEUS_MULTIPROC_DIR", str(configured))
+    assert prepare_multiproc_dir() == str(configured)
+    assert (configured / "keep.txt").exists()
+
+    monkeypatch.setitem(METRICS_CONFIG, "multiproc_root", str(tmp_path / "root"))
+    monkeypatch.delenv("PROMETHEUS_MULTIPROC_DIR")
+    owned = prepare_multiproc_dir()
+    assert owned.startswith(str(tmp_path / "root")) and os.listdir(owned) == []
+    with open(os.path.join(owned, "stale.db"), "w") as f:
+        f.write("left by the last run")
+    assert prepare_multiproc_dir() == owned and os.listdir(owned) == []
@@ -0,0 +1,39 @@
+from types import SimpleNamespace
+import pytest
+from benchmarks import harness
+from benchmarks.harness import StageRecorder, run_pipeline
+
+
+@pytest.mark.parametrize("mode", ["per-customer", "batched"])
+def test_pipeline_harness_runs_full_graph(mode):
+    result = run_pipeline(customers=3, mode=mode, latency_scale=0.0001, timeout=60)
+
+    assert result["customers"] == 3
+    assert result["customers_per_sec"] > 0
+    assert result["reports"] == 3
+    if mode == "batched":
+        # Links for all three customers are discovered by one task
+        assert result["stages"]["find_customer_links_batch"]["count"] == 1
+        assert result["stages"]["generate_customer_reports_batch"]["count"] >= 1
+    else:
+        assert result["stages"]["find_customer_links"]["count"] == 3
+        assert result["stages"]["crawl_link"]["count"] == 12
+        assert result["stages"]["batch_generate_report"]["count"] == 1
+
+
+def test_stage_latency_pairs_each_tasks_own_wait_and_run(monkeypatch):
+    clock = iter([0.0, 0.0, 1.0, 9.0, 10.0, 19.0])
+    monkeypatch.setattr(harness.time, "perf_counter", lambda: next(clock))
+    recorder = StageRecorder(expected_reports=1)
+    crawl = SimpleNamespace(name="crawl_link")
+
+    # a waits 9s and runs 1s; b waits 1s and runs 18s, so their signals interleave
+    recorder.on_publish(sender="crawl_link", headers={"id": "a"})
+    recorder.on_publish(sender="crawl_link", headers={"id": "b"})
+    recorder.on_prerun(task_id="b", task=crawl)
+    recorder.on_prerun(task_id="a", task=crawl)
+    recorder.on_postrun(task_id="a", task=crawl, state="SUCCESS")
+    recorder.on_postrun(task_id="b", task=crawl, state="SUCCESS")
+
+    assert sorted(recorder.latency["crawl_link"]) == [10.0, 19.0]
+    assert recorder.stage_stats()["crawl_link"]["p99"] == 19.0
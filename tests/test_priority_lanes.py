@@ -0,0 +1,68 @@
+import fakeredis
+import kombu.transport.redis
+from shinsa.celery_app.app import celery_app
+from shinsa.celery_app.autoscaler import build_depth_source
+from shinsa.celery_app.config import REPORT_AGGREGATION_CONFIG, TASK_PRIORITIES
+from shinsa.celery_app.tasks import customer_tasks
+from shinsa.celery_app.tasks.customer_tasks import customer_workflow, customers_batch_workflow, find_customer_links, process_customer_workflow
+
+
+def test_redis_broker_serves_interactive_requests_before_a_backlog(monkeypatch):
+    # The real Redis transport with the app's transport options, on an in-process server
+    monkeypatch.setattr(kombu.transport.redis.Channel, "connection_class", getattr(fakeredis, "FakeRedisConnection", fakeredis.FakeConnection))
+    customers = [{"name": f"Backfill {i}", "email": f"backfill{i}@example.com"} for i in range(5)]
+
+    with celery_app.connection_for_write() as connection:
+        channel = connection.default_channel
+        channel.client.flushall()
+        for header in customers_batch_workflow(customers).tasks:
+            header.apply_async(connection=connection, ignore_result=True)
+        find_customer_links.apply_async(args=[{"name": "Unprioritized"}], connection=connection, ignore_result=True)
+        customer_workflow({"name": "Interactive"}).apply_async(connection=connection, ignore_result=True)
+
+        served = []
+        while (message := channel.basic_get("coordination", no_ack=True)) is not None:
+            served.append(message.payload[0][0])
+
+    # The backlog's links are discovered by one batch task, after the single-customer requests
+    assert served == [{"name": "Interactive"}, {"name": "Unprioritized"}, customers]
+
+
+def test_queue_depth_counts_every_priority_lane(monkeypatch):
+    monkeypatch.setattr(kombu.transport.redis.Channel, "connection_class", getattr(fakeredis, "FakeRedisConnection", fakeredis.FakeConnection))
+
+    with celery_app.connection_for_write() as connection:
+        client = connection.default_channel.client
+        client.flushall()
+        for priority in TASK_PRIORITIES.values():
+            find_customer_links.apply_async(args=[{"name": "Queued"}], connection=connection, ignore_result=True, priority=priority)
+        # Messages at the default priority land in a lane list, not the queue's own list
+        assert client.llen("coordination") < len(TASK_PRIORITIES)
+
+        source = build_depth_source()
+        source.client = client
+        assert source.depths(["coordination", "io_intensive"]) == {"coordination": len(TASK_PRIORITIES), "io_intensive": 0}
+
+
+def test_workflow_children_inherit_the_request_priority(monkeypatch):
+    monkeypatch.setitem(REPORT_AGGREGATION_CONFIG, "enabled", False)
+    started = []
+
+    class RecordingChord:
+        def __init__(self, header, body):
+            self.header, self.body, self.id = header, body, "report-id"
+
+        def apply_async(self, **options):
+            started.append((self.header, self.body, options))
+            return self
+
+    monkeypatch.setattr(customer_tasks, "chord", RecordingChord)
+    links_result = {"customer": {"name": "Aung"}, "links": ["https://example.com/aung", "https://twitter.com/aung"]}
+
+    process_customer_workflow.apply(args=[links_result], priority=TASK_PRIORITIES["interactive"]).get()
+    process_customer_workflow.apply(args=[links_result]).get()
+
+    for (header, body, options), expected in zip(started, [TASK_PRIORITIES["interactive"], TASK_PRIORITIES["default"]]):
+        signatures = [task for link_chain in header.tasks for task in link_chain.tasks] + [body]
+        assert [sig.options["priority"] for sig in signatures] == [expected] * 5
+        assert options["priority"] == expected
@@ -0,0 +1,119 @@
+import fakeredis
+import pytest
+from shinsa.celery_app.config import CRAWL_RATE_LIMIT_CONFIG
+from shinsa.celery_app.tasks import crawl_tasks
+from shinsa.utils.rate_limit import DomainRateLimiter, RateLimited, domain_of, interleave_by_domain, retry_after
+
+
+class FakeClock:
+    def __init__(self, now=1_000_000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+    def advance(self, seconds):
+        self.now += seconds
+
+
+def make_limiter(clock, **options):
+    return DomainRateLimiter(fakeredis.FakeRedis(), clock=clock, **options)
+
+
+def test_burst_then_one_request_per_interval():
+    clock = FakeClock()
+    limiter = make_limiter(clock, rate=2, burst=3)
+
+    assert [limiter.acquire("https://example.com/a", max_wait=10) for _ in range(3)] == [0, 0, 0]
+    assert limiter.acquire("https://example.com/b", max_wait=10) == pytest.approx(0.5)
+    assert limiter.acquire("https://example.com/c", max_wait=10) == pytest.approx(1.0)
+    # Tokens come back at the rate while idle, up to the burst
+    clock.advance(60)
+    assert [limiter.acquire("https://www.example.com/d", max_wait=10) for _ in range(3)] == [0, 0, 0]
+
+
+def test_long_waits_raise_without_reserving():
+    clock = FakeClock()
+    limiter = make_limiter(clock, rate=1, burst=1)
+    limiter.acquire("https://example.com/", max_wait=0)
+
+    with pytest.raises(RateLimited) as excinfo:
+        limiter.acquire("https://example.com/", max_wait=0.5)
+    assert excinfo.value.domain == "example.com"
+    assert excinfo.value.retry_after == pytest.approx(1.0)
+    # The refused request did not push the next slot back
+    clock.advance(1)
+    assert limiter.acquire("https://example.com/", max_wait=0) == 0
+    # Other domains have their own bucket
+    assert limiter.acquire("https://other.org/", max_wait=0) == 0
+
+
+def test_schedule_spaces_each_domain_by_its_own_rate():
+    limiter = make_limiter(FakeClock(), rate=4, burst=1, domains={"linkedin.com": {"rate": 1}})
+    urls = ["https://linkedin.com/in/a", "https://example.com/a", "https://uk.linkedin.com/in/b", "https://example.com/b", "https://linkedin.com/in/c"]
+
+    assert limiter.schedule(urls) == pytest.approx([0, 0, 1, 0.25, 2])
+    assert limiter.policy("uk.linkedin.com") == ("linkedin.com", 1, 1)
+    assert limiter.policy("notlinkedin.com") == ("notlinkedin.com", 4, 1)
+
+
+def test_penalize_holds_the_domain_for_retry_after():
+    clock = FakeClock()
+    limiter = make_limiter(clock, rate=2, burst=2)
+    limiter.penalize("https://example.com/", 30)
+
+    with pytest.raises(RateLimited):
+        limiter.acquire("https://example.com/", max_wait=5)
+    clock.advance(30)
+    assert limiter.acquire("https://example.com/", max_wait=0) == 0
+    assert retry_after({"headers": {"Retry-After": "12"}}) == 12
+    assert retry_after({"headers": {"Retry-After": "Wed, 21 Oct 2015 07:28:00 GMT"}}) == 60
+
+
+def test_interleave_round_robins_domains():
+    urls = ["https://a.com/1", "https://a.com/2", "https://a.com/3", "https://b.com/1", "https://www.c.com/1", "https://b.com/2"]
+
+    assert interleave_by_domain(urls) == ["https://a.com/1", "https://b.com/1", "https://www.c.com/1", "https://a.com/2", "https://b.com/2", "https://a.com/3"]
+    assert domain_of("https://WWW.Example.com:8080/x") == "example.com"
+
+
+def test_crawl_url_defers_when_the_domain_is_busy(monkeypatch):
+    clock = FakeClock()
+    limiter = make_limiter(clock, rate=0.5, burst=1)
+    monkeypatch.setattr(crawl_tasks, "get_rate_limiter", lambda: limiter)
+    monkeypatch.setattr(crawl_tasks, "get_crawl_cache", lambda: None)
+    monkeypatch.setattr(crawl_tasks, "get_deduplicator", lambda namespace: None)
+    monkeypatch.setitem(CRAWL_RATE_LIMIT_CONFIG, "max_wait", 1)
+    monkeypatch.setattr(crawl_tasks, "simulate_latency", lambda stage: None)
+
+    assert crawl_tasks.crawl_url("https://linkedin.com/in/a")["status"] == 200
+    with pytest.raises(RateLimited):
+        crawl_tasks.crawl_url("https://linkedin.com/in/b")
+    # A task coming back for a slot it already booked goes straight through
+    slot = clock() + limiter.schedule(["https://linkedin.com/in/b"])[0]
+    clock.advance(2)
+    assert crawl_tasks.crawl_url("https://linkedin.com/in/b", rate_slot=slot)["status"] == 200
+
+
+def test_missed_slots_are_given_up():
+    clock = FakeClock()
+    limiter = make_limiter(clock, rate=1, burst=1)
+    slot = clock() + limiter.schedule(["https://example.com/a"])[0]
+
+    assert limiter.claim("https://example.com/a", slot + 0.5, max_wait=0) == pytest.approx(0.5)
+    clock.advance(3)
+    # Three seconds late: a fresh slot is acquired instead of squeezing in
+    assert limiter.claim("https://example.com/a", slot, max_wait=0) == 0
+    with pytest.raises(RateLimited):
+        limiter.claim("https://example.com/b", slot, max_wait=0)
+
+
+def test_politeness_beats_blind_retries():
+    from benchmarks.politeness_bench import simulate
+
+    urls = interleave_by_domain([f"https://{domain}/{i}" for domain in ("linkedin.com", "twitter.com", "example.com") for i in range(40)])
+    naive = simulate(urls, polite=False)
+    polite = simulate(urls, polite=True)
+
+    assert polite["throttled"] == 0 < naive["throttled"]
+    assert polite["throughput"] > naive["throughput"]
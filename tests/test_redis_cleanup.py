@@ -0,0 +1,68 @@
+import itertools
+import fakeredis
+from shinsa.celery_app.config import BEAT_SCHEDULE, CELERY_TASK_QUEUES, REDIS_CLEANUP_CONFIG
+from shinsa.utils.redis_cleanup import CURSOR_KEY, LOCK_KEY, RedisCleaner
+
+
+def make_cleaner(client, **options):
+    return RedisCleaner(client, REDIS_CLEANUP_CONFIG["patterns"], **{"scan_count": 50, "batch_size": 20, "pause": 0, **options})
+
+
+def test_sweep_unlinks_only_leaked_keys_and_reports_bytes():
+    client = fakeredis.FakeStrictRedis()
+    for i in range(100):
+        client.set(f"celery-task-meta-leaked{i}", "x" * 100)
+        client.set(f"celery-task-meta-live{i}", "x" * 100, ex=3600)
+    client.rpush("celery-taskset-meta-group.j", "part")
+    client.zadd("crawl-cache:lru", {"url": 1})
+    client.incr("dedup:crawl:stats:executed")
+    client.set("customer:1", "unmanaged")
+
+    stats = make_cleaner(client).run()
+
+    assert stats["complete"] and stats["unlinked"] == 101
+    assert stats["bytes"] > 100 * 100
+    assert stats["sweep"]["unlinked"] == 101
+    assert not client.exists("celery-task-meta-leaked0", "celery-taskset-meta-group.j")
+    assert client.exists("celery-task-meta-live0", "crawl-cache:lru", "dedup:crawl:stats:executed", "customer:1") == 4
+
+
+def test_runs_stop_at_their_budget_and_resume_from_the_checkpoint():
+    client = fakeredis.FakeStrictRedis()
+    for i in range(500):
+        client.set(f"claim-check:blob:leaked:{i}", "payload")
+
+    runs = []
+    while not runs or not runs[-1]["complete"]:
+        runs.append(make_cleaner(client, max_ops=6).run())
+        # A run finishes the page it is on: one SCAN, three batches of 20 keys, the checkpoint
+        assert runs[-1]["ops"] < 6 + 5
+
+    assert len(runs) > 2
+    assert [run["resumed_from"] for run in runs[1:]] == [run["cursor"] for run in runs[:-1]]
+    assert sum(run["unlinked"] for run in runs) == runs[-1]["sweep"]["unlinked"] == 500
+    assert client.dbsize() == 0
+
+
+def test_time_budget_ends_a_run():
+    client = fakeredis.FakeStrictRedis()
+    for i in range(500):
+        client.set(f"report-agg:{i}:meta", "{}")
+    ticks = itertools.count()
+
+    stats = make_cleaner(client, time_budget=3, clock=lambda: next(ticks)).run()
+
+    assert not stats["complete"]
+    assert int(client.get(CURSOR_KEY)) == stats["cursor"]
+
+
+def test_overlapping_runs_skip():
+    client = fakeredis.FakeStrictRedis()
+    client.set(LOCK_KEY, "another-run")
+    assert make_cleaner(client).run() is None
+
+
+def test_beat_entries_route_to_declared_queues():
+    declared = {queue.name for queue in CELERY_TASK_QUEUES}
+    for entry in BEAT_SCHEDULE.values():
+        assert entry["options"]["queue"] in declared
@@ -0,0 +1,126 @@
+import time
+import contextlib
+import fakeredis
+import redis.exceptions
+import pytest
+from shinsa.utils.report_aggregator import ReportAggregator
+from shinsa.celery_app.config import DEDUP_CONFIG, CHANGE_DETECTION_CONFIG, REPORT_STORE_CONFIG
+from shinsa.celery_app.tasks import report_tasks
+from shinsa.celery_app.tasks.analysis_tasks import analyze_content, analyze_content_batch
+from shinsa.celery_app.tasks.report_tasks import customer_key, generate_customer_report, generate_customer_reports_batch
+
+customer = {"name": "Aung Myo Tun", "email": "aungmyotun@gmail.com"}
+pages = {
+    "https://example.com/aung_myo_tun": "python python python python data data data great great skilled",
+    "https://twitter.com/aung": "python python python data data tokyo bad",
+    "https://linkedin.com/in/aung-myo-tun": "python developer developer developer developer developer professional",
+}
+
+
+def crawled(customer, link):
+    return {"customer": customer, "link": link, "content": pages[link], "content_length": len(pages[link]), "crawl_task_id": "crawl"}
+
+
+@pytest.fixture
+def aggregator(monkeypatch):
+    monkeypatch.setattr(time, "sleep", lambda seconds: None)
+    monkeypatch.setitem(DEDUP_CONFIG, "enabled", False)
+    monkeypatch.setitem(CHANGE_DETECTION_CONFIG, "enabled", False)
+    monkeypatch.setitem(REPORT_STORE_CONFIG, "enabled", False)
+    aggregator = ReportAggregator(fakeredis.FakeRedis())
+    monkeypatch.setattr(report_tasks, "get_report_aggregator", lambda: aggregator)
+    return aggregator
+
+
+def test_aggregated_report_matches_collected_report(aggregator):
+    aggregator.expect("workflow-1", customer, list(pages))
+
+    markers = [analyze_content.apply(args=[crawled(customer, link)], kwargs={"aggregation_id": "workflow-1"}).get() for link in reversed(list(pages))]
+    assert all("analysis" not in marker and marker["aggregation_id"] == "workflow-1" for marker in markers)
+
+    aggregated = generate_customer_report.apply(args=[markers]).get()
+    collected = generate_customer_report.apply(args=[[analyze_content.apply(args=[crawled(customer, link)]).get() for link in pages]]).get()
+
+    # Equal counts may come back in a different order (aggregates break ties by word)
+    by_count = lambda keywords: sorted(keywords, key=lambda kw: (-kw["total_count"], kw["word"]))
+    assert by_count(aggregated["summary"].pop("top_keywords")) == by_count(collected["summary"].pop("top_keywords"))
+    assert aggregated["summary"] == collected["summary"]
+    assert aggregated["link_details"] == collected["link_details"]
+    assert aggregated["recommendations"] == collected["recommendations"]
+    # The aggregate is removed once the report has been built
+    assert aggregator.client.keys("report-agg:*") == []
+
+
+def test_add_is_idempotent_per_link(aggregator):
+    aggregator.expect("workflow-2", customer, list(pages))
+    result = analyze_content.apply(args=[crawled(customer, "https://twitter.com/aung")]).get()
+
+    assert aggregator.add("workflow-2", result) is True
+    assert aggregator.add("workflow-2", result) is False
+    aggregate = aggregator.read("workflow-2")
+    assert aggregate["links_processed"] == 1
+    assert aggregate["top_keywords"][0] == {"word": "python", "total_count": 3}
+
+
+def test_tied_keywords_are_ordered_alphabetically(aggregator):
+    aggregator.expect("workflow-3", customer, ["https://example.com/tied"])
+    keywords = [{"word": word, "count": 2} for word in ("delta", "alpha", "echo", "charlie", "bravo")]
+    aggregator.add("workflow-3", {"link": "https://example.com/tied", "analysis": {"keywords": keywords + [{"word": "zulu", "count": 5}]}})
+
+    top = aggregator.read("workflow-3", top_k=3)["top_keywords"]
+
+    # The cut falls inside the tie, which must not keep the words that come last alphabetically
+    assert top == [{"word": "zulu", "total_count": 5}, {"word": "alpha", "total_count": 2}, {"word": "bravo", "total_count": 2}]
+    assert [kw["word"] for kw in aggregator.read("workflow-3")["top_keywords"]] == ["zulu", "alpha", "bravo", "charlie", "delta", "echo"]
+
+
+def test_batched_reports_use_per_customer_aggregates(aggregator):
+    other = {"name": "清水 勝美", "email": "shimizu@example.com"}
+    links_results = [{"customer": customer, "links": list(pages)}, {"customer": other, "links": ["https://twitter.com/aung"]}]
+    for links_result in links_results:
+        aggregator.expect(f"batch-1:{customer_key(links_result['customer'])}", links_result["customer"], links_result["links"])
+
+    batch = [crawled(r["customer"], link) for r in links_results for link in r["links"]]
+    markers = analyze_content_batch.apply(args=[batch], kwargs={"aggregation_prefix": "batch-1"}).get()
+    reports = generate_customer_reports_batch.apply(args=[[markers[:2], markers[2:]]]).get()
+
+    assert [report["customer"] for report in reports] == [customer, other]
+    assert [report["summary"]["total_links_analyzed"] for report in reports] == [3, 1]
+
+
+def test_an_add_that_fails_leaves_the_link_to_its_retry(aggregator, monkeypatch):
+    aggregator.expect("workflow-4", customer, ["https://twitter.com/aung"])
+    result = analyze_content.apply(args=[crawled(customer, "https://twitter.com/aung")]).get()
+
+    def lost_connection(*args, **kwargs):
+        raise redis.exceptions.ConnectionError("connection lost")
+
+    # Redis is lost partway through folding the link in; the task's retry adds it again
+    with monkeypatch.context() as patch:
+        patch.setattr(aggregator.client, "pipeline", lost_connection)
+        with contextlib.suppress(redis.exceptions.ConnectionError):
+            aggregator.add("workflow-4", result)
+    aggregator.add("workflow-4", result)
+
+    aggregate = aggregator.read("workflow-4")
+    assert aggregate["links_processed"] == 1
+    assert aggregate["top_keywords"][0] == {"word": "python", "total_count": 3}
+
+
+def test_aggregate_outlives_a_report_task_that_fails_late(aggregator, monkeypatch):
+    aggregator.expect("workflow-5", customer, list(pages))
+    markers = [analyze_content.apply(args=[crawled(customer, link)], kwargs={"aggregation_id": "workflow-5"}).get() for link in pages]
+    failures = []
+
+    def release_claim_checks(analysis_results):
+        if not failures:
+            failures.append(1)
+            raise RuntimeError("claim-check store unavailable")
+
+    monkeypatch.setattr(report_tasks, "release_claim_checks", release_claim_checks)
+
+    # The first attempt fails after building the report; its retry still finds the aggregate
+    report = generate_customer_report.apply(args=[markers]).get()
+
+    assert failures and report["summary"]["total_links_analyzed"] == 3
+    assert aggregator.client.keys("report-agg:*") == []
@@ -0,0 +1,87 @@
+import time
+from datetime import datetime
+from shinsa.celery_app.config import DEDUP_CONFIG, CHANGE_DETECTION_CONFIG, REPORT_AGGREGATION_CONFIG
+from shinsa.celery_app.tasks import report_tasks
+from shinsa.celery_app.tasks.analysis_tasks import analyze_content_batch
+from shinsa.celery_app.tasks.report_tasks import assemble_customer_report, batch_generate_report, generate_customer_reports_batch
+from shinsa.utils.report_store import ReportStore
+
+aung = {"name": "Aung Myo Tun", "email": "aungmyotun@gmail.com"}
+shimizu = {"name": "清水 勝美", "email": "shimizu@example.com"}
+
+
+def make_report(customer, task_id, generated_at, sentiment, keywords=("python",)):
+    report = assemble_customer_report(customer, 3, sentiment, [{"word": word, "total_count": 5 - i} for i, word in enumerate(keywords)], [], task_id)
+    report["report_metadata"]["generated_at"] = generated_at
+    return report
+
+
+def test_reports_are_found_by_customer_task_and_keyword(tmp_path):
+    store = ReportStore(str(tmp_path / "reports.sqlite3"))
+    # One batched report task produces reports for many customers
+    assert store.add_reports([make_report(aung, "batch-task", "2026-10-01T09:00:00", 0.4), make_report(shimizu, "batch-task", "2026-10-01T09:00:00", -0.3, ("tokyo", "python"))]) == 2
+    store.add_reports([make_report(aung, "task-2", "2026-10-08T09:00:00", 0.1, ("data",))])
+    # Storing a report again replaces it
+    store.add_reports([make_report(aung, "task-2", "2026-10-08T09:00:00", 0.1, ("data",))])
+
+    assert store.latest(email=aung["email"])["report_metadata"]["report_task_id"] == "task-2"
+    assert store.latest(name=shimizu["name"]) is None
+    assert [row["report_task_id"] for row in store.history(email=aung["email"])] == ["task-2", "batch-task"]
+    assert [row["report_task_id"] for row in store.history(email=aung["email"], since=datetime(2026, 10, 5))] == ["task-2"]
+    assert [report["customer"] for report in store.get("batch-task")] == [aung, shimizu]
+
+    assert [(row["customer_key"], row["keyword_count"]) for row in store.by_keyword("Python")] == [(f"email:{aung['email']}", 5), (f"email:{shimizu['email']}", 4)]
+    assert store.by_keyword("data", until="2026-10-05") == []
+    assert [row["customer_key"] for row in store.by_sentiment("negative")] == [f"email:{shimizu['email']}"]
+
+
+def test_sentiment_drops_compare_against_the_last_report_before_the_window(tmp_path):
+    store = ReportStore(str(tmp_path / "reports.sqlite3"))
+    store.add_reports(
+        [
+            make_report(aung, "a1", "2026-10-01T09:00:00", 0.5),
+            make_report(aung, "a2", "2026-10-06T09:00:00", 0.45),
+            make_report(aung, "a3", "2026-10-08T09:00:00", 0.2),
+            make_report(shimizu, "s1", "2026-10-01T09:00:00", 0.1),
+            make_report(shimizu, "s2", "2026-10-07T09:00:00", 0.05),
+            # No report before the window, so nothing to compare against
+            make_report({"name": "New Customer"}, "n1", "2026-10-07T09:00:00", -0.9),
+        ]
+    )
+
+    drops = store.sentiment_drops(since=datetime(2026, 10, 5), until=datetime(2026, 10, 12))
+
+    assert [(row["customer_key"], row["report_task_id"], row["sentiment_drop"]) for row in drops] == [(f"email:{aung['email']}", "a3", 0.3)]
+    assert [row["customer_key"] for row in store.sentiment_drops(since="2026-10-05", min_drop=0.05)] == [f"email:{aung['email']}", f"email:{shimizu['email']}"]
+
+
+def test_report_tasks_store_their_reports(tmp_path, monkeypatch):
+    monkeypatch.setattr(time, "sleep", lambda seconds: None)
+    monkeypatch.setitem(DEDUP_CONFIG, "enabled", False)
+    monkeypatch.setitem(CHANGE_DETECTION_CONFIG, "enabled", False)
+    monkeypatch.setitem(REPORT_AGGREGATION_CONFIG, "enabled", False)
+    store = ReportStore(str(tmp_path / "reports.sqlite3"))
+    monkeypatch.setattr(report_tasks, "get_report_store", lambda: store)
+
+    batch = [{"customer": customer, "link": f"https://example.com/{i}", "content": "python data great", "crawl_task_id": "crawl"} for i, customer in enumerate([aung, shimizu])]
+    reports = generate_customer_reports_batch.apply(args=[[analyze_content_batch.apply(args=[batch]).get()]], task_id="reports-task").get()
+    batch_report = batch_generate_report.apply(args=[[{"customer": aung, "links_count": 1}, {"customer": shimizu, "links_count": 1}]], task_id="batch-task").get()
+
+    assert store.get("reports-task") == reports
+    assert store.latest(email=shimizu["email"])["summary"]["top_keywords"][0]["word"] == "python"
+    assert [row["batch_task_id"] for row in store.batches()] == ["batch-task"] and batch_report["status"] == "completed"
+
+    # A store that cannot be written does not fail the report task
+    store.close()
+    assert generate_customer_reports_batch.apply(args=[[analyze_content_batch.apply(args=[batch]).get()]]).get()[0]["customer"] == aung
+
+
+def test_customers_keyed_by_name_and_by_email_stay_apart(tmp_path):
+    store = ReportStore(str(tmp_path / "reports.sqlite3"))
+    by_name = {"name": "ops@example.com"}
+    by_email = {"name": "Ops Team", "email": "ops@example.com"}
+    store.add_reports([make_report(by_name, "task-1", "2026-10-01T09:00:00", 0.4), make_report(by_email, "task-1", "2026-10-01T09:00:00", -0.3)])
+
+    assert [report["customer"] for report in store.get("task-1")] == [by_name, by_email]
+    assert store.latest(name=by_name["name"])["customer"] == by_name
+    assert store.latest(email=by_email["email"])["customer"] == by_email
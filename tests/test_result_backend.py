@@ -0,0 +1,90 @@
+import fakeredis
+import pytest
+from types import SimpleNamespace
+from celery.exceptions import BackendStoreError
+from shinsa.celery_app import backend
+from shinsa.celery_app.app import celery_app
+from shinsa.celery_app.backend import ResultWriteBuffer
+from shinsa.celery_app.config import RESULT_BACKEND_CONFIG
+from shinsa.celery_app.tasks.customer_tasks import customer_workflow
+from benchmarks.harness import FakeRedisBackend, _fake_server, run_pipeline
+
+
+def test_write_buffer_sends_latest_states_in_one_pipeline():
+    client = fakeredis.FakeStrictRedis()
+    pubsub = client.pubsub()
+    pubsub.subscribe("celery-task-meta-a")
+    buffer = ResultWriteBuffer(client, expires=3600, max_batch=3, max_delay=60)
+
+    buffer.add("celery-task-meta-a", b"STARTED")
+    buffer.add("celery-task-meta-a", b"SUCCESS")
+    buffer.add("celery-task-meta-b", b"SUCCESS")
+    assert client.get("celery-task-meta-a") is None
+    assert buffer.flush() == 2
+
+    assert client.get("celery-task-meta-a") == b"SUCCESS"
+    assert 0 < client.ttl("celery-task-meta-b") <= 3600
+    messages = [pubsub.get_message(timeout=1) for _ in range(2)]
+    assert [message["data"] for message in messages if message["type"] == "message"] == [b"SUCCESS"]
+
+    # A full buffer is written without waiting for max_delay
+    for i in range(3):
+        buffer.add(f"celery-task-meta-{i}", b"SUCCESS")
+    assert client.exists("celery-task-meta-0", "celery-task-meta-1", "celery-task-meta-2") == 3
+
+
+def test_failed_writes_are_kept_for_the_next_flush():
+    server = fakeredis.FakeServer()
+    client = fakeredis.FakeStrictRedis(server=server)
+    buffer = ResultWriteBuffer(client, max_delay=60)
+    buffer.add("celery-task-meta-a", b"STARTED")
+
+    server.connected = False
+    assert buffer.flush() == 0
+    buffer.add("celery-task-meta-a", b"SUCCESS")
+    server.connected = True
+
+    assert buffer.flush() == 1
+    assert client.get("celery-task-meta-a") == b"SUCCESS"
+
+
+def test_only_reports_and_standalone_tasks_store_results():
+    celery_app.loader.import_default_modules()
+    for name in ("find_customer_links_batch", "process_customer_workflow", "crawl_link", "crawl_links_batch", "analyze_content", "analyze_content_batch"):
+        assert celery_app.tasks[name].ignore_result and celery_app.tasks[name].store_errors_even_if_ignored
+    for name in ("find_customer_links", "generate_customer_report", "batch_generate_report", "generate_customer_reports_batch", "fetch_page_content", "extract_keywords"):
+        assert not celery_app.tasks[name].ignore_result
+    # Workflows drop the links result per call instead
+    assert customer_workflow({"name": "Aung"}).tasks[0].options["ignore_result"]
+
+
+def test_lean_results_cut_redis_round_trips_and_memory():
+    store_all = run_pipeline(customers=3, latency_scale=0.0001, timeout=60, lean_results=False)["redis"]
+    lean = run_pipeline(customers=3, latency_scale=0.0001, timeout=60)["redis"]
+
+    # Three customer reports and the batch summary
+    assert lean["result_keys"] == 4 < store_all["result_keys"]
+    assert lean["round_trips"] < store_all["round_trips"]
+    assert lean["bytes"] < store_all["bytes"]
+
+
+def test_backend_buffers_only_task_results(monkeypatch):
+    monkeypatch.setitem(RESULT_BACKEND_CONFIG, "batch_writes", True)
+    monkeypatch.setattr(backend, "_write_buffer", None)
+    results = FakeRedisBackend(app=celery_app)
+    client = fakeredis.FakeStrictRedis(server=_fake_server)
+    client.flushall()
+    retried = []
+    monkeypatch.setattr(results, "ensure", lambda fun, args, **policy: retried.append(fun) or fun(*args))
+
+    results.store_result("buffered", {"ok": True}, "SUCCESS")
+    results.save_group("group-1", SimpleNamespace(as_tuple=lambda: (("group-1", None), [(("buffered", None), None)])))
+    # Group metadata is read by other workers straight away; the task result waits for the flush
+    assert client.exists(results.get_key_for_group("group-1")) and not client.exists(results.get_key_for_task("buffered"))
+    assert backend.flush_result_writes() == 1 and client.exists(results.get_key_for_task("buffered"))
+    assert retried
+
+    monkeypatch.setattr(results, "_MAX_STR_VALUE_SIZE", 10)
+    with pytest.raises(BackendStoreError):
+        results.store_result("too-large", "x" * 100, "SUCCESS")
+    assert backend.flush_result_writes() == 0
@@ -0,0 +1,144 @@
+import fakeredis
+import pytest
+import redis.exceptions
+from shinsa.celery_app.config import CRAWL_CACHE_CONFIG, DEDUP_CONFIG, CHANGE_DETECTION_CONFIG
+from shinsa.celery_app.tasks import analysis_tasks, crawl_tasks
+from shinsa.utils.retry_policy import CircuitBreaker, CircuitOpen, FetchError, RetryPolicy, is_host_failure, is_retryable
+
+
+def test_exceptions_are_classified():
+    assert not is_retryable(KeyError("content"))
+    assert not is_retryable(TypeError("bad argument"))
+    assert not is_retryable(FetchError("https://example.com/gone", 404, "HTTP 404"))
+    assert is_retryable(FetchError("https://example.com/", 503, "HTTP 503"))
+    assert is_retryable(FetchError("https://example.com/", None, "ClientConnectorError()"))
+    assert is_retryable(ConnectionResetError())
+    # A missing claim-check blob or an unreadable file stays missing; other OSErrors are transient
+    assert not is_retryable(FileNotFoundError("/shared/claim-check/ab/abcd"))
+    assert not is_retryable(PermissionError("/shared/claim-check"))
+    assert is_retryable(OSError("No space left on device"))
+    assert is_retryable(redis.exceptions.ConnectionError())
+    assert is_retryable(CircuitOpen("example.com", 30))
+    assert is_retryable(RuntimeError("unknown"))
+
+
+def test_backoff_grows_exponentially_with_full_jitter():
+    policy = RetryPolicy(base=10, cap=100, max_retries=5, rng=lambda: 1.0)
+    assert [policy.countdown(n) for n in range(5)] == [10, 20, 40, 80, 100]
+    assert RetryPolicy(base=10, cap=100, rng=lambda: 0.25).countdown(2) == 10
+    # Errors that say how long to wait get that plus jitter
+    assert policy.countdown(0, CircuitOpen("example.com", 45)) == 55
+
+    policy = RetryPolicy(base=10, cap=100, max_retries=2)
+    countdowns = {round(policy.countdown(3), 3) for _ in range(50)}
+    assert len(countdowns) > 40 and all(0 <= c <= 80 for c in countdowns)
+    assert policy.should_retry(ConnectionError(), 1) and not policy.should_retry(ConnectionError(), 2)
+
+
+@pytest.fixture
+def eager_analysis(monkeypatch):
+    monkeypatch.setitem(DEDUP_CONFIG, "enabled", False)
+    monkeypatch.setitem(CHANGE_DETECTION_CONFIG, "enabled", False)
+    monkeypatch.setattr(analysis_tasks, "simulate_latency", lambda stage: None)
+    calls = []
+
+    def run(errors):
+        def analyze(content):
+            calls.append(content)
+            if errors:
+                raise errors.pop(0)
+            return {"keywords": [], "sentiment_score": 0.0, "word_count": 1}
+
+        monkeypatch.setattr(analysis_tasks, "analyze_text", analyze)
+        result = analysis_tasks.analyze_content.apply(args=[{"customer": {"name": "Aung"}, "link": "https://example.com/aung", "content": "text"}])
+        return result, calls
+
+    return run
+
+
+def test_fatal_errors_fail_without_retrying(eager_analysis):
+    result, calls = eager_analysis([KeyError("keywords")])
+    assert result.failed() and isinstance(result.result, KeyError)
+    assert len(calls) == 1
+
+
+def test_transient_errors_retry_within_the_budget(eager_analysis, monkeypatch):
+    result, calls = eager_analysis([ConnectionError(), TimeoutError()])
+    assert result.successful() and len(calls) == 3
+
+    calls.clear()
+    result, calls = eager_analysis([ConnectionError()] * 10)
+    # analyze_content's budget is 2 retries
+    assert result.failed() and len(calls) == 3
+
+
+def test_crawl_link_does_not_retry_client_errors(monkeypatch):
+    monkeypatch.setitem(CRAWL_CACHE_CONFIG, "enabled", False)
+    monkeypatch.setitem(DEDUP_CONFIG, "enabled", False)
+    monkeypatch.setitem(CHANGE_DETECTION_CONFIG, "enabled", False)
+    fetched = []
+    monkeypatch.setattr(crawl_tasks, "fetch_url", lambda url, headers=None: fetched.append(url) or {"url": url, "status": 404, "headers": {}, "content": "", "error": "HTTP 404"})
+
+    result = crawl_tasks.crawl_link.apply(args=[{"customer": {"name": "Aung"}, "link": "https://example.com/gone"}])
+
+    assert result.failed() and result.result.status == 404
+    assert fetched == ["https://example.com/gone"]
+
+
+def test_circuit_opens_fails_fast_and_recovers_after_a_probe():
+    client = fakeredis.FakeRedis()
+    breaker = CircuitBreaker(client, failure_threshold=3, window=60, open_seconds=30)
+    url = "https://down.example.com/page"
+
+    for _ in range(3):
+        assert breaker.before(url) is False
+        breaker.record(url, ok=False)
+    with pytest.raises(CircuitOpen) as excinfo:
+        breaker.before(url)
+    assert 0 < excinfo.value.retry_after <= 30
+    assert breaker.state(url) == "open"
+
+    # The open window elapses: one probe goes through, everyone else still fails fast
+    client.delete("circuit:down.example.com:open")
+    assert breaker.state(url) == "half_open"
+    assert breaker.before(url) is True
+    with pytest.raises(CircuitOpen):
+        breaker.before(url)
+    breaker.record(url, ok=False, probe=True)
+    assert breaker.state(url) == "open"
+
+    client.delete("circuit:down.example.com:open")
+    probe = breaker.before(url)
+    breaker.record(url, ok=True, probe=probe)
+    assert breaker.state(url) == "closed"
+    assert breaker.before(url) is False
+
+
+def test_only_outages_count_against_a_host():
+    assert is_host_failure({"status": None, "error": "ConnectionResetError()"})
+    assert is_host_failure({"status": 502, "error": "HTTP 502"})
+    assert not is_host_failure({"status": 404, "error": "HTTP 404"})
+    assert not is_host_failure({"status": 429, "error": "HTTP 429"})
+    assert not is_host_failure({"status": 200, "error": None})
+
+
+def test_open_circuits_fail_fast_inside_a_batch(monkeypatch):
+    breaker = CircuitBreaker(fakeredis.FakeRedis(), failure_threshold=1)
+    breaker.record("https://down.example.com/", ok=False)
+    requested = []
+
+    class Engine:
+        def fetch_many(self, urls, per_url_headers=None, start_delays=None):
+            requested.extend(urls)
+            return [{"url": url, "status": 200, "headers": {}, "content": "ok", "error": None} for url in urls]
+
+    monkeypatch.setattr(crawl_tasks, "CRAWL_LIVE_FETCH", True)
+    monkeypatch.setattr(crawl_tasks, "get_circuit_breaker", lambda: breaker)
+    monkeypatch.setattr(crawl_tasks, "get_rate_limiter", lambda: None)
+    monkeypatch.setattr(crawl_tasks, "get_live_fetch_engine", lambda: Engine())
+
+    responses = crawl_tasks.fetch_urls(["https://down.example.com/a", "https://up.example.com/b"])
+
+    assert requested == ["https://up.example.com/b"]
+    assert "circuit for down.example.com is open" in responses[0]["error"]
+    assert responses[1]["content"] == "ok"
@@ -0,0 +1,65 @@
+from types import SimpleNamespace
+import fakeredis
+from kombu.serialization import dumps, loads
+from shinsa.celery_app import serializers
+from shinsa.celery_app.app import celery_app
+from shinsa.celery_app.config import CELERY_CONFIG, CELERY_TASK_ROUTES, CELERY_QUEUE_SERIALIZERS, PAYLOAD_SERIALIZER, RESULT_BACKEND_CONFIG
+from shinsa.celery_app.serializers import MSGPACK_COMPRESSED, build_serializer_annotations
+from benchmarks.harness import FakeRedisBackend, _fake_server
+
+payload = {
+    "customer": {"name": "清水 勝美", "email": "shimizu@example.com"},
+    "link": "https://twitter.com/清水",
+    "content": "Python developer in Osaka. " * 200,
+    "content_length": 5400,
+    "cache_hit": False,
+    "error": None,
+}
+
+
+def test_roundtrip_through_kombu_registry():
+    content_type, content_encoding, data = dumps(payload, serializer=MSGPACK_COMPRESSED)
+
+    assert content_type == serializers.CONTENT_TYPE and content_encoding == "binary"
+    assert loads(data, content_type, content_encoding) == payload
+    assert len(data) < len(dumps(payload, serializer="json")[2]) / 5
+
+
+def test_compression_threshold():
+    small = {"customer": {"name": "Aung"}, "links": ["https://twitter.com/aung"]}
+
+    assert serializers.encode(small)[:1] == serializers.RAW
+    assert serializers.encode(payload)[:1] != serializers.RAW
+    assert serializers.decode(serializers.encode(small)) == small
+
+
+def test_every_codec_decodes():
+    packed = serializers.msgpack.packb(payload, use_bin_type=True)
+    for codec, compress in ((serializers.ZLIB, lambda data: serializers.zlib.compress(data)), (serializers.ZSTD, serializers._zstd_compressor.compress), (serializers.LZ4, serializers.lz4.frame.compress)):
+        assert serializers.decode(codec + compress(packed)) == payload
+
+
+def test_annotations_follow_routes_and_queues():
+    routes = {"crawl_link": {"queue": "io_intensive"}, "find_customer_links": {"queue": "coordination"}, "generate_customer_report": {"queue": "coordination", "serializer": "msgpack-z"}}
+    annotations = build_serializer_annotations(routes, {"io_intensive": "msgpack-z"})
+
+    assert annotations == {"crawl_link": {"serializer": "msgpack-z"}, "generate_customer_report": {"serializer": "msgpack-z"}}
+    serializer_annotations = {name: {"serializer": annotation["serializer"]} for name, annotation in CELERY_CONFIG["task_annotations"].items() if "serializer" in annotation}
+    assert serializer_annotations == build_serializer_annotations(CELERY_TASK_ROUTES, CELERY_QUEUE_SERIALIZERS)
+    assert PAYLOAD_SERIALIZER in CELERY_CONFIG["accept_content"]
+
+
+def test_only_payload_heavy_tasks_store_compressed_results(monkeypatch):
+    monkeypatch.setitem(RESULT_BACKEND_CONFIG, "batch_writes", False)
+    results = FakeRedisBackend(app=celery_app)
+    client = fakeredis.FakeStrictRedis(server=_fake_server)
+    report = {"summary": {"top_keywords": [{"word": "python", "total_count": 3}]}}
+
+    results.store_result("crawl", payload, "SUCCESS", request=SimpleNamespace(task="crawl_link"))
+    results.store_result("report", report, "SUCCESS", request=SimpleNamespace(task="generate_customer_report"))
+
+    assert CELERY_CONFIG["result_serializer"] == "json"
+    assert serializers.is_compressed_payload(client.get(results.get_key_for_task("crawl")))
+    assert client.get(results.get_key_for_task("report")).startswith(b"{")
+    assert results.get_task_meta("crawl")["result"] == payload
+    assert results.get_task_meta("report")["result"] == report
@@ -0,0 +1,135 @@
+import threading
+import fakeredis
+import pytest
+from shinsa.utils.task_dedup import TaskDeduplicator, fingerprint
+from shinsa.celery_app.tasks import crawl_tasks
+
+
+def make_dedup(client=None, **options):
+    return TaskDeduplicator(client or fakeredis.FakeRedis(), "test", poll_interval=0.01, **options)
+
+
+def test_fingerprint_is_stable():
+    assert fingerprint("crawl", {"b": 1, "a": [1, 2]}) == fingerprint("crawl", {"a": [1, 2], "b": 1})
+    assert fingerprint("crawl", "x") != fingerprint("analysis", "x")
+
+
+def test_finished_results_are_reused_within_the_window():
+    dedup = make_dedup(window=60)
+    calls = []
+
+    assert dedup.run("k", lambda: calls.append(1) or {"v": 1}) == {"v": 1}
+    assert dedup.run("k", lambda: calls.append(1) or {"v": 2}) == {"v": 1}
+    assert len(calls) == 1
+    stats = dedup.stats()
+    assert (stats["executed"], stats["reused"], stats["saved"]) == (1, 1, 1)
+
+
+def test_concurrent_identical_requests_share_one_execution():
+    client = fakeredis.FakeRedis()
+    owner, waiter = make_dedup(client), make_dedup(client)
+    started, release = threading.Event(), threading.Event()
+    calls = []
+
+    def slow():
+        calls.append("owner")
+        started.set()
+        release.wait(5)
+        return {"page": "content"}
+
+    results = {}
+    thread = threading.Thread(target=lambda: results.setdefault("owner", owner.run("k", slow)))
+    thread.start()
+    started.wait(5)
+    # The waiter polls until the owner finishes instead of running its own copy
+    threading.Timer(0.1, release.set).start()
+    results["waiter"] = waiter.run("k", lambda: calls.append("waiter") or {"page": "other"})
+    thread.join(5)
+
+    assert calls == ["owner"]
+    assert results == {"owner": {"page": "content"}, "waiter": {"page": "content"}}
+    assert owner.stats()["coalesced"] == 1
+
+
+def test_waiters_take_over_when_the_owner_fails():
+    client = fakeredis.FakeRedis()
+    owner, waiter = make_dedup(client), make_dedup(client)
+    started, release = threading.Event(), threading.Event()
+
+    def failing():
+        started.set()
+        release.wait(5)
+        raise RuntimeError("fetch failed")
+
+    def run_owner():
+        with pytest.raises(RuntimeError):
+            owner.run("k", failing)
+
+    thread = threading.Thread(target=run_owner)
+    thread.start()
+    started.wait(5)
+    threading.Timer(0.1, release.set).start()
+    assert waiter.run("k", lambda: "retried") == "retried"
+    thread.join(5)
+    assert client.get("dedup:test:lock:k") is None
+
+
+def test_slow_owner_leaves_a_taken_over_lock_alone():
+    client = fakeredis.FakeRedis()
+    dedup = make_dedup(client)
+    lock_key = dedup._lock_key("k")
+
+    def slow_compute():
+        # lock_ttl ran out mid-computation and another worker took the lock
+        client.set(lock_key, "other-owner")
+        return {"v": 1}
+
+    assert dedup.run("k", slow_compute, cacheable=lambda value: False) == {"v": 1}
+    assert client.get(lock_key) == b"other-owner"
+
+    def failing_compute():
+        client.set(lock_key, "third-owner")
+        raise TimeoutError("slow upstream")
+
+    client.delete(lock_key)
+    with pytest.raises(TimeoutError):
+        dedup.run("k", failing_compute)
+    assert client.get(lock_key) == b"third-owner"
+
+    # A lock that is still ours is released as before
+    client.delete(lock_key)
+    dedup.run("k", lambda: {"v": 2}, cacheable=lambda value: False)
+    assert not client.exists(lock_key)
+
+
+def test_run_many_computes_each_new_key_once():
+    dedup = make_dedup()
+    dedup.run("done", lambda: "old")
+    batches = []
+
+    def compute_many(items):
+        batches.append(items)
+        return [item.upper() if item != "bad" else None for item in items]
+
+    results = dedup.run_many(["a", "done", "a", "bad"], ["a", "x", "a", "bad"], compute_many, cacheable=lambda value: value is not None)
+
+    assert results == ["A", "old", "A", None]
+    assert batches == [["a", "bad"]]
+    # Uncacheable results are not shared
+    assert dedup.run_many(["bad"], ["bad"], compute_many, cacheable=lambda value: value is not None) == [None]
+    stats = dedup.stats()
+    assert (stats["executed"], stats["coalesced"], stats["reused"]) == (4, 1, 1)
+
+
+def test_crawl_urls_fetch_each_normalized_url_once(monkeypatch):
+    dedup = make_dedup()
+    fetched = []
+    monkeypatch.setattr(crawl_tasks, "get_deduplicator", lambda namespace: dedup)
+    monkeypatch.setattr(crawl_tasks, "get_crawl_cache", lambda: None)
+    monkeypatch.setattr(crawl_tasks, "fetch_urls", lambda urls: fetched.extend(urls) or [{"url": url, "content": url, "error": None} for url in urls])
+
+    responses = crawl_tasks.crawl_urls(["https://Example.com/aung/", "https://example.com/aung", "https://example.com/kyaw"])
+    crawl_tasks.crawl_urls(["https://example.com/kyaw"])
+
+    assert fetched == ["https://Example.com/aung/", "https://example.com/kyaw"]
+    assert [r["content"] for r in responses] == ["https://Example.com/aung/", "https://Example.com/aung/", "https://example.com/kyaw"]
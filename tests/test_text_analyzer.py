@@ -0,0 +1,75 @@
+import re
+import time
+from collections import Counter
+from shinsa.utils.text_analyzer import TextAnalyzer, get_text_analyzer, get_keyword_extractor
+from shinsa.utils.batch_analyzer import BatchTextAnalyzer
+from shinsa.celery_app.config import DEDUP_CONFIG, CHANGE_DETECTION_CONFIG
+from shinsa.celery_app.tasks.analysis_tasks import extract_keywords_and_analyze, analyze_content, analyze_content_batch
+from benchmarks.text_analyzer_bench import legacy_extract_keywords_and_analyze, make_document
+
+documents = [
+    "",
+    "The professional was skilled, experienced and GREAT. The great professional!",
+    "bad poor terrible awful unprofessional service by them, about this and that",
+    "Python 3.12: data-science, AI/ML, caféteria résumé naïve ab abc abcd",
+    make_document(64 * 1024, seed=1),
+]
+
+
+def legacy_extract_keywords(content, min_length=3, max_keywords=50):
+    words = re.findall(r"\b[a-zA-Z]{" + str(min_length) + r",}\b", content.lower())
+    stop_words = {"the", "and", "or", "but", "in", "on", "at", "to", "for", "of", "with", "by", "from", "about"}
+    filtered_words = [word for word in words if word not in stop_words]
+    word_freq = Counter(filtered_words)
+    return {
+        "keywords": [{"word": word, "count": count} for word, count in word_freq.most_common(max_keywords)],
+        "total_words": len(words),
+        "unique_words": len(set(words)),
+    }
+
+
+def test_analyze_matches_legacy_output():
+    for document in documents:
+        assert extract_keywords_and_analyze(document) == legacy_extract_keywords_and_analyze(document)
+
+
+def test_keywords_matches_legacy_output():
+    for document in documents:
+        for min_length in (2, 3, 5):
+            assert get_keyword_extractor(min_length).keywords(document, 10) == legacy_extract_keywords(document, min_length, 10)
+
+
+def test_analyzer_is_built_once_per_process():
+    assert get_text_analyzer() is get_text_analyzer()
+    assert get_keyword_extractor(3) is get_keyword_extractor(3)
+    assert isinstance(get_text_analyzer().positive_words, frozenset)
+
+
+def test_sentiment():
+    analyzer = TextAnalyzer()
+    assert analyzer.analyze("great skilled professional developer")["sentiment"] == "positive"
+    assert analyzer.analyze("terrible awful developer")["sentiment"] == "negative"
+    assert analyzer.analyze("developer")["sentiment"] == "neutral"
+
+
+def test_batch_analyzer_matches_per_document_analysis():
+    batch = documents + [make_document(4096, seed=seed) for seed in range(2, 40)]
+    analyzer = get_text_analyzer()
+
+    assert BatchTextAnalyzer().analyze_many(batch) == [analyzer.analyze(document) for document in batch]
+    assert BatchTextAnalyzer().analyze_many([]) == []
+
+
+def test_analyze_content_batch_matches_analyze_content_schema(monkeypatch):
+    monkeypatch.setattr(time, "sleep", lambda seconds: None)
+    monkeypatch.setitem(DEDUP_CONFIG, "enabled", False)
+    monkeypatch.setitem(CHANGE_DETECTION_CONFIG, "enabled", False)
+    customer = {"name": "Aung Myo Tun"}
+    crawled = [{"customer": customer, "link": f"https://example.com/{i}", "content": document, "content_length": len(document), "crawl_task_id": "crawl"} for i, document in enumerate(documents)]
+
+    batch_results = analyze_content_batch.apply(args=[crawled]).get()
+    single_results = [analyze_content.apply(args=[crawled_data]).get() for crawled_data in crawled]
+
+    for batch_result, single_result in zip(batch_results, single_results):
+        assert set(batch_result) == set(single_result)
+        assert batch_result["analysis"] == single_result["analysis"]